@@ -0,0 +1,155 @@
+"""
+Size and start-up cost of compressed self-extracting bundles
+
+Wraps one bundle (a file, or a generated one) with every compression
+method and level asked for, then reports the output size, the time to
+decompress the payload and the wall-clock time to run the bundle in a
+fresh interpreter:
+
+    python benchmarks/bench_compress.py --modules 200
+    python benchmarks/bench_compress.py dist/tool.py --levels 1 6 9 --runs 20
+"""
+import argparse
+import base64
+import json
+import marshal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Run from a checkout without installing anything
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pycombiner.combiner.compress import CODECS, compress_payload, self_extracting
+
+
+def generate_bundle(modules: int) -> str:
+    """Source resembling a merged bundle: ``modules`` sections of classes, functions and constants"""
+    parts = ["# Generated by PyCombiner\nimport os\nimport re\n"]
+    for i in range(modules):
+        parts.append(f'''
+#{'=' * 80}
+# [{i + 1}] module_{i}.py : pkg/module_{i}.py
+#{'=' * 80}
+
+PATTERN_{i} = re.compile(r"^item-{i}-(\\d+)$")
+DEFAULTS_{i} = {{"name": "module_{i}", "retries": {i % 5}, "paths": [os.sep, "/tmp/{i}"]}}
+
+class Handler{i}:
+    """Handles items of kind {i}"""
+
+    def __init__(self, options=None):
+        self.options = dict(DEFAULTS_{i}, **(options or {{}}))
+
+    def parse(self, text):
+        match = PATTERN_{i}.match(text)
+        return int(match.group(1)) if match else None
+
+    def describe(self):
+        return "%s with %d retries" % (self.options["name"], self.options["retries"])
+
+def make_handler_{i}(**options):
+    return Handler{i}(options)
+''')
+    return ''.join(parts)
+
+
+def time_runs(path: Path, runs: int) -> list:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, str(path)], check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def decompress_time(method: str, data: bytes, repeat: int = 20) -> float:
+    """Median time to decode and decompress a payload like the stub does"""
+    encoded = base64.b85encode(data)
+    if method == 'zstd':
+        import zstandard
+        decompress = zstandard.ZstdDecompressor().decompress
+    else:
+        decompress = __import__(CODECS[method].module).decompress
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        decompress(base64.b85decode(encoded))
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare compressed bundle sizes and start-up times')
+    parser.add_argument('bundle', nargs='?', help='Bundle to compress (default: a generated one)')
+    parser.add_argument('--modules', type=int, default=100, help='Sections of the generated bundle (default: 100)')
+    parser.add_argument('--methods', nargs='+', choices=list(CODECS), default=['zlib', 'lzma', 'zstd'])
+    parser.add_argument('--levels', nargs='+', type=int, help='Levels to try (default: lowest, middle and highest)')
+    parser.add_argument('--marshal', action='store_true', help='Also measure marshalled code payloads')
+    parser.add_argument('-n', '--runs', type=int, default=10, help='Interpreter launches per variant (default: 10)')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    args = parser.parse_args(argv)
+
+    source = Path(args.bundle).read_text(encoding='utf-8') if args.bundle else generate_bundle(args.modules)
+    variants = [('plain', None, False)]
+    for method in args.methods:
+        codec = CODECS[method]
+        levels = args.levels or [codec.levels.start, codec.default_level // 2 or 1, codec.default_level]
+        for level in sorted(set(levels)):
+            if level in codec.levels:
+                variants.append((method, level, False))
+                if args.marshal:
+                    variants.append((method, level, True))
+
+    code = marshal.dumps(compile(source, '<bundle>', 'exec'))
+    results = []
+    skipped = set()
+    with tempfile.TemporaryDirectory(prefix='compress-bench-') as tmp:
+        for method, level, marshal_code in variants:
+            if method in skipped:
+                continue
+            if method == 'plain':
+                text = source
+                decompress = 0.0
+            else:
+                try:
+                    text = self_extracting(source, method, level, marshal_code)
+                except RuntimeError as e:
+                    # zstd without the zstandard package
+                    print(f"Skipping {method}: {e}", file=sys.stderr)
+                    skipped.add(method)
+                    continue
+                payload = compress_payload(code if marshal_code else source.encode('utf-8'), method, level)
+                decompress = decompress_time(method, payload)
+            path = Path(tmp) / 'bundle.py'
+            path.write_text(text, encoding='utf-8')
+            times = time_runs(path, args.runs)
+            results.append({
+                'method': method,
+                'level': level,
+                'marshal': marshal_code,
+                'bytes': len(text.encode('utf-8')),
+                'decompress_ms': round(decompress * 1000, 3),
+                'startup_ms_median': round(statistics.median(times) * 1000, 2),
+                'startup_ms_min': round(min(times) * 1000, 2),
+            })
+
+    if args.json:
+        print(json.dumps(results))
+        return 0
+    plain = results[0]['bytes']
+    print(f"{'Variant':<22} {'Bytes':>10} {'Ratio':>7} {'Decompress':>12} {'Start-up (median/min)':>24}")
+    for r in results:
+        name = r['method'] if r['level'] is None else f"{r['method']}-{r['level']}"
+        if r['marshal']:
+            name += '+marshal'
+        startup = f"{r['startup_ms_median']:.1f} / {r['startup_ms_min']:.1f} ms"
+        print(f"{name:<22} {r['bytes']:>10} {r['bytes'] / plain:>7.1%} {r['decompress_ms']:>9.2f} ms {startup:>24}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
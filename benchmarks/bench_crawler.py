@@ -0,0 +1,116 @@
+"""
+Crawler throughput benchmark against a generated local site
+
+Generates a static site in a temporary directory, serves it with
+http.server on 127.0.0.1 and crawls it with urlTreeCatcher.Crawler, so it
+needs no network access:
+
+    python benchmarks/bench_crawler.py --pages 2000 --concurrency 16
+"""
+import argparse
+import functools
+import json
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Run from a checkout without installing anything
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from urlTreeCatcher import Crawler
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like a real server
+
+    def log_message(self, format, *args):
+        pass
+
+
+def generate_site(root, pages, fanout, seed=0):
+    """Write ``pages`` HTML pages in nested directories, each linking to ``fanout`` others.
+
+    Page 0 is the index page at /. Page i always links to its children
+    i*fanout+1.. so every page is reachable; the remaining links point at
+    random pages.
+    """
+    rng = random.Random(seed)
+    paths = [''] + [f"s{i % 7}/d{i % 13}/page{i}.html" for i in range(1, pages)]
+    filler = '<p>' + 'lorem ipsum dolor sit amet ' * 40 + '</p>'
+    for i, path in enumerate(paths):
+        path = path or 'index.html'
+        children = [j for j in range(i * fanout + 1, i * fanout + fanout + 1) if j < pages]
+        targets = children + [rng.randrange(pages) for _ in range(fanout - len(children))]
+        links = ''.join(f'<li><a href="/{paths[j]}">page {j}</a></li>' for j in targets)
+        file = root / path
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.write_text(f"<html><head><title>{i}</title></head><body>{filler}<ul>{links}</ul>{filler}</body></html>")
+
+
+def serve(root):
+    handler = functools.partial(QuietHandler, directory=str(root))
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_once(base_url, args):
+    crawler = Crawler(base_url, max_depth=args.depth, concurrency=args.concurrency, per_host=args.per_host,
+                      respect_robots=False)
+    start = time.perf_counter()
+    crawler.crawl()
+    elapsed = time.perf_counter() - start
+    return crawler.pages_fetched, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure crawler pages/sec against a generated local site')
+    parser.add_argument('--pages', type=int, default=500, help='Number of generated pages (default: 500)')
+    parser.add_argument('--fanout', type=int, default=10, help='Links per page (default: 10)')
+    parser.add_argument('--depth', type=int, default=100, help='Crawl depth (default: 100)')
+    parser.add_argument('-c', '--concurrency', type=int, default=8, help='Crawler workers (default: 8)')
+    parser.add_argument('--per-host', type=int, default=8, help='Requests in flight per host (default: 8)')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='Number of timed crawls (default: 3)')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    args = parser.parse_args(argv)
+
+    root = Path(tempfile.mkdtemp(prefix='crawler-bench-'))
+    try:
+        generate_site(root, args.pages, args.fanout)
+        server = serve(root)
+        base_url = f"http://127.0.0.1:{server.server_address[1]}/"
+        try:
+            runs = [run_once(base_url, args) for _ in range(args.repeat)]
+        finally:
+            server.shutdown()
+            server.server_close()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    rates = [pages / elapsed for pages, elapsed in runs]
+    result = {
+        'pages': runs[0][0],
+        'concurrency': args.concurrency,
+        'runs': [round(elapsed, 4) for _, elapsed in runs],
+        'pages_per_sec_median': round(statistics.median(rates), 1),
+        'pages_per_sec_best': round(max(rates), 1),
+    }
+    if args.json:
+        print(json.dumps(result))
+    else:
+        print(f"{result['pages']} pages, concurrency {args.concurrency}")
+        for i, (pages, elapsed) in enumerate(runs, 1):
+            print(f"  run {i}: {elapsed:.3f} s  {pages / elapsed:8.1f} pages/s")
+        print(f"median {result['pages_per_sec_median']} pages/s, best {result['pages_per_sec_best']} pages/s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
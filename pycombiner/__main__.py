@@ -2,46 +2,394 @@
 Command-line interface for PyCombiner
 """
 import argparse
+import os
 from pathlib import Path
 import sys
+from typing import Optional, TextIO
 
 # Add the project root directory to Python path
 project_root = str(Path(__file__).parent.parent)
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-from pycombiner.combiner.combiner import PyCombiner
+# Imports of pycombiner.combiner are kept inside the functions: the daemon client
+# (see pycombiner.client) must start without loading the bundler itself
 
-def main():
+def add_source_arguments(parser: argparse.ArgumentParser):
+    """Arguments selecting where the sources are read from"""
+    parser.add_argument('source_path', type=str, help='Source directory, entry point Python file or zip/tar archive')
+    parser.add_argument('--rev', type=str, help='Read sources from this git revision instead of the working tree')
+    parser.add_argument('--entry', type=str, help='Entry file relative to the source root (default: main.py)')
+
+def add_logging_arguments(parser: argparse.ArgumentParser):
+    """Arguments controlling diagnostic logging on stderr"""
+    parser.add_argument('--log-level', choices=['debug', 'info', 'warning', 'error'], default='warning',
+                        help='Minimum level of log messages (default: warning)')
+    parser.add_argument('--log-json', action='store_true', help='Write log messages as JSON lines')
+
+def setup_logging(args, debug: bool = False):
+    """Configure the pycombiner loggers from the parsed arguments"""
+    from pycombiner.combiner.log import configure
+    configure('debug' if debug else args.log_level, json_format=args.log_json)
+
+def resolve_source(args, out: TextIO = None):
+    """Return (source provider, entry_file) for the parsed arguments, or None if invalid"""
+    from subprocess import CalledProcessError
+    from pycombiner.combiner.sources import open_source
+
+    out = out if out is not None else sys.stdout
+    source_path = Path(args.source_path).resolve()
+    if not source_path.exists() and not args.rev:
+        print(f"Error: '{source_path}' does not exist", file=out)
+        return None
+    try:
+        return open_source(source_path, args.rev, args.entry)
+    except CalledProcessError as e:
+        print(f"Error: git failed: {e.stderr.decode(errors='replace').strip() if e.stderr else e}", file=out)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=out)
+    return None
+
+def graph_main(argv):
+    """Export or query the dependency graph of a project"""
+    parser = argparse.ArgumentParser(prog='pycombiner graph', description='Export or query the dependency graph')
+    add_source_arguments(parser)
+    parser.add_argument('--format', choices=['text', 'dot', 'json', 'matrix'], default='text', help='Export format')
+    parser.add_argument('-o', '--output', type=str, help='Write the export to a file instead of stdout')
+    parser.add_argument('--deps', metavar='MODULE', help='List modules imported by MODULE')
+    parser.add_argument('--rdeps', metavar='MODULE', help='List modules that import MODULE')
+    parser.add_argument('--closure', metavar='MODULE', help='List all modules MODULE depends on transitively')
+    parser.add_argument('--path', nargs=2, metavar=('SRC', 'DST'), help='Shortest import chain from SRC to DST')
+    parser.add_argument('--fan-in', type=int, nargs='?', const=10, metavar='N', help='Top N most imported modules')
+    parser.add_argument('--who-imports', metavar='PACKAGE', help='Modules reachable from the entry file that import PACKAGE')
+    add_logging_arguments(parser)
+
+    args = parser.parse_args(argv)
+    setup_logging(args)
+    resolved = resolve_source(args)
+    if resolved is None:
+        return 1
+    source, entry_file = resolved
+
+    from pycombiner.combiner.combiner import PyCombiner
+    with source:
+        graph = PyCombiner(entry_file, source.root, None, source=source).build_graph()
+
+    def label(node: str) -> str:
+        return graph.label(graph.node_id(node))
+
+    queries = []
+    try:
+        if args.deps:
+            queries.append((f"Imported by {args.deps}", [label(n) for n in graph.dependencies(args.deps)]))
+        if args.rdeps:
+            queries.append((f"Importers of {args.rdeps}", [label(n) for n in graph.reverse_dependencies(args.rdeps)]))
+        if args.closure:
+            queries.append((f"Transitive dependencies of {args.closure}", [label(n) for n in graph.transitive_closure(args.closure)]))
+        if args.path:
+            chain = graph.shortest_path(*args.path)
+            queries.append((f"Import path {args.path[0]} -> {args.path[1]}", [' -> '.join(label(n) for n in chain)] if chain else ['(no path)']))
+        if args.fan_in is not None:
+            queries.append(("Fan-in ranking", [f"{count:<6} {label(n)}" for n, count in graph.fan_in_ranking(args.fan_in)]))
+        if args.who_imports:
+            matches = graph.importers_of(args.who_imports, str(entry_file))
+            queries.append((f"Modules importing {args.who_imports}", [' -> '.join(label(n) for n in chain) for _, chain in matches]))
+    except KeyError as e:
+        print(f"Error: {e.args[0]}")
+        return 1
+
+    if queries:
+        for title, items in queries:
+            print(title)
+            for item in items:
+                print(f"  - {item}")
+        return
+
+    if args.format == 'dot':
+        text = graph.to_dot()
+    elif args.format == 'json':
+        text = graph.to_json()
+    elif args.format == 'matrix':
+        labels = [graph.label(i) for i in range(len(graph))]
+        rows = [f"{i:<4} {' '.join(map(str, row))}  {labels[i]}" for i, row in enumerate(graph.adjacency_matrix())]
+        text = '\n'.join(rows) + '\n'
+    else:
+        rows = [f"{graph.label(i)} -> {', '.join(graph.label(j) for j in deps) or '-'}" for i, deps in enumerate(graph.forward)]
+        rows.append(f"{len(graph)} nodes / {graph.edge_count} edges")
+        text = '\n'.join(rows) + '\n'
+
+    if args.output:
+        Path(args.output).write_text(text, encoding='utf-8')
+    else:
+        print(text, end='')
+
+def batch_main(argv):
+    """Bundle several entry points of one source tree in a single process"""
+    from pycombiner.combiner.batch import combine_many, load_manifest, parse_pair
+
+    parser = argparse.ArgumentParser(prog='pycombiner batch', description='Bundle several entry points sharing one parse cache')
+    parser.add_argument('pairs', nargs='*', metavar='ENTRY:OUTPUT', help='Entry file and output file pairs')
+    parser.add_argument('--manifest', type=str, help='TOML (or JSON) manifest listing the bundles')
+    parser.add_argument('--source-dir', type=str, help='Source directory for ENTRY:OUTPUT pairs (default: directory of each entry)')
+    parser.add_argument('-j', '--jobs', type=int, help='Number of bundles written in parallel')
+    parser.add_argument('--reachable-only', action='store_true',
+                        help='Only bundle files reachable from each entry file (always the case with --split)')
+    parser.add_argument('--split', action='store_true',
+                        help='Put files shared by several entry points into shared chunk files (written in one process)')
+    parser.add_argument('--chunk-dir', type=str, help='Directory of the shared chunks (default: directory of the first output)')
+    add_logging_arguments(parser)
+
+    args = parser.parse_args(argv)
+    if args.split and args.jobs is not None:
+        parser.error('--jobs cannot be used with --split')
+    setup_logging(args)
+    try:
+        specs = load_manifest(Path(args.manifest)) if args.manifest else []
+        specs += [parse_pair(pair, Path.cwd()) for pair in args.pairs]
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Error: {e}")
+        return 1
+    if not specs:
+        parser.error('no bundles given')
+    if args.source_dir:
+        for spec in specs:
+            if spec.source_dir is None:
+                spec.source_dir = Path(args.source_dir).resolve()
+
+    options = {'reachable_only': True} if args.reachable_only else {}
+    if args.split:
+        return split_main(specs, Path(args.chunk_dir).resolve() if args.chunk_dir else None, **options)
+
+    outcomes = combine_many(specs, args.jobs, **options)
+    failed = 0
+    for outcome in outcomes:
+        if outcome.error is not None:
+            failed += 1
+            print(f"✗ {outcome.spec.entry_file} : {outcome.error}")
+        else:
+            print(f"✓ {outcome.spec.output_file} ({outcome.files} files, {outcome.elapsed:.2f} s)")
+    print(f"{len(outcomes) - failed}/{len(outcomes)} bundles written")
+    return 1 if failed else 0
+
+def split_main(specs, chunk_dir: Optional[Path], **options) -> int:
+    """Write split bundles for batch specs, one split per source directory"""
+    from pycombiner.combiner.split import prune_chunks, split_bundles
+
+    groups = {}
+    group_options = {}
+    for spec in specs:
+        source_dir = spec.source_dir if spec.source_dir is not None else spec.entry_file.parent
+        groups.setdefault(source_dir, {})[spec.entry_file] = spec.output_file
+        # Chunks are shared, so every bundle of a split is built with the same options
+        if group_options.setdefault(source_dir, spec.options) != spec.options:
+            print(f"Error: bundles of {source_dir} need the same options to be split")
+            return 1
+
+    # Splits sharing a chunk directory are pruned together once all are written
+    keep = {}
+    for source_dir, entries in groups.items():
+        try:
+            result = split_bundles(entries, source_dir, chunk_dir, prune=len(groups) == 1,
+                                   **{**options, **group_options[source_dir]})
+        except (OSError, ValueError, RuntimeError) as e:
+            print(f"Error: {e}")
+            return 1
+        keep.setdefault(result.chunk_dir, set()).update(chunk.name for chunk in result.chunks)
+        for chunk in result.chunks:
+            print(f"✓ {chunk.name} ({len(chunk.files)} files, {chunk.size} bytes) shared by {', '.join(chunk.entries)}")
+        for output_file in result.bundles:
+            print(f"✓ {output_file} ({output_file.stat().st_size} bytes, {len(result.bundle_chunks[output_file])} chunks)")
+        print(f"{len(result.bundles)} bundles and {len(result.chunks)} chunks written, {result.total_size} bytes in total")
+        if result.pruned:
+            print(f"{len(result.pruned)} stale chunks removed")
+    if len(groups) > 1:
+        removed = sum(len(prune_chunks(directory, names)) for directory, names in keep.items())
+        if removed:
+            print(f"{removed} stale chunks removed")
+    return 0
+
+def bench_startup_main(argv):
+    """Compare the start-up of an entry file and of its bundle"""
+    import shlex
+    import tempfile
+    from pycombiner.combiner.sources import LocalSource
+    from pycombiner.combiner.startup import bench_startup, format_comparison
+
+    parser = argparse.ArgumentParser(prog='pycombiner bench-startup',
+                                     description='Launch the original entry file and its bundle in fresh interpreters and compare start-up')
+    add_source_arguments(parser)
+    parser.add_argument('--bundle', type=str, help='Existing bundle to measure (default: bundle into a temporary file)')
+    parser.add_argument('-n', '--runs', type=int, default=20, help='Launches of each (default: 20)')
+    parser.add_argument('--warmup', type=int, default=1, help='Unmeasured launches of each first (default: 1)')
+    parser.add_argument('--args', type=str, default='', help='Arguments passed to both scripts, as one shell-quoted string')
+    parser.add_argument('--top', type=int, default=10, help='Modules listed per cause (default: 10)')
+    parser.add_argument('--defer-imports', choices=['local', 'lazy'], help='Bundle option, see pycombiner --help')
+    parser.add_argument('--reachable-only', action='store_true', help='Bundle option, see pycombiner --help')
+    parser.add_argument('--compress', choices=['zlib', 'lzma', 'zstd'], help='Bundle option, see pycombiner --help')
+    parser.add_argument('--marshal', action='store_true', help='Bundle option, see pycombiner --help')
+    parser.add_argument('--profile-run', action='store_true', help='Bundle option, profiling a run with --args')
+    parser.add_argument('--profile-timeout', type=float, default=60.0, metavar='SECONDS',
+                        help='Bundle option, see pycombiner --help')
+    parser.add_argument('--json', action='store_true', help='Print the measures as JSON')
+    add_logging_arguments(parser)
+
+    args = parser.parse_args(argv)
+    check_compress_arguments(parser, args)
+    setup_logging(args)
+    resolved = resolve_source(args)
+    if resolved is None:
+        return 1
+    source, entry_file = resolved
+    if not isinstance(source, LocalSource):
+        print("Error: bench-startup runs the original files, so they must be a directory on disk")
+        return 1
+
+    with tempfile.TemporaryDirectory(prefix='pycombiner-bench-') as tmp:
+        if args.bundle:
+            bundle_file = Path(args.bundle).resolve()
+        else:
+            from pycombiner.combiner.combiner import PyCombiner
+            bundle_file = Path(tmp) / entry_file.name
+            try:
+                PyCombiner(entry_file, source.root, bundle_file, quiet=True, defer_imports=args.defer_imports,
+                           reachable_only=args.reachable_only, compress=args.compress, marshal_code=args.marshal,
+                           profile_args=shlex.split(args.args) if args.profile_run else None,
+                           profile_timeout=args.profile_timeout).combine()
+            except (ValueError, RuntimeError) as e:
+                print(f"Error: {e}")
+                return 1
+        comparison = bench_startup(entry_file, bundle_file, source.root, args.runs, shlex.split(args.args), args.warmup)
+
+    if args.json:
+        import json
+        print(json.dumps({'metrics': comparison.metrics(), 'attribution': comparison.attribution(args.top)}, indent=2))
+    else:
+        print(format_comparison(comparison, args.top))
+    return 0
+
+def serve_main(argv):
+    """Run the bundler daemon"""
+    from pycombiner.combiner.server import serve_main as run_server
+    return run_server(argv)
+
+COMMANDS = {
+    'graph': graph_main,
+    'batch': batch_main,
+    'serve': serve_main,
+    'bench-startup': bench_startup_main,
+}
+
+def check_compress_arguments(parser: argparse.ArgumentParser, args):
+    """Reject compression options given without --compress"""
+    if args.compress:
+        return
+    if getattr(args, 'compress_level', None) is not None:
+        parser.error("--compress-level requires --compress")
+    if args.marshal:
+        parser.error("--marshal requires --compress")
+
+def build_parser() -> argparse.ArgumentParser:
+    """Parser of the bundle command, shared with the daemon client"""
     parser = argparse.ArgumentParser(description='Combine Python files into a single file')
-    parser.add_argument('source_path', type=str, help='Source directory or entry point Python file')
+    add_source_arguments(parser)
     parser.add_argument('output_file', type=str, help='Output file path')
-    parser.add_argument('--debug', action='store_true', help='Enable debug mode')
+    parser.add_argument('--debug', action='store_true', help='Enable debug mode (same as --log-level debug)')
     parser.add_argument('--show-details', action='store_true', help='Show detailed import information')
+    parser.add_argument('--import-cost', action='store_true', help='Measure hoisted import times with python -X importtime')
+    parser.add_argument('--defer-imports', choices=['local', 'lazy'], help='Move single-use imports into functions (local) or import modules on first use (lazy)')
+    parser.add_argument('--reachable-only', action='store_true', help='Only bundle files reachable from the entry file')
+    parser.add_argument('--reproducible', action='store_true', help='Byte-identical output: relative paths, LF newlines and a content hash in the header')
+    parser.add_argument('--vendor', action='append', default=[], metavar='PACKAGE',
+                        help='Embed the reachable modules of an installed pure-Python package (repeatable)')
+    parser.add_argument('--compress', choices=['zlib', 'lzma', 'zstd'], help='Write a self-extracting bundle with a compressed payload')
+    parser.add_argument('--compress-level', type=int, metavar='N', help='Compression level (default: 9 for zlib and lzma, 19 for zstd)')
+    parser.add_argument('--marshal', action='store_true', help='Compress compiled code instead of source (runs only on this Python version)')
+    parser.add_argument('--profile-run', action='store_true',
+                        help='Run the entry file once and merge what it uses first, with unused function-only files loaded lazily')
+    parser.add_argument('--profile-args', type=str, default='', metavar='ARGS',
+                        help='Arguments of the profiling run, as one shell-quoted string')
+    parser.add_argument('--profile-timeout', type=float, default=60.0, metavar='SECONDS',
+                        help='Give up on a profiling run after this many seconds (default: 60)')
+    parser.add_argument('--cache-dir', type=str, help='Reuse bundles built from unchanged inputs; can be shared between checkouts')
+    parser.add_argument('--cache-max-size', type=str, metavar='SIZE', help='Evict least recently used bundles above this size (e.g. 500M, 2G)')
+    parser.add_argument('--daemon', action='store_true', help='Send the request to a running `pycombiner serve` (also PYCOMBINER_DAEMON=1)')
+    add_logging_arguments(parser)
+    return parser
 
-    args = parser.parse_args()
+def run_bundle(args, out: TextIO = None, workspace=None) -> int:
+    """Bundle as asked by parsed arguments and write messages and the report to ``out``.
 
-    source_path = Path(args.source_path).resolve()
+    ``workspace`` (see server.Workspace) supplies warm indexes and parse
+    caches when running inside the daemon.
+    """
+    import shlex
+    from pycombiner.combiner.combiner import PyCombiner
+
+    out = out if out is not None else sys.stdout
     output_file = Path(args.output_file).resolve()
 
-    if not source_path.exists():
-        print(f"Error: '{source_path}' does not exist")
-        return
+    cache = None
+    if args.cache_dir:
+        from pycombiner.combiner.cache import BundleCache, parse_size
+        try:
+            max_size = parse_size(args.cache_max_size) if args.cache_max_size else None
+        except ValueError as e:
+            print(f"Error: {e}", file=out)
+            return 2
+        cache = BundleCache(Path(args.cache_dir).resolve(), max_size)
 
-    # If source path is a file, use its directory as source_dir
-    if source_path.is_file():
-        source_dir = source_path.parent
-        entry_file = source_path
-    else:
-        source_dir = source_path
-        entry_file = source_dir / 'main.py'
-        if not entry_file.exists():
-            print(f"Error: No main.py found in '{source_dir}'")
-            return
+    profile_args = None
+    if args.profile_run:
+        try:
+            profile_args = shlex.split(args.profile_args)
+        except ValueError as e:
+            print(f"Error: {e}", file=out)
+            return 2
+
+    resolved = resolve_source(args, out)
+    if resolved is None:
+        return 1
+    source, entry_file = resolved
 
     # Use new implementation with debug and detail options
-    combiner = PyCombiner(entry_file, source_dir, output_file, args.debug, args.show_details)
-    combiner.combine()
+    with source:
+        shared = workspace.resources(source) if workspace is not None else {}
+        combiner = PyCombiner(entry_file, source.root, output_file, args.debug, args.show_details,
+                              defer_imports=args.defer_imports, measure_import_cost=args.import_cost,
+                              reachable_only=args.reachable_only, reproducible=args.reproducible, source=source,
+                              quiet=True, cache=cache, vendor=args.vendor, compress=args.compress,
+                              compress_level=args.compress_level, marshal_code=args.marshal,
+                              profile_args=profile_args, profile_timeout=args.profile_timeout, **shared)
+        try:
+            combiner.combine()
+        except (ValueError, RuntimeError) as e:
+            # Packages that cannot be vendored, invalid compression settings, failed profiling runs
+            print(f"Error: {e}", file=out)
+            return 1
+
+    if combiner.cache_hit:
+        print(f"Bundle unchanged, reused from cache: {output_file}", file=out)
+    else:
+        print(combiner.report.format_report(), file=out)
+    return 0
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        sys.exit(COMMANDS[sys.argv[1]](sys.argv[2:]))
+
+    parser = build_parser()
+    args = parser.parse_args()
+    check_compress_arguments(parser, args)
+
+    if args.daemon or os.environ.get('PYCOMBINER_DAEMON'):
+        from pycombiner.client import bundle_remote
+        status = bundle_remote(args)
+        if status is not None:
+            sys.exit(status)
+        # No daemon running: bundle in this process
+
+    setup_logging(args, args.debug)
+    sys.exit(run_bundle(args))
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main()
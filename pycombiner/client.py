@@ -0,0 +1,72 @@
+"""
+Thin client of the bundler daemon (``pycombiner serve``)
+
+Only the standard library is imported here, so a client invocation costs
+little more than interpreter startup; the bundling itself happens in the
+daemon, which keeps indexes and parse caches warm between requests.
+"""
+import json
+import os
+import socket
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# Bundle arguments holding paths; they are made absolute before leaving the client's directory
+PATH_ARGUMENTS = ('source_path', 'output_file', 'cache_dir')
+
+
+def default_socket_path() -> str:
+    """PYCOMBINER_SOCKET, or a per-user socket in the runtime (or temp) directory"""
+    path = os.environ.get('PYCOMBINER_SOCKET')
+    if path:
+        return path
+    directory = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+    return os.path.join(directory, f"pycombiner-{os.getuid()}.sock")
+
+
+def write_message(stream, message: Dict[str, Any]):
+    """Send one message: a JSON object on a single line"""
+    stream.write(json.dumps(message).encode('utf-8') + b'\n')
+    stream.flush()
+
+
+def read_message(stream) -> Optional[Dict[str, Any]]:
+    """Receive one message, or None when the peer closed the connection"""
+    line = stream.readline()
+    return json.loads(line) if line else None
+
+
+def request(message: Dict[str, Any], socket_path: Optional[str] = None, timeout: Optional[float] = None) -> Dict[str, Any]:
+    """Send a request to the daemon and wait for its response.
+
+    Raises OSError when no daemon is listening.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path or default_socket_path())
+        with sock.makefile('rwb') as stream:
+            write_message(stream, message)
+            response = read_message(stream)
+    if response is None:
+        raise ConnectionError("The daemon closed the connection without answering")
+    return response
+
+
+def bundle_remote(args, socket_path: Optional[str] = None) -> Optional[int]:
+    """Run a parsed bundle command in the daemon and print its output.
+
+    Returns the exit status, or None when no daemon is reachable so the
+    caller can bundle in-process instead.
+    """
+    arguments = dict(vars(args))
+    for name in PATH_ARGUMENTS:
+        if arguments.get(name):
+            arguments[name] = str(Path(arguments[name]).resolve())
+    try:
+        response = request({'command': 'bundle', 'args': arguments}, socket_path)
+    except OSError:
+        return None
+    sys.stdout.write(response.get('output', ''))
+    return response.get('status', 1)
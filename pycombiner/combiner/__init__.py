@@ -8,8 +8,16 @@ __version__ = "2.0.0"
 # 导入核心函数，方便外部直接访问
 from .file_handler import find_python_files, read_file
 from .ast_parser import analyze_file, build_dependency_graph
-from .merger import merge_files, topological_sort_files
+from .merger import merge_files, merge_sources, topological_sort_files
 from .combiner import PyCombiner
+from .graph import DependencyGraph
+from .index import ModuleIndex, ParseCache
+from .batch import combine_many
+from .split import split_bundles
+from .api import bundle, BundleResult
+from .cache import BundleCache
+from .classify import ImportClassifier
+from .sources import SourceProvider, LocalSource, MemorySource, ArchiveSource, GitSource
 
 __all__ = [
     "find_python_files",
@@ -17,7 +25,22 @@ __all__ = [
     "analyze_file",
     "build_dependency_graph",
     "merge_files",
+    "merge_sources",
     "topological_sort_files",
     "PyCombiner",
+    "DependencyGraph",
+    "ModuleIndex",
+    "ParseCache",
+    "combine_many",
+    "split_bundles",
+    "bundle",
+    "BundleResult",
+    "BundleCache",
+    "ImportClassifier",
+    "SourceProvider",
+    "LocalSource",
+    "MemorySource",
+    "ArchiveSource",
+    "GitSource",
     '__version__',
 ]
@@ -0,0 +1,119 @@
+"""
+Programmatic API returning bundles in memory
+"""
+import io
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, IO, List, Optional, Union
+
+from .combiner import PyCombiner
+from .graph import DependencyGraph
+from .output import MergeReport
+
+PathLike = Union[str, Path]
+
+
+@dataclass
+class BundleResult:
+    """A rendered bundle and what went into it"""
+    source: str
+    entry_file: Path
+    source_dir: Path
+    files: List[Path] = field(default_factory=list)
+    unhandled_imports: List[str] = field(default_factory=list)
+    stats: Dict[str, Any] = field(default_factory=dict)
+    graph: Optional[DependencyGraph] = None
+    report: Optional[MergeReport] = None
+    content_hash: Optional[str] = None
+    cache_hit: bool = False      # Reused from a ``cache``; files, stats and graph are then left empty
+
+    def to_bytes(self, encoding: str = 'utf-8') -> bytes:
+        """Encoded bundle source"""
+        return self.source.encode(encoding)
+
+    @property
+    def size(self) -> int:
+        """Size of the UTF-8 encoded bundle in bytes"""
+        return len(self.to_bytes())
+
+    def format_report(self) -> str:
+        """The merge report the CLI would print"""
+        return self.report.format_report() if self.report is not None else ''
+
+
+def _write_stream(stream: IO, result: BundleResult):
+    if isinstance(stream, (io.RawIOBase, io.BufferedIOBase)):
+        stream.write(result.to_bytes())
+    else:
+        stream.write(result.source)
+
+
+def bundle(
+    entry: PathLike,
+    source_dir: Optional[PathLike] = None,
+    *,
+    output_file: Optional[PathLike] = None,
+    stream: Optional[IO] = None,
+    callback: Optional[Callable[[BundleResult], None]] = None,
+    **options
+) -> BundleResult:
+    """Bundle an entry file and return the result without printing anything.
+
+    ``entry`` may be a file or a directory containing ``main.py``;
+    ``source_dir`` defaults to the entry file's directory. With a ``source``
+    provider (see sources.py) ``entry`` is relative to the provider's root
+    and ``source_dir`` is ignored. Remaining keyword arguments are passed to
+    PyCombiner (``reachable_only``, ``defer_imports``, ``reproducible``,
+    ``index``, ...).
+
+    The bundle is only written where asked: to ``output_file``, to a text or
+    binary ``stream``, and/or handed to ``callback``. With a ``cache`` (see
+    cache.BundleCache) an unchanged bundle is reused instead of rendered.
+    """
+    source = options.get('source')
+    if source is not None:
+        # Files come from a source provider; the entry is relative to its root
+        source_dir = source.root
+        entry_file = source_dir / entry
+        if not source.exists(entry_file):
+            raise FileNotFoundError(f"Entry file not found: {entry_file}")
+    else:
+        entry_file = Path(entry).resolve()
+        if entry_file.is_dir():
+            entry_file = entry_file / 'main.py'
+        if not entry_file.is_file():
+            raise FileNotFoundError(f"Entry file not found: {entry_file}")
+        source_dir = Path(source_dir).resolve() if source_dir is not None else entry_file.parent
+    output_path = Path(output_file).resolve() if output_file is not None else None
+
+    options['quiet'] = True
+    combiner = PyCombiner(entry_file, source_dir, output_path, **options)
+    cached = combiner._lookup_cached()
+    if cached is not None:
+        result = BundleResult(cached.read_bytes().decode('utf-8'), entry_file, source_dir,
+                              report=combiner.report, cache_hit=True)
+        if output_path is not None:
+            combiner.cache.materialize(cached, output_path)
+    else:
+        result = BundleResult(
+            source=combiner.render(),
+            entry_file=entry_file,
+            source_dir=source_dir,
+            files=list(combiner.merge_order),
+            unhandled_imports=list(combiner.unhandled_imports),
+            stats=dict(combiner.report.stats),
+            graph=combiner.graph,
+            report=combiner.report,
+            content_hash=combiner.content_hash,
+        )
+        combiner._store_cached(result.to_bytes())
+        if output_path is not None:
+            # Replaced, not written in place: the old output may be a hard link into the cache
+            combiner._write_output(result.to_bytes())
+
+    if stream is not None:
+        _write_stream(stream, result)
+    if callback is not None:
+        callback(result)
+    return result
+
@@ -3,10 +3,14 @@ AST Parser module for analyzing Python files and their dependencies
 """
 
 import ast
+import logging
 import os
 from typing import List, Tuple, Dict, Set, NamedTuple, Optional
 from pathlib import Path
 from dataclasses import dataclass
+from .log import get_logger
+
+logger = get_logger('ast_parser')
 
 @dataclass
 class ImportInfo:
@@ -15,26 +19,36 @@ class ImportInfo:
     name: str
     is_from_import: bool
     alias: Optional[str] = None
-def analyze_file(content: str, filepath: str) -> Tuple[List[ImportInfo], Set[str]]:
-    """Analyze a Python file and return its imports and defined names"""
+def analyze_file(content: str, filepath: str, debug: bool = True) -> Tuple[List[ImportInfo], Set[str]]:
+    """Analyze a Python file and return its imports and defined names.
+
+    Definitions and imports are logged at DEBUG level on
+    ``pycombiner.ast_parser`` when that level is enabled; ``debug`` is
+    only kept for compatibility.
+    """
     imports = []
     defined_names = set()
+    trace = logger.isEnabledFor(logging.DEBUG)
     
     try:
         tree = ast.parse(content)
-        print(f"\n[DEBUG] Analyzing file: {filepath}")
+        if trace:
+            logger.debug("Analyzing file: %s", filepath)
         
         # First pass: collect all defined names
         for node in ast.walk(tree):
             if isinstance(node, ast.FunctionDef):
                 defined_names.add(node.name)
-                print(f"[DEBUG]{('[Function definition]'):>25} \tdef {node.name}()")
+                if trace:
+                    logger.debug("%25s \tdef %s()", '[Function definition]', node.name)
             elif isinstance(node, ast.ClassDef):
                 defined_names.add(node.name)
-                print(f"[DEBUG]{('[Class definition]'):>25} \tclass {node.name}")
+                if trace:
+                    logger.debug("%25s \tclass %s", '[Class definition]', node.name)
             elif isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
                 defined_names.add(node.id)
-                print(f"[DEBUG]{('[Variable definition]'):>25} \t{node.id}")
+                if trace:
+                    logger.debug("%25s \t%s", '[Variable definition]', node.id)
         
         # Second pass: collect imports
         for node in ast.walk(tree):
@@ -47,7 +61,8 @@ def analyze_file(content: str, filepath: str) -> Tuple[List[ImportInfo], Set[str
                         alias=name.asname
                     )
                     imports.append(import_info)
-                    print(f"[DEBUG]{'[Import statement]':>25} \timport {name.name}")
+                    if trace:
+                        logger.debug("%25s \timport %s", '[Import statement]', name.name)
             elif isinstance(node, ast.ImportFrom):
                 module = node.module if node.module else ''
                 for name in node.names:
@@ -58,9 +73,10 @@ def analyze_file(content: str, filepath: str) -> Tuple[List[ImportInfo], Set[str
                         alias=name.asname
                     )
                     imports.append(import_info)
-                    print(f"[DEBUG]{('[From-import statement]'):>25} \tfrom {module} import {name.name}")
+                    if trace:
+                        logger.debug("%25s \tfrom %s import %s", '[From-import statement]', module, name.name)
     except SyntaxError as e:
-        print(f"Warning: Syntax error in {filepath}: {e}")
+        logger.warning("Syntax error in %s: %s", filepath, e)
     return imports, defined_names
 
 def _resolve_module_to_filepath(module_name: str, project_files: List[str], input_dir: str) -> str | None:
@@ -0,0 +1,189 @@
+"""
+Bundle many entry points of one source tree in a single process
+"""
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .combiner import PyCombiner
+from .graph import DependencyGraph
+from .index import ModuleIndex, ParseCache
+
+# Manifest keys passed through to PyCombiner
+MANIFEST_OPTIONS = ('reachable_only', 'defer_imports', 'measure_import_cost', 'reproducible', 'vendor',
+                    'compress', 'compress_level', 'marshal_code')
+
+
+@dataclass
+class BundleSpec:
+    """One entry file and the bundle to produce from it"""
+    entry_file: Path
+    output_file: Path
+    source_dir: Optional[Path] = None
+    options: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class BundleOutcome:
+    """Result of one bundle of a batch"""
+    spec: BundleSpec
+    elapsed: float
+    files: int = 0
+    error: Optional[BaseException] = None
+
+
+def parse_pair(pair: str, base_dir: Path) -> BundleSpec:
+    """Parse an ``entry:output`` pair; Windows drive letters are allowed on both sides"""
+    for i, char in enumerate(pair):
+        if char != ':' or i == 0 or i + 1 >= len(pair):
+            continue
+        is_drive = pair[i - 1].isalpha() and (i == 1 or pair[i - 2] == ':') and pair[i + 1] in '\\/'
+        if is_drive:
+            continue
+        entry, output = pair[:i], pair[i + 1:]
+        return BundleSpec((base_dir / entry).resolve(), (base_dir / output).resolve())
+    raise ValueError(f"Expected ENTRY:OUTPUT, got '{pair}'")
+
+
+def _load_toml(path: Path) -> Dict[str, Any]:
+    try:
+        import tomllib
+    except ImportError:
+        try:
+            import tomli as tomllib
+        except ImportError:
+            raise RuntimeError("Reading TOML manifests requires Python 3.11+ or the 'tomli' package")
+    with open(path, 'rb') as f:
+        return tomllib.load(f)
+
+
+def load_manifest(manifest: Path) -> List[BundleSpec]:
+    """Read a TOML (or JSON) manifest.
+
+    Paths are relative to the manifest's directory::
+
+        source_dir = "src"
+        reachable_only = true
+
+        [[bundle]]
+        entry = "tools/report.py"
+        output = "dist/report.py"
+    """
+    manifest = Path(manifest).resolve()
+    if manifest.suffix == '.json':
+        with open(manifest, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    else:
+        data = _load_toml(manifest)
+
+    base_dir = manifest.parent
+    defaults = {key: data[key] for key in MANIFEST_OPTIONS if key in data}
+    default_source = data.get('source_dir')
+
+    specs = []
+    for bundle in data.get('bundle', []):
+        source = bundle.get('source_dir', default_source)
+        options = dict(defaults)
+        options.update({key: bundle[key] for key in MANIFEST_OPTIONS if key in bundle})
+        specs.append(BundleSpec(
+            (base_dir / bundle['entry']).resolve(),
+            (base_dir / bundle['output']).resolve(),
+            (base_dir / source).resolve() if source else None,
+            options
+        ))
+    if not specs:
+        raise ValueError(f"No [[bundle]] entries in {manifest}")
+    return specs
+
+
+Resources = Dict[Path, Tuple[ModuleIndex, ParseCache, DependencyGraph]]
+
+# In worker processes: index, parse cache and graph of each source directory, built by the parent
+_WORKER_RESOURCES: Resources = {}
+
+
+def _init_worker(resources: Resources):
+    global _WORKER_RESOURCES
+    _WORKER_RESOURCES = resources
+
+
+def _resources(spec: BundleSpec, shared: Resources) -> Tuple[ModuleIndex, ParseCache, DependencyGraph]:
+    """Index, parse cache and graph for a spec's source directory, built on first use"""
+    resources = shared.get(spec.source_dir)
+    if resources is None:
+        index = ModuleIndex(spec.source_dir)
+        parse_cache = ParseCache(source=index.source)
+        graph = PyCombiner(spec.entry_file, spec.source_dir, None, index=index, parse_cache=parse_cache).build_graph()
+        resources = shared[spec.source_dir] = (index, parse_cache, graph)
+    # Entry files outside the tree get their node here rather than while merging
+    resources[2].add_node(str(spec.entry_file))
+    return resources
+
+
+def _combine(spec: BundleSpec, options: Dict[str, Any], shared: Optional[Resources] = None) -> BundleOutcome:
+    """Write one bundle; ``shared`` defaults to the worker process's resources"""
+    start = time.time()
+    kwargs = dict(options)
+    kwargs.update(spec.options)
+    try:
+        index, parse_cache, graph = _resources(spec, _WORKER_RESOURCES if shared is None else shared)
+        spec.output_file.parent.mkdir(parents=True, exist_ok=True)
+        combiner = PyCombiner(spec.entry_file, spec.source_dir, spec.output_file, quiet=True,
+                              index=index, parse_cache=parse_cache, graph=graph, **kwargs)
+        combiner.combine()
+    except Exception as e:
+        return BundleOutcome(spec, time.time() - start, error=e)
+    return BundleOutcome(spec, time.time() - start, len(combiner.merge_order))
+
+
+def combine_many(specs: List[BundleSpec], jobs: Optional[int] = None, **options) -> List[BundleOutcome]:
+    """Bundle every spec, sharing one module index, parse cache and dependency graph per source directory.
+
+    Specs without a source directory use their entry file's directory;
+    the given specs are not modified. Discovery and parsing happen once,
+    in this process. Merging and writing are CPU-bound, so bundles are then
+    written by up to ``jobs`` worker processes (default: one per CPU),
+    which receive the finished index, cache and graph. With a single
+    worker everything runs in this process. A failing bundle is reported
+    in its outcome and does not stop the others.
+    """
+    specs = [spec if spec.source_dir is not None else replace(spec, source_dir=spec.entry_file.parent)
+             for spec in specs]
+    # Specs of one source directory next to each other, otherwise in the given order
+    first = {}
+    for spec in specs:
+        first.setdefault(spec.source_dir, len(first))
+    ordered = sorted(range(len(specs)), key=lambda i: first[specs[i].source_dir])
+
+    workers = min(jobs or os.cpu_count() or 1, len(specs))
+    if workers <= 1:
+        shared: Resources = {}
+        outcomes = [_combine(specs[i], options, shared) for i in ordered]
+    else:
+        shared = {}
+        for spec in specs:
+            try:
+                _resources(spec, shared)
+            except Exception:
+                # Reported by the spec's own outcome
+                continue
+        # Parsed here once rather than in every worker that merges the file
+        for index, parse_cache, _ in shared.values():
+            for path in index.files:
+                try:
+                    parse_cache.parse(path)
+                except SyntaxError:
+                    continue
+        chunksize = -(-len(specs) // workers)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(shared,)) as pool:
+            outcomes = list(pool.map(_combine, [specs[i] for i in ordered], [options] * len(specs),
+                                     chunksize=chunksize))
+
+    results: List[Optional[BundleOutcome]] = [None] * len(specs)
+    for i, outcome in zip(ordered, outcomes):
+        results[i] = outcome
+    return results
@@ -0,0 +1,302 @@
+"""
+Content-addressed cache of whole bundles
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from .log import get_logger
+from .sources import SourceProvider
+
+logger = get_logger('cache')
+
+_SIZE_UNITS = {'': 1, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+
+
+def parse_size(text: str) -> int:
+    """Parse a size such as ``500M``, ``2G`` or ``1048576`` into bytes"""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMGT]?)(?:i?B)?\s*', text, re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Invalid size: {text!r}")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2).upper()])
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _file_stamp(path: Path) -> Hashable:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class _InputHashes:
+    """Current content hashes of input files, hashing only files whose stamp changed.
+
+    Stamps are remembered with the hash they had in a small JSON file per
+    source tree, so checking an unchanged file costs one stat call.
+    """
+
+    def __init__(self, memo_path: Path, read: Callable[[str], bytes], stamp: Callable[[str], Optional[Hashable]]):
+        self.memo_path = memo_path
+        self.read = read
+        self.stamp = stamp
+        self.hashes: Dict[str, Optional[str]] = {}
+        self.hashed = 0
+        self._changed = False
+        try:
+            with open(memo_path, encoding='utf-8') as f:
+                self.memo: Dict[str, List[str]] = json.load(f)
+        except (OSError, ValueError):
+            self.memo = {}
+
+    def __call__(self, name: str) -> Optional[str]:
+        if name not in self.hashes:
+            self.hashes[name] = self._current(name)
+        return self.hashes[name]
+
+    def _current(self, name: str) -> Optional[str]:
+        # Files that are gone or outside the provider's tree are a miss
+        try:
+            stamp = self.stamp(name)
+            stamp = json.dumps(stamp) if stamp is not None else None
+            remembered = self.memo.get(name)
+            if stamp is not None and remembered is not None and remembered[0] == stamp:
+                return remembered[1]
+            digest = _sha256(self.read(name))
+        except (OSError, ValueError):
+            return None
+        self.hashed += 1
+        if stamp is not None:
+            self.memo[name] = [stamp, digest]
+            self._changed = True
+        return digest
+
+    def save(self, write: Callable[[Path, bytes], None]):
+        if self._changed:
+            self.memo_path.parent.mkdir(parents=True, exist_ok=True)
+            write(self.memo_path, json.dumps(self.memo).encode('utf-8'))
+            self._changed = False
+
+
+class BundleCache:
+    """Finished bundles stored by content, shared by any number of checkouts.
+
+    Layout of ``cache_dir``::
+
+        objects/<sha256>     bundle bytes, named by their hash
+        entries/<key>.json   input sets seen for a lookup key, each with its object
+        stamps/<tree>.json   last known stamp and hash of the files of a source tree
+
+    The lookup key (see ``key``) covers the tool version, the options, the
+    entry file and the names of all files of the source tree, so it can be
+    computed without reading or parsing anything. An entry lists the files
+    that went into the bundle with their content hashes; a lookup is a hit
+    when every one of them still has the same hash. Hashes are only
+    recomputed for files whose stamp (size and modification time, or git
+    blob ID) changed since they were last hashed. Inputs from outside the
+    source tree, such as vendored packages, are recorded by absolute path
+    and read from the local filesystem. New, deleted or renamed
+    files change the key, so imports that would resolve differently never
+    reuse a stale bundle.
+
+    Hits are hard-linked (or copied across filesystems) to the output path.
+    Objects are read-only and outputs are always replaced rather than
+    written in place, so a linked output cannot corrupt the cache. With
+    ``max_size`` the least recently used objects are evicted once the
+    objects take more space than that.
+    """
+
+    max_records = 8  # Input sets kept per lookup key
+
+    def __init__(self, cache_dir: Path, max_size: Optional[int] = None):
+        self.cache_dir = Path(cache_dir)
+        self.max_size = max_size
+        self.objects_dir = self.cache_dir / 'objects'
+        self.entries_dir = self.cache_dir / 'entries'
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.entries_dir.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self.files_hashed = 0  # Input files read and hashed by lookups
+
+    @staticmethod
+    def key(version: str, options: Dict[str, Any], entry: str, files: Iterable[str]) -> str:
+        """Lookup key from the tool version, output-shaping options, entry file and source file names"""
+        digest = hashlib.sha256()
+        header = {'version': version, 'options': options, 'entry': entry}
+        digest.update(json.dumps(header, sort_keys=True).encode('utf-8'))
+        for name in sorted(files):
+            digest.update(b'\0' + name.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.entries_dir / f"{key}.json"
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest
+
+    def _load_records(self, key: str) -> List[Dict[str, Any]]:
+        try:
+            with open(self._entry_path(key), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def _write_atomic(self, path: Path, data: bytes, mode: Optional[int] = None):
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            if mode is not None:
+                os.chmod(tmp, mode)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    def _stamps_path(self, tree: str) -> Path:
+        return self.cache_dir / 'stamps' / f"{_sha256(tree.encode('utf-8'))[:32]}.json"
+
+    def _intact(self, digest: str) -> bool:
+        """Whether the object exists and still holds what was stored; a damaged one is removed"""
+        path = self._object_path(digest)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return False
+        if _sha256(data) == digest:
+            return True
+        logger.warning("Removing damaged cache object %s", path)
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        return False
+
+    def lookup(self, key: str, source: SourceProvider) -> Optional[Path]:
+        """Object of a stored bundle whose input files are unchanged, or None"""
+        # Hashed like the combiner stores them: the decoded, newline-normalized text
+        sources = _InputHashes(
+            self._stamps_path(f"{type(source).__name__}:{source.root}"),
+            lambda name: source.read_text(source.root / name).encode('utf-8'),
+            lambda name: source.stamp(source.root / name),
+        )
+        files = _InputHashes(self._stamps_path('<files>'), lambda name: Path(name).read_bytes(),
+                             lambda name: _file_stamp(Path(name)))
+
+        found = None
+        for record in self._load_records(key):
+            if not all(sources(name) == digest for name, digest in record['inputs']):
+                continue
+            if not all(files(name) == digest for name, digest in record.get('files', [])):
+                continue
+            if self._intact(record['object']):
+                found = record['object']
+                break
+        for hashes in (sources, files):
+            hashes.save(self._write_atomic)
+
+        self.files_hashed += sources.hashed + files.hashed
+        if found is None:
+            self.misses += 1
+            logger.debug("Cache miss %s", key)
+            return None
+        self.hits += 1
+        path = self._object_path(found)
+        # The modification time doubles as the last use for eviction
+        os.utime(path)
+        logger.debug("Cache hit %s -> %s (%d files hashed)", key, found, sources.hashed + files.hashed)
+        return path
+
+    def store(self, key: str, inputs: List[Tuple[str, str]], data: bytes,
+              files: Iterable[Tuple[str, str]] = ()) -> Path:
+        """Store a bundle and the ``(relative path, sha256)`` pairs it was built from.
+
+        ``files`` are ``(absolute path, sha256)`` pairs of inputs outside
+        the source tree, checked on the local filesystem.
+        """
+        digest = _sha256(data)
+        path = self._object_path(digest)
+        if path.is_file():
+            os.utime(path)
+        else:
+            self._write_atomic(path, data, 0o444)
+
+        record = {'inputs': [[name, sha] for name, sha in sorted(inputs)], 'object': digest}
+        files = [[name, sha] for name, sha in sorted(files)]
+        if files:
+            record['files'] = files
+        records = [r for r in self._load_records(key)
+                   if (r['inputs'], r.get('files', [])) != (record['inputs'], files)]
+        records.insert(0, record)
+        self._write_atomic(self._entry_path(key), json.dumps(records[:self.max_records]).encode('utf-8'))
+        self.evict()
+        return path
+
+    @staticmethod
+    def materialize(path: Path, output_file: Path):
+        """Put a cached object at ``output_file``: a hard link when possible, a copy otherwise"""
+        output_file = Path(output_file)
+        try:
+            if output_file.exists() and os.path.samefile(path, output_file):
+                return
+        except OSError:
+            pass
+        tmp = output_file.with_name(f".{output_file.name}.{os.getpid()}.tmp")
+        try:
+            os.link(path, tmp)
+        except OSError:
+            shutil.copyfile(path, tmp)
+        os.replace(tmp, output_file)
+
+    def size(self) -> int:
+        """Total size of the stored objects in bytes"""
+        return sum(entry.stat().st_size for entry in os.scandir(self.objects_dir) if not entry.name.startswith('.'))
+
+    def evict(self):
+        """Remove least recently used objects until the cache fits ``max_size``"""
+        if self.max_size is None:
+            return
+        objects = []
+        total = 0
+        for entry in os.scandir(self.objects_dir):
+            if entry.name.startswith('.'):
+                continue
+            stat = entry.stat()
+            objects.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+        if total <= self.max_size:
+            return
+        objects.sort()
+        for _, size, path in objects:
+            if total <= self.max_size:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            logger.debug("Evicted %s (%d bytes)", path, size)
+        # Entries pointing only at evicted objects are dead weight
+        for entry in os.scandir(self.entries_dir):
+            if entry.name.startswith('.'):
+                continue
+            try:
+                with open(entry.path, encoding='utf-8') as f:
+                    records = json.load(f)
+            except (OSError, ValueError):
+                records = []
+            if not any(self._object_path(r['object']).is_file() for r in records):
+                try:
+                    os.unlink(entry.path)
+                except OSError:
+                    pass
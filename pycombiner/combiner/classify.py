@@ -0,0 +1,157 @@
+"""
+Classification of imported modules by origin: stdlib, third-party, local or unknown
+"""
+import os
+import sys
+import sysconfig
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from .index import ModuleIndex
+from .log import get_logger
+
+logger = get_logger('classify')
+
+STDLIB = 'stdlib'
+THIRD_PARTY = 'third-party'
+LOCAL = 'local'
+UNKNOWN = 'unknown'
+
+# Report order
+CATEGORIES = (STDLIB, THIRD_PARTY, LOCAL, UNKNOWN)
+
+_stdlib_names: Optional[FrozenSet[str]] = None
+_installed: Dict[Tuple[str, ...], Dict[str, Tuple[str, ...]]] = {}
+
+
+def stdlib_module_names() -> FrozenSet[str]:
+    """Top-level names of the standard library of the running interpreter.
+
+    ``sys.stdlib_module_names`` on Python 3.10+; older interpreters list
+    the stdlib directory once instead.
+    """
+    global _stdlib_names
+    if _stdlib_names is None:
+        names = getattr(sys, 'stdlib_module_names', None)
+        if names is None:
+            names = set(sys.builtin_module_names)
+            paths = sysconfig.get_paths()
+            directories = {paths['stdlib'], paths['platstdlib'], os.path.join(paths['platstdlib'], 'lib-dynload')}
+            for directory in directories:
+                try:
+                    entries = os.listdir(directory)
+                except OSError:
+                    continue
+                for entry in entries:
+                    name = entry.split('.', 1)[0]
+                    if name.isidentifier() and name != 'site-packages':
+                        names.add(name)
+        _stdlib_names = frozenset(names)
+    return _stdlib_names
+
+
+def _metadata():
+    try:
+        import importlib.metadata as metadata
+    except ImportError:
+        try:
+            import importlib_metadata as metadata
+        except ImportError:
+            return None
+    return metadata
+
+
+def _top_level_names(dist) -> List[str]:
+    """Top-level importable names of a distribution without packages_distributions()"""
+    text = dist.read_text('top_level.txt')
+    if text:
+        return text.split()
+    names = set()
+    for file in dist.files or ():
+        parts = file.parts
+        if not parts or parts[0].endswith(('.dist-info', '.egg-info')) or parts[0] == '..':
+            continue
+        if len(parts) == 1:
+            if parts[0].endswith('.py'):
+                names.add(parts[0][:-3])
+        elif parts[0].isidentifier():
+            names.add(parts[0])
+    return sorted(names)
+
+
+def installed_distributions(path: Optional[Iterable[str]] = None) -> Dict[str, Tuple[str, ...]]:
+    """Top-level module names of the installed distributions, each with the distributions providing it.
+
+    The snapshot is taken once per ``path`` (``sys.path`` by default) and
+    kept for the life of the process.
+    """
+    key = tuple(path if path is not None else sys.path)
+    snapshot = _installed.get(key)
+    if snapshot is not None:
+        return snapshot
+
+    metadata = _metadata()
+    found: Dict[str, List[str]] = {}
+    if metadata is not None:
+        for dist in metadata.distributions(path=list(key)):
+            try:
+                dist_name = dist.metadata['Name']
+                names = _top_level_names(dist)
+            except Exception as e:
+                # Broken metadata must not break bundling
+                logger.debug("Skipping distribution metadata: %s", e)
+                continue
+            for name in names:
+                providers = found.setdefault(name, [])
+                if dist_name not in providers:
+                    providers.append(dist_name)
+    snapshot = {name: tuple(providers) for name, providers in found.items()}
+    _installed[key] = snapshot
+    logger.debug("Found %d top-level names in installed distributions", len(snapshot))
+    return snapshot
+
+
+class ImportClassifier:
+    """Labels imported modules as stdlib, third-party, local or unknown.
+
+    Local modules are looked up in the module index; everything else by its
+    top-level name in ``stdlib_module_names`` and in the snapshot of
+    installed distributions. Nothing touches the filesystem per import, and
+    results are cached by module name.
+    """
+
+    def __init__(self, index: Optional[ModuleIndex] = None, path: Optional[Iterable[str]] = None):
+        self.index = index
+        self.stdlib = stdlib_module_names()
+        self.distributions = installed_distributions(path)
+        self._cache: Dict[str, str] = {}
+
+    def classify(self, module: str) -> str:
+        """Category of an imported module (one of CATEGORIES)"""
+        category = self._cache.get(module)
+        if category is None:
+            top = module.partition('.')[0]
+            # A project module shadows an installed one of the same name
+            if self.index is not None and self.index.is_local(module):
+                category = LOCAL
+            elif top in self.stdlib:
+                category = STDLIB
+            elif top in self.distributions:
+                category = THIRD_PARTY
+            else:
+                category = UNKNOWN
+            self._cache[module] = category
+        return category
+
+    def distribution(self, module: str) -> Optional[str]:
+        """Name of the distribution providing a third-party module, or None"""
+        providers = self.distributions.get(module.partition('.')[0])
+        return providers[0] if providers else None
+
+    def breakdown(self, modules: Iterable[str]) -> Dict[str, List[str]]:
+        """Modules grouped by category, sorted within each; every category is present"""
+        groups: Dict[str, List[str]] = {category: [] for category in CATEGORIES}
+        for module in set(modules):
+            groups[self.classify(module)].append(module)
+        for names in groups.values():
+            names.sort()
+        return groups
@@ -1,22 +1,120 @@
 """
 Main module for PyCombiner
 """
+from array import array
 from pathlib import Path
-from typing import Dict, List, Set, Tuple
+from typing import Dict, Iterable, List, Optional, Sequence, Set, TextIO, Tuple
 import ast
+import hashlib
+import io
+import json
+import os
+import subprocess
+import sys
+from .cache import BundleCache
+from .classify import ImportClassifier
+from .compress import leading_comments, self_extracting
+from .log import get_logger
 from .output import MergeReport, print_merge_report
+from .graph import DependencyGraph
+from .index import ModuleIndex, ParseCache
+from .sources import LocalSource, SourceProvider
+from .rewriter import import_blocks, rewrite_imports
+from .prescan import scan_imports
+from .profiling import (
+    LAZY_FILE_LOADER, RunProfile, bound_names, lazy_block, lazy_functions, profile_entry, profiled_order
+)
+from .vendor import ImportRecordCache, Vendor, VendoredModule
+from .import_cost import (
+    HoistedImport, LAZY_IMPORT_HELPER, find_import_users, function_insertion_points,
+    lazy_binding, measure_import_times, parse_statement, plan_deferrals
+)
+
+logger = get_logger('combiner')
+
+def _normalize_newlines(text: str) -> str:
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+def dependency_order(forward: List[array], starts: Iterable[int], visited: Optional[bytearray] = None) -> array:
+    """Node IDs reachable from ``starts``, every node after its dependencies.
+
+    Depth-first, following each node's imports in their original order;
+    iterative so deep import chains cannot hit the recursion limit. Nodes
+    marked in ``visited`` are skipped, and newly visited ones are marked.
+    """
+    if visited is None:
+        visited = bytearray(len(forward))
+    order = array('I')
+    for start in starts:
+        if visited[start]:
+            continue
+        visited[start] = 1
+        stack = [(start, iter(forward[start]))]
+        while stack:
+            node, deps = stack[-1]
+            for dep in deps:
+                if not visited[dep]:
+                    visited[dep] = 1
+                    stack.append((dep, iter(forward[dep])))
+                    break
+            else:
+                stack.pop()
+                order.append(node)
+    return order
 
 class PyCombiner:
-    def __init__(self, entry_file: Path, source_dir: Path, output_file: Path, debug: bool = False, show_details: bool = False):
+    # Seconds allowed for measuring hoisted import times (--import-cost)
+    import_cost_timeout = 120.0
+
+    def __init__(self, entry_file: Path, source_dir: Path, output_file: Path, debug: bool = False, show_details: bool = False,
+                 defer_imports: Optional[str] = None, measure_import_cost: bool = False,
+                 reachable_only: bool = False, quiet: bool = False, reproducible: bool = False,
+                 index: Optional[ModuleIndex] = None, parse_cache: Optional[ParseCache] = None,
+                 graph: Optional[DependencyGraph] = None, source: Optional[SourceProvider] = None,
+                 cache: Optional[BundleCache] = None, vendor: Sequence[str] = (),
+                 compress: Optional[str] = None, compress_level: Optional[int] = None, marshal_code: bool = False,
+                 profile: Optional[RunProfile] = None, profile_args: Optional[Sequence[str]] = None,
+                 profile_timeout: Optional[float] = None):
         self.entry_file = entry_file
         self.source_dir = source_dir
         self.output_file = output_file
         self.debug = debug
         self.show_details = show_details
+        self.defer_imports = defer_imports
+        self.measure_import_cost = measure_import_cost
+        self.reachable_only = reachable_only
+        self.quiet = quiet
+        # Byte-identical output for identical inputs: relative paths, \n newlines and a content hash
+        self.reproducible = reproducible
+        self.content_hash: Optional[str] = None
+        # combine() reuses a cached bundle when the inputs and options are unchanged
+        self.cache = cache
+        self.cache_hit = False
+        self._bundle_key: Optional[str] = None  # Computed before rendering, which may record a profile
+        # Installed packages embedded behind an import hook instead of imported from the target's environment
+        self.vendor = sorted(set(vendor))
+        self._vendor: Optional[Vendor] = None
+        # Self-extracting output: 'zlib', 'lzma' or 'zstd', optionally holding marshalled code
+        self.compress = compress
+        self.compress_level = compress_level
+        self.marshal_code = marshal_code
+        # Recorded run of the entry file (see profiling.profile_entry): run order and lazy boundaries
+        self.profile = profile
+        # Without a profile, render() records one with these arguments (combine() only on a cache miss)
+        self.profile_args = list(profile_args) if profile_args is not None else None
+        self.profile_timeout = profile_timeout
+        self.lazy_files: List[str] = []
+        # The index, parse cache and graph may be shared between combiners of the same source directory
+        self.source = source
+        self._index = index
+        # A private cache does not keep syntax trees; files are parsed again when needed
+        self.parse_cache = parse_cache if parse_cache is not None else ParseCache(source=source, keep_trees=False)
+        self.hoisted_imports: List[HoistedImport] = []
+        self.unhandled_imports: List[str] = []
         self.report = MergeReport(entry_file, source_dir, output_file, debug, show_details)
         self.imports_by_file: Dict[str, List[str]] = {}
-        self.dependency_graph: Dict[str, List[str]] = {}
-        self.merge_order: List[Path] = []
+        self.graph = graph if graph is not None else DependencyGraph(source_dir)
+        self._merge_ids = array('I')  # Merge order as graph node IDs
         self.stats = {
             'total_imports': 0,
             'duplicate_imports': 0,
@@ -26,273 +124,549 @@ class PyCombiner:
             'classes': 0
         }
 
-    def debug_print(self, message: str):
-        """Print debug message if debug mode is enabled"""
-        if self.debug:
-            print(f"\033[33m[DEBUG]\033[0m {message}")
+    def debug_print(self, message: str, *args):
+        """Log a debug message, formatted lazily with ``args``; the logger's level decides if it is emitted"""
+        logger.debug(message, *args)
+
+    @property
+    def dependency_graph(self) -> Dict[str, List[str]]:
+        """The dependency graph as a ``{file: [imported files]}`` mapping"""
+        return self.graph.to_dict()
+
+    @property
+    def merge_order(self) -> List[Path]:
+        """Files in merge order"""
+        return [Path(self.graph.nodes[i]) for i in self._merge_ids]
+
+    @property
+    def index(self) -> ModuleIndex:
+        """Index of the Python files under the source directory, built on first use"""
+        if self._index is None:
+            self._index = ModuleIndex(self.source_dir, self.source)
+        return self._index
 
     def _is_relative_import(self, import_path: str) -> bool:
         """Check if an import is relative to the source directory"""
+        return self.index.is_local(import_path)
+
+    @property
+    def vendored_modules(self) -> List[VendoredModule]:
+        """Modules embedded by vendoring, sorted by name (see vendor.VendoredModule)"""
+        return self._vendor.modules if self._vendor is not None else []
+
+    def _select_vendored(self):
+        """Pick the modules of the vendored packages reachable from the merged files"""
+        records = ImportRecordCache(self.cache.cache_dir / 'vendor') if self.cache is not None else None
+        self._vendor = Vendor(self.vendor, records)
+        project_imports = []
+        for file_path in self.merge_order:
+            try:
+                project_imports.extend(scan_imports(self.parse_cache.read(file_path)))
+            except SyntaxError:
+                continue
+        self._vendor.select(project_imports)
+        self.debug_print("Vendoring %d modules", len(self._vendor.modules))
+        self.report.set_vendored_modules([module.name for module in self._vendor.modules])
+
+    def _classify_imports(self, merge_order: List[Path]) -> Dict[str, List[str]]:
+        """Modules imported by the merged files, grouped by origin"""
+        modules = set()
+        for file_path in merge_order:
+            try:
+                modules.update(self.parse_cache.imports(file_path))
+            except SyntaxError:
+                continue
+        return ImportClassifier(self.index).breakdown(modules)
+
+    def _file_label(self, file_path: Path) -> str:
+        """Short label for a file, relative to the source directory when possible"""
         try:
-            # Convert import path to possible file paths
-            possible_paths = []
-            
-            # Check for direct file
-            file_path = self.source_dir / import_path.replace('.', '/')
-            if file_path.suffix != '.py':
-                file_path = file_path.with_suffix('.py')
-            possible_paths.append(file_path)
-            
-            # Check for package with __init__.py
-            init_path = self.source_dir / import_path.replace('.', '/') / '__init__.py'
-            possible_paths.append(init_path)
-            
-            # Check if any of the possible paths exist in our project
-            for path in possible_paths:
-                if path.exists() and path.is_file():
-                    # Verify the file is within our source directory
-                    try:
-                        path.resolve().relative_to(self.source_dir)
-                        return True
-                    except ValueError:
-                        continue
-            
-            return False
-        except Exception:
-            return False
-
-    def _get_import_path(self, import_path: str) -> Path:
-        """Convert import path to file path"""
-        import_path = import_path.replace('.', '/')
-        if not import_path.endswith('.py'):
-            import_path += '.py'
-        return self.source_dir / import_path
+            return Path(file_path).relative_to(self.source_dir).as_posix()
+        except ValueError:
+            return str(file_path)
+
+    def _compute_content_hash(self) -> str:
+        """sha256 over the options that shape the bundle and every merged file's path and content.
+
+        Contents are hashed with normalized newlines, like they are written.
+        """
+        from . import __version__
+        digest = hashlib.sha256()
+        options = {
+            'version': __version__,
+            'entry': self._file_label(self.entry_file),
+            'defer_imports': self.defer_imports,
+            'reachable_only': self.reachable_only,
+        }
+        if self.vendor:
+            options['vendor'] = self.vendor
+        if self.compress:
+            options['compress'] = [self.compress, self.compress_level, self.marshal_code]
+            if self.marshal_code:
+                # Marshalled code only loads on the Python version that wrote it
+                options['python'] = list(sys.version_info[:2])
+        if self.profile is not None:
+            options['profile'] = self.profile.digest
+        digest.update(json.dumps(options, sort_keys=True).encode('utf-8'))
+        for file_path in self.merge_order:
+            data = _normalize_newlines(self.parse_cache.read(file_path)).encode('utf-8')
+            digest.update(f"\0{self._file_label(file_path)}\0{hashlib.sha256(data).hexdigest()}".encode('utf-8'))
+        for module in self.vendored_modules:
+            data = self._vendor.source(module).encode('utf-8')
+            digest.update(f"\0vendor:{module.name}\0{hashlib.sha256(data).hexdigest()}".encode('utf-8'))
+        return digest.hexdigest()
+
+    def _unhandled_statements(self, node: ast.AST) -> List[str]:
+        """Header statements produced by an import node for modules outside the project"""
+        if isinstance(node, ast.Import):
+            return [f"import {name.name}" for name in node.names if not self._is_relative_import(name.name)]
+        if node.module and not self._is_relative_import(node.module):
+            return [f"from {node.module} import {', '.join(n.name for n in node.names)}"]
+        return []
+
+    def _strip_local_names(self, node: ast.AST) -> Optional[str]:
+        """Rewrite decision for an import: drop what resolves inside the project, keep the rest"""
+        if isinstance(node, ast.Import):
+            kept = [alias for alias in node.names if not self._is_relative_import(alias.name)]
+            if len(kept) == len(node.names):
+                return None
+            if not kept:
+                return ''
+            return 'import ' + ', '.join(ast.unparse(alias) for alias in kept)
+        if node.module and self._is_relative_import(node.module):
+            return ''
+        return None
+
+    def _analyze_hoisted_imports(self, statements: Set[str], parsed: List[Tuple[Path, str, ast.AST]]) -> Dict[str, Dict[int, List[str]]]:
+        """Map hoisted imports to their users, measure and defer them.
+
+        Returns the lines to insert per file label and line number for imports
+        moved into functions.
+        """
+        self.hoisted_imports = []
+        for statement in sorted(statements):
+            module, names, _ = parse_statement(statement)
+            self.hoisted_imports.append(HoistedImport(statement, module, names))
+        find_import_users(((self._file_label(p), tree) for p, _, tree in parsed), self.hoisted_imports)
+
+        if self.measure_import_cost and self.hoisted_imports:
+            self.debug_print("Measuring hoisted import times...")
+            try:
+                costs = measure_import_times([imp.statement for imp in self.hoisted_imports],
+                                             timeout=self.import_cost_timeout)
+            except subprocess.TimeoutExpired as e:
+                # Costs stay unknown; the bundle itself does not depend on them
+                logger.warning("Measuring hoisted import times timed out after %s s", e.timeout)
+                costs = {}
+            for imp in self.hoisted_imports:
+                imp.cost_us = costs.get(imp.statement)
+
+        insertions: Dict[str, Dict[int, List[str]]] = {}
+        if self.defer_imports:
+            points = {}
+            for file_path, content, tree in parsed:
+                label = self._file_label(file_path)
+                for qualname, point in function_insertion_points(tree, content.split('\n')).items():
+                    points[f"{label}:{qualname}"] = point
+            plan_deferrals(self.hoisted_imports, self.defer_imports, {user: point[2] for user, point in points.items()})
+
+            for imp in self.hoisted_imports:
+                if imp.action != 'local':
+                    continue
+                user = next(iter(imp.function_users))
+                lineno, indent, _ = points[user]
+                label = user.rsplit(':', 1)[0]
+                insertions.setdefault(label, {}).setdefault(lineno, []).append(indent + imp.statement)
+                self.debug_print("Deferring '%s' into %s", imp.statement, user)
+
+        self.report.set_hoisted_imports(self.hoisted_imports)
+        return insertions
 
     def _parse_imports(self, file_path: Path) -> Tuple[List[str], Set[str]]:
         """Parse imports from a Python file and return ordered imports and unhandled imports"""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-
         try:
-            tree = ast.parse(content)
+            modules = self.parse_cache.imports(file_path)
         except SyntaxError as e:
-            self.debug_print(f"Syntax error in {file_path}: {e}")
+            self.debug_print("Syntax error in %s: %s", file_path, e)
             return [], set()
 
         ordered_imports = []  # Keep track of import order
         unhandled_imports = set()
 
-        for node in ast.walk(tree):
-            if isinstance(node, (ast.Import, ast.ImportFrom)):
-                if isinstance(node, ast.Import):
-                    for name in node.names:
-                        import_path = name.name
-                        if self._is_relative_import(import_path):
-                            ordered_imports.append(import_path)
-                        else:
-                            unhandled_imports.add(import_path)
-                else:  # ImportFrom
-                    if node.module:
-                        if self._is_relative_import(node.module):
-                            ordered_imports.append(node.module)
-                        else:
-                            unhandled_imports.add(node.module)
+        for import_path in modules:
+            if self._is_relative_import(import_path):
+                ordered_imports.append(import_path)
+            else:
+                unhandled_imports.add(import_path)
 
         return ordered_imports, unhandled_imports
 
     def _build_dependency_graph(self):
         """Build dependency graph between files based on import order"""
-        for file_path in self.source_dir.rglob('*.py'):
-            ordered_imports, _ = self._parse_imports(file_path)
-            self.dependency_graph[str(file_path)] = []
+        for file_path in self.index.files:
+            ordered_imports, unhandled_imports = self._parse_imports(file_path)
+            self.graph.add_node(str(file_path))
+            self.graph.add_external_imports(str(file_path), unhandled_imports)
             for imp in ordered_imports:
-                imp_path = self._get_import_path(imp)
-                if imp_path.exists():
-                    self.dependency_graph[str(file_path)].append(str(imp_path))
-
-    def _get_merge_order(self) -> List[Path]:
-        """Get the order to merge files based on dependencies"""
-        visited = set()
-        order = []
-
-        def visit(file_path: str):
-            if file_path in visited:
-                return
-            visited.add(file_path)
-            # Process dependencies in their original order from the file
-            for dep in self.dependency_graph.get(file_path, []):
-                visit(dep)
-            order.append(Path(file_path))
+                imp_path = self.index.resolve(imp)
+                if imp_path is not None:
+                    self.graph.add_edge(str(file_path), str(imp_path))
+
+    def build_graph(self) -> DependencyGraph:
+        """Build and return the dependency graph without merging anything"""
+        if not len(self.graph):
+            self._build_dependency_graph()
+        return self.graph
+
+    def _get_merge_order(self) -> array:
+        """Get the order to merge files based on dependencies, as graph node IDs"""
+        forward = self.graph.forward
+        visited = bytearray(len(forward) + 1)
 
         # Start with entry file
-        visit(str(self.entry_file))
+        try:
+            order = dependency_order(forward, [self.graph.node_id(str(self.entry_file))], visited)
+        except KeyError:
+            # The entry file is outside the indexed tree; merge it on its own
+            order = array('I', [self.graph.add_node(str(self.entry_file))])
+        reachable = len(order)
 
         # Add any remaining files in their original order
-        for file_path in self.source_dir.rglob('*.py'):
-            if str(file_path) not in visited:
-                visit(str(file_path))
+        if not self.reachable_only:
+            starts = (self.graph.node_id(str(file_path)) for file_path in self.index.files)
+            order.extend(dependency_order(forward, starts, visited))
+
+        if self.profile is not None:
+            labels = [self._file_label(Path(self.graph.nodes[i])) for i in order]
+            ids = dict(zip(labels, order))
+            ordered = profiled_order(labels, self._file_label(self.entry_file), reachable, self.profile)
+            order = array('I', [ids[label] for label in ordered])
 
         return order
 
-    def _merge_files(self):
-        """Merge all Python files in the correct order"""
-        with open(self.output_file, 'w', encoding='utf-8') as out:
-            # Write header
-            out.write(f"# Generated by PyCombiner\n")
+    def _plan_lazy_files(self, bound: Dict[str, Set[str]], candidates: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        """Cold files to merge behind lazy boundaries, with the functions to stub.
+
+        A file only qualifies if no other merged file binds the names of its
+        functions: loading it late would otherwise overwrite them.
+        """
+        counts: Dict[str, int] = {}
+        for names in bound.values():
+            for name in names:
+                counts[name] = counts.get(name, 0) + 1
+        return {
+            label: functions for label, functions in candidates.items()
+            if all(counts.get(name, 0) == 1 for name in functions)
+        }
+
+    def _write_header(self, out: TextIO):
+        """Write the comment block at the top of the bundle"""
+        out.write(f"# Generated by PyCombiner\n")
+        if self.reproducible:
+            self.content_hash = self._compute_content_hash()
+            out.write(f"# Entry file: {self._file_label(self.entry_file)}\n")
+            out.write(f"# Source directory: .\n")
+            out.write(f"# Content hash: sha256:{self.content_hash}\n\n")
+        else:
             out.write(f"# Entry file: {self.entry_file}\n")
             out.write(f"# Source directory: {self.source_dir}\n\n")
 
-            # Track imports to avoid duplicates
-            unhandled_imports = set()  # Only track imports that can't be resolved
-            
-            # First pass: collect all unhandled imports and update stats
-            for file_path in self.merge_order:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-
-                try:
-                    tree = ast.parse(content)
-                except SyntaxError as e:
-                    self.debug_print(f"Syntax error in {file_path}: {e}")
-                    continue
-
-                # Track imports for this file
-                file_unhandled_imports = set()
-                file_handled_imports = set()
-                info = {}
-
-                # Process imports using AST
-                for node in ast.iter_child_nodes(tree):
-                    if isinstance(node, (ast.Import, ast.ImportFrom)):
-                        self.stats['total_imports'] += 1  # 增加导入语句计数
-                        if isinstance(node, ast.Import):
-                            for name in node.names:
-                                import_path = name.name
-                                if not self._is_relative_import(import_path):
-                                    import_stmt = f"import {import_path}"
-                                    if import_stmt in unhandled_imports:
-                                        self.stats['duplicate_imports'] += 1  # 增加重复导入计数
-                                    unhandled_imports.add(import_stmt)
-                                    file_unhandled_imports.add(import_stmt)
-                                    # 保存原始导入语句
-                                    if 'unhandled_import_statements' not in info:
-                                        info['unhandled_import_statements'] = []
-                                    info['unhandled_import_statements'].append(import_stmt)
-                                else:
-                                    if import_path in file_handled_imports:
-                                        self.stats['redundant_imports'] += 1  # 增加冗余导入计数
-                                    file_handled_imports.add(import_path)
-                                    # 保存原始导入语句
-                                    if 'import_statements' not in info:
-                                        info['import_statements'] = []
-                                    info['import_statements'].append(f"import {import_path}")
-                        else:  # ImportFrom
-                            if node.module:
-                                if not self._is_relative_import(node.module):
-                                    import_stmt = f"from {node.module} import {', '.join(n.name for n in node.names)}"
-                                    if import_stmt in unhandled_imports:
-                                        self.stats['duplicate_imports'] += 1  # 增加重复导入计数
-                                    unhandled_imports.add(import_stmt)
-                                    file_unhandled_imports.add(import_stmt)
-                                    # 保存原始导入语句
-                                    if 'unhandled_import_statements' not in info:
-                                        info['unhandled_import_statements'] = []
-                                    info['unhandled_import_statements'].append(import_stmt)
-                                else:
-                                    if node.module in file_handled_imports:
-                                        self.stats['redundant_imports'] += 1  # 增加冗余导入计数
-                                    file_handled_imports.add(node.module)
-                                    # 保存原始导入语句
-                                    if 'import_statements' not in info:
-                                        info['import_statements'] = []
-                                    info['import_statements'].append(f"from {node.module} import {', '.join(n.name for n in node.names)}")
-
-                # Update file info in report
-                self.report.add_file_info(
-                    file_path,
-                    len(content.split('\n')),
-                    file_handled_imports,
-                    file_unhandled_imports,
-                    info
-                )
-
-            # Write all unhandled imports at the beginning
-            for imp in sorted(unhandled_imports):
-                out.write(imp + '\n')
-            out.write('\n')
-
-            # Second pass: write file contents
-            for idx, file_path in enumerate(self.merge_order, 1):
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
+    def _write_preamble(self, out: TextIO):
+        """Write code that runs after the hoisted imports and before the first file; nothing by default"""
 
-                try:
-                    tree = ast.parse(content)
-                except SyntaxError as e:
-                    self.debug_print(f"Syntax error in {file_path}: {e}")
-                    continue
+    def _merge_files(self, out: TextIO):
+        """Merge all Python files in the correct order into a text stream"""
+        self._write_header(out)
 
-                # Write file header
-                out.write(f"\n#{'='*80}\n")
-                out.write(f"# [{idx}] {file_path.name} : {file_path}\n")
-                out.write(f"#{'='*80}\n\n")
-
-                # Get the line numbers of handled imports to skip
-                handled_import_lines = set()
-                for node in ast.iter_child_nodes(tree):
-                    if isinstance(node, (ast.Import, ast.ImportFrom)):
-                        if isinstance(node, ast.Import):
-                            for name in node.names:
-                                if self._is_relative_import(name.name):
-                                    handled_import_lines.add(node.lineno)
-                        else:  # ImportFrom
-                            if node.module and self._is_relative_import(node.module):
-                                handled_import_lines.add(node.lineno)
-                                # Also skip the 'from' line
-                                handled_import_lines.add(node.lineno - 1)
-
-                # Write content, skipping only handled import lines
-                lines = content.split('\n')
-                for i, line in enumerate(lines, 1):
-                    if i not in handled_import_lines:
-                        out.write(line + '\n')
-
-                # Update stats
-                for node in ast.iter_child_nodes(tree):
-                    if isinstance(node, ast.FunctionDef):
-                        self.stats['functions'] += 1
-                    elif isinstance(node, ast.ClassDef):
-                        self.stats['classes'] += 1
+        # Track imports to avoid duplicates
+        unhandled_imports = set()  # Only track imports that can't be resolved
+        analyze = bool(self.defer_imports or self.measure_import_cost)
+        parsed = []  # Parsed files, only kept for the hoisted import analysis
+        bound = {}  # Per file label: top-level names, to find files safe to load lazily
+        lazy_candidates = {}
+        entry_label = self._file_label(self.entry_file)
+        plans = []  # Per file: blocks with imports and header statements of top-level imports
 
-    def combine(self):
-        """Combine all Python files into a single file"""
+        # First pass: collect all unhandled imports, update stats and plan what to skip.
+        # Syntax trees are dropped after each file; the second pass only needs the plan.
+        for file_path in self.merge_order:
+            try:
+                tree = self.parse_cache.parse(file_path)
+            except SyntaxError as e:
+                self.debug_print("Syntax error in %s: %s", file_path, e)
+                continue
+            content = self.parse_cache.read(file_path)
+            if analyze:
+                parsed.append((file_path, content, tree))
+            if self.profile is not None:
+                label = self._file_label(file_path)
+                bound[label] = bound_names(tree, self._is_relative_import)
+                functions = lazy_functions(tree) if label != entry_label and not self.profile.is_hot(label) else None
+                if functions:
+                    lazy_candidates[label] = functions
+
+            # Track imports for this file
+            file_unhandled_imports = set()
+            file_handled_imports = set()
+            info = {}
+            header_imports = {}
+
+            # Process imports using AST
+            for node in ast.iter_child_nodes(tree):
+                if isinstance(node, ast.FunctionDef):
+                    self.stats['functions'] += 1
+                elif isinstance(node, ast.ClassDef):
+                    self.stats['classes'] += 1
+                elif isinstance(node, (ast.Import, ast.ImportFrom)):
+                    self.stats['total_imports'] += 1  # 增加导入语句计数
+                    if isinstance(node, ast.Import):
+                        for name in node.names:
+                            import_path = name.name
+                            if not self._is_relative_import(import_path):
+                                import_stmt = f"import {import_path}"
+                                if import_stmt in unhandled_imports:
+                                    self.stats['duplicate_imports'] += 1  # 增加重复导入计数
+                                unhandled_imports.add(import_stmt)
+                                file_unhandled_imports.add(import_stmt)
+                                # 保存原始导入语句
+                                if 'unhandled_import_statements' not in info:
+                                    info['unhandled_import_statements'] = []
+                                info['unhandled_import_statements'].append(import_stmt)
+                            else:
+                                if import_path in file_handled_imports:
+                                    self.stats['redundant_imports'] += 1  # 增加冗余导入计数
+                                file_handled_imports.add(import_path)
+                                # 保存原始导入语句
+                                if 'import_statements' not in info:
+                                    info['import_statements'] = []
+                                info['import_statements'].append(f"import {import_path}")
+                    else:  # ImportFrom
+                        if node.module:
+                            if not self._is_relative_import(node.module):
+                                import_stmt = f"from {node.module} import {', '.join(n.name for n in node.names)}"
+                                if import_stmt in unhandled_imports:
+                                    self.stats['duplicate_imports'] += 1  # 增加重复导入计数
+                                unhandled_imports.add(import_stmt)
+                                file_unhandled_imports.add(import_stmt)
+                                # 保存原始导入语句
+                                if 'unhandled_import_statements' not in info:
+                                    info['unhandled_import_statements'] = []
+                                info['unhandled_import_statements'].append(import_stmt)
+                            else:
+                                if node.module in file_handled_imports:
+                                    self.stats['redundant_imports'] += 1  # 增加冗余导入计数
+                                file_handled_imports.add(node.module)
+                                # 保存原始导入语句
+                                if 'import_statements' not in info:
+                                    info['import_statements'] = []
+                                info['import_statements'].append(f"from {node.module} import {', '.join(n.name for n in node.names)}")
+
+                    statements = self._unhandled_statements(node)
+                    if statements:
+                        header_imports[id(node)] = statements
+
+            plans.append((file_path, import_blocks(tree), header_imports))
+
+            # Update file info in report
+            self.report.add_file_info(
+                file_path,
+                content.count('\n') + 1,
+                file_handled_imports,
+                file_unhandled_imports,
+                info
+            )
+
+        # Analyze hoisted imports and decide which ones to defer
+        insertions = {}
+        if analyze:
+            insertions = self._analyze_hoisted_imports(unhandled_imports, parsed)
+            del parsed
+        lazy = self._plan_lazy_files(bound, lazy_candidates) if lazy_candidates else {}
+        self.lazy_files = list(lazy)
+        if self.profile is not None:
+            hot = [label for label in bound if self.profile.is_hot(label)]
+            self.report.set_profiled_files(hot, self.lazy_files)
+        deferred = {imp.statement for imp in self.hoisted_imports if imp.action}
+        lazy_imports = [imp for imp in self.hoisted_imports if imp.action == 'lazy']
+
+        # The import hook serving vendored packages goes before the imports it serves
+        if self.vendored_modules:
+            out.write(self._vendor.render() + '\n')
+
+        # Write all unhandled imports at the beginning
+        self.unhandled_imports = sorted(unhandled_imports)
+        for imp in self.unhandled_imports:
+            if imp not in deferred:
+                out.write(imp + '\n')
+        out.write('\n')
+        if lazy_imports:
+            out.write(LAZY_IMPORT_HELPER + '\n')
+            for imp in lazy_imports:
+                out.write(lazy_binding(imp) + '\n')
+            out.write('\n')
+        if lazy:
+            out.write(LAZY_FILE_LOADER + '\n')
+        self._write_preamble(out)
+
+        # Second pass: write file contents
+        for idx, (file_path, blocks, header_imports) in enumerate(plans, 1):
+            label = self._file_label(file_path)
+            file_insertions = insertions.get(label, {})
+
+            # Write file header
+            out.write(f"\n#{'='*80}\n")
+            shown_path = label if self.reproducible else file_path
+            out.write(f"# [{idx}] {file_path.name} : {shown_path}{' (lazy)' if label in lazy else ''}\n")
+            out.write(f"#{'='*80}\n\n")
+
+            def decide(node: ast.AST, header_imports=header_imports) -> Optional[str]:
+                # Imports moved out of the header are removed from the body as well
+                statements = header_imports.get(id(node))
+                if deferred and statements and any(stmt in deferred for stmt in statements):
+                    if all(stmt in deferred for stmt in statements):
+                        return ''
+                    # ``import a, b`` with only some modules deferred: keep the others
+                    kept = [alias for alias in node.names if not self._is_relative_import(alias.name)
+                            and f"import {alias.name}" not in deferred]
+                    return 'import ' + ', '.join(ast.unparse(alias) for alias in kept)
+                return self._strip_local_names(node)
+
+            # Write content with handled imports cut out by their exact spans
+            content = self.parse_cache.read(file_path)
+            text = rewrite_imports(content, blocks, decide, file_insertions)
+            if self.reproducible:
+                text = _normalize_newlines(text)
+            if label in lazy:
+                # Not used by the profiled run: defined on the first call of one of its functions
+                text = lazy_block(str(shown_path), text, lazy[label])
+            out.write(text + '\n')
+
+    def render(self) -> str:
+        """Build the bundle and return its source without writing anything.
+
+        A combiner renders once; create a new one (sharing the index and
+        parse cache if needed) for another run.
+        """
         self.debug_print("Starting file combination process...")
+        if self.profile is None and self.profile_args is not None:
+            self.profile = self._run_profile()
         
         # Build dependency graph
         self.debug_print("Building dependency graph...")
-        self._build_dependency_graph()
-        self.report.set_dependency_graph(self.dependency_graph)
+        self.build_graph()
+        self.report.set_dependency_graph(self.graph)
 
         # Get merge order
         self.debug_print("Determining merge order...")
-        self.merge_order = self._get_merge_order()
+        self._merge_ids = self._get_merge_order()
         self.report.set_merge_order(self.merge_order)
 
+        if self.vendor:
+            self.debug_print("Selecting vendored modules...")
+            self._select_vendored()
+
         # Process each file for report
         self.debug_print("Processing files...")
         for file_path in self.merge_order:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                lines = len(f.readlines())
+            lines = len(self.parse_cache.read(file_path).splitlines())
             self.report.add_file_info(file_path, lines, set(), set())  # Empty sets as imports are handled in _merge_files
 
         # Merge files
         self.debug_print("Merging files...")
-        self._merge_files()
+        buffer = io.StringIO()
+        self._merge_files(buffer)
+
+        # Only the report shows the origins: classify when it is formatted
+        merge_order = list(self.merge_order)
+        self.report.set_import_classes(lambda: self._classify_imports(merge_order))
 
         # Update report
         self.debug_print("Updating report...")
         self.report.update_stats(self.stats)
 
+        source = buffer.getvalue()
+        if self.compress:
+            self.debug_print("Compressing bundle with %s...", self.compress)
+            source = self_extracting(source, self.compress, self.compress_level, self.marshal_code,
+                                     f"<bundle:{self._file_label(self.entry_file)}>", leading_comments(source))
+        return source
+
+    def _cache_key(self) -> str:
+        """Bundle cache key: version, options, entry file and the names of all indexed files"""
+        from . import __version__
+        options = {
+            'defer_imports': self.defer_imports,
+            'reachable_only': self.reachable_only,
+            'reproducible': self.reproducible,
+            'vendor': self.vendor,
+            'compress': [self.compress, self.compress_level, self.marshal_code] if self.compress else None,
+            # Marshalled code only loads on the Python version that wrote it
+            'python': list(sys.version_info[:2]) if self.compress and self.marshal_code else None,
+            # A requested run is keyed by its arguments, so a cache hit does not run the program
+            'profile': self.profile.digest if self.profile is not None else (
+                {'args': self.profile_args} if self.profile_args is not None else None),
+            # Outside reproducible mode the header holds absolute paths
+            'location': None if self.reproducible else [str(self.entry_file), str(self.source_dir)],
+        }
+        return BundleCache.key(__version__, options, self._file_label(self.entry_file), self.index.names)
+
+    def _run_profile(self) -> RunProfile:
+        """Profile one run of the entry file with ``profile_args`` (see profiling.profile_entry)"""
+        if not isinstance(self.index.source, LocalSource):
+            raise ValueError("A profiling run needs the sources as a directory on disk")
+        self.debug_print("Profiling a run of %s...", self.entry_file)
+        try:
+            return profile_entry(self.entry_file, self.source_dir, self.profile_args, self.profile_timeout)
+        except subprocess.TimeoutExpired:
+            raise RuntimeError(f"Profiling run of {self.entry_file} did not finish within {self.profile_timeout:g} s")
+
+    def _write_output(self, data: bytes):
+        # Replace instead of writing in place: the old output may be a hard link into the cache
+        tmp = Path(self.output_file).with_name(f".{Path(self.output_file).name}.{os.getpid()}.tmp")
+        with open(tmp, 'wb') as out:
+            out.write(data)
+        os.replace(tmp, self.output_file)
+
+    def _lookup_cached(self) -> Optional[Path]:
+        """Object of a cached bundle of the unchanged inputs, or None (always without a cache)"""
+        if self.cache is None:
+            return None
+        self._bundle_key = self._cache_key()
+        cached = self.cache.lookup(self._bundle_key, self.index.source)
+        self.cache_hit = cached is not None
+        return cached
+
+    def _store_cached(self, data: bytes):
+        """Store a rendered bundle in the cache, if there is one"""
+        if self.cache is None:
+            return
+        if self._bundle_key is None:
+            self._bundle_key = self._cache_key()
+        inputs = [
+            (self._file_label(path), hashlib.sha256(self.parse_cache.read(path).encode('utf-8')).hexdigest())
+            for path in self.merge_order
+        ]
+        # Vendored files are checked by absolute path, so upgrading a package invalidates the bundle
+        files = [
+            (str(module.path), hashlib.sha256(module.path.read_bytes()).hexdigest())
+            for module in self.vendored_modules
+        ]
+        self.cache.store(self._bundle_key, inputs, data, files)
+
+    def combine(self):
+        """Combine all Python files into a single file"""
+        cached = self._lookup_cached()
+        if cached is not None:
+            self.cache.materialize(cached, self.output_file)
+            if not self.quiet:
+                print(f"Bundle unchanged, reused from cache: {self.output_file}")
+            return
+
+        data = self.render().encode('utf-8')
+        self._write_output(data)
+        self._store_cached(data)
+
         # Print report
-        self.debug_print("Printing report...")
-        print_merge_report(self.report) 
\ No newline at end of file
+        if not self.quiet:
+            self.debug_print("Printing report...")
+            print_merge_report(self.report) 
\ No newline at end of file
@@ -0,0 +1,138 @@
+"""
+Compressed self-extracting bundles
+
+The merged source (or its marshalled code object) is compressed, encoded
+with base85 and wrapped in a stub of a few lines that decompresses it in
+memory and executes it in the stub's own namespace. Nothing is written to
+disk at run time.
+"""
+import base64
+import marshal
+import re
+import sys
+import zlib
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+
+class Codec(NamedTuple):
+    """A compression method: its runtime module, level range and compressor"""
+    module: str               # Imported by the stub to decompress
+    default_level: int
+    levels: range
+    compress: Callable[[bytes, int], bytes]
+
+
+def _lzma_compress(data: bytes, level: int) -> bytes:
+    import lzma
+    return lzma.compress(data, preset=level)
+
+
+def _zstd_compress(data: bytes, level: int) -> bytes:
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd compression requires the 'zstandard' package")
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+CODECS: Dict[str, Codec] = {
+    'zlib': Codec('zlib', 9, range(0, 10), lambda data, level: zlib.compress(data, level)),
+    'lzma': Codec('lzma', 9, range(0, 10), _lzma_compress),
+    'zstd': Codec('zstandard', 19, range(1, 23), _zstd_compress),
+}
+
+# Expression decompressing ``_pycombiner_data`` per method, in the stub's terms
+_DECOMPRESS = {
+    'zlib': "_pycombiner_codec.decompress(_pycombiner_data)",
+    'lzma': "_pycombiner_codec.decompress(_pycombiner_data)",
+    'zstd': "_pycombiner_codec.ZstdDecompressor().decompress(_pycombiner_data)",
+}
+
+_LINE_WIDTH = 96
+
+
+def compress_payload(data: bytes, method: str = 'zlib', level: Optional[int] = None) -> bytes:
+    """Compress ``data`` with a method of CODECS, at its default level unless ``level`` is given"""
+    if method not in CODECS:
+        raise ValueError(f"Unknown compression method '{method}' (expected one of {', '.join(CODECS)})")
+    codec = CODECS[method]
+    level = codec.default_level if level is None else level
+    if level not in codec.levels:
+        raise ValueError(f"{method} levels go from {codec.levels.start} to {codec.levels.stop - 1}, got {level}")
+    return codec.compress(data, level)
+
+
+def decompress_payload(data: bytes, method: str) -> bytes:
+    """Reverse compress_payload, like the stub does at run time"""
+    if method == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("zstd decompression requires the 'zstandard' package")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return __import__(CODECS[method].module).decompress(data)
+
+
+_STUB_INFO = re.compile(r"^# Compressed: (\w+), \d+ -> \d+ bytes(, marshalled code)?$", re.M)
+_STUB_DATA = re.compile(r"^_pycombiner_data = _pycombiner_base64\.b85decode\(\n((?:    '[^'\n]*'\n)*)\)$", re.M)
+
+
+def split_stub(text: str) -> Optional[Tuple[str, bool, str]]:
+    """(method, marshalled, base85 payload) of a self-extracting bundle, or None for a plain one"""
+    info, data = _STUB_INFO.search(text), _STUB_DATA.search(text)
+    if info is None or data is None or info.group(1) not in CODECS:
+        return None
+    encoded = ''.join(line.strip()[1:-1] for line in data.group(1).splitlines())
+    return info.group(1), info.group(2) is not None, encoded
+
+
+def self_extracting(source: str, method: str = 'zlib', level: Optional[int] = None, marshal_code: bool = False,
+                    filename: str = '<bundle>', header: str = '') -> str:
+    """Wrap a bundle's source in a stub that decompresses and runs it.
+
+    With ``marshal_code`` the payload is the compiled code object instead of
+    the source, which skips compiling at start-up but only loads on the
+    Python version that built it. ``header`` (comment lines) is copied to
+    the top of the stub.
+    """
+    if marshal_code:
+        payload = marshal.dumps(compile(source, filename, 'exec'))
+    else:
+        payload = source.encode('utf-8')
+    compressed = compress_payload(payload, method, level)
+    encoded = base64.b85encode(compressed).decode('ascii')
+
+    lines = ["# Generated by PyCombiner"] if not header else header.rstrip('\n').split('\n')
+    lines.append(f"# Compressed: {method}, {len(payload)} -> {len(compressed)} bytes"
+                 f"{', marshalled code' if marshal_code else ''}")
+    lines.append("import base64 as _pycombiner_base64")
+    lines.append(f"import {CODECS[method].module} as _pycombiner_codec")
+    if marshal_code:
+        lines.append("import marshal as _pycombiner_marshal")
+        lines.append("import sys as _pycombiner_sys")
+        version = tuple(sys.version_info[:2])
+        lines.append(f"if _pycombiner_sys.version_info[:2] != {version!r}:")
+        lines.append(f"    raise ImportError('This bundle holds code compiled for Python {version[0]}.{version[1]}')")
+    # base85 has no quotes or backslashes, so the chunks are plain string literals
+    lines.append("_pycombiner_data = _pycombiner_base64.b85decode(")
+    for start in range(0, max(len(encoded), 1), _LINE_WIDTH):
+        lines.append(f"    '{encoded[start:start + _LINE_WIDTH]}'")
+    lines.append(")")
+    lines.append(f"_pycombiner_data = {_DECOMPRESS[method]}")
+    if marshal_code:
+        lines.append("_pycombiner_code = _pycombiner_marshal.loads(_pycombiner_data)")
+    else:
+        lines.append(f"_pycombiner_code = compile(_pycombiner_data, {filename!r}, 'exec')")
+    lines.append("del _pycombiner_data")
+    lines.append("exec(_pycombiner_code)")
+    return '\n'.join(lines) + '\n'
+
+
+def leading_comments(source: str) -> str:
+    """The comment block at the top of a bundle (its header)"""
+    lines = []
+    for line in source.split('\n'):
+        if not line.startswith('#'):
+            break
+        lines.append(line)
+    return '\n'.join(lines)
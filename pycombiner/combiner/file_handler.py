@@ -4,17 +4,28 @@ File handling utilities for the Python file combiner
 
 import os
 import fnmatch
-import chardet
 from typing import List, Optional, Set
 from pathlib import Path
+from .log import get_logger
+from .sources import SourceProvider
 
-def find_python_files(source_dir: Path, exclude_patterns: Optional[List[str]] = None) -> List[Path]:
-    """Find all Python files in the source directory"""
+logger = get_logger('file_handler')
+
+def find_python_files(source_dir: Path, exclude_patterns: Optional[List[str]] = None,
+                      source: Optional[SourceProvider] = None) -> List[Path]:
+    """Find all Python files in the source directory (or in a source provider)"""
     if exclude_patterns is None:
         exclude_patterns = []
         
     python_files = []
     exclude_set = set(exclude_patterns)
+
+    if source is not None:
+        for file_path in source.files('.py'):
+            relative_path = Path(source.relative(file_path))
+            if not any(fnmatch.fnmatch(str(relative_path), pattern) for pattern in exclude_set):
+                python_files.append(relative_path)
+        return python_files
     
     for root, _, files in os.walk(source_dir):
         for file in files:
@@ -34,8 +45,20 @@ def find_python_files(source_dir: Path, exclude_patterns: Optional[List[str]] =
                     
     return python_files
 
-def read_file(file_path: Path) -> Optional[str]:
+def read_file(file_path: Path, source: Optional[SourceProvider] = None) -> Optional[str]:
     """Read file contents with proper encoding handling"""
+    if source is not None:
+        try:
+            data = source.read_bytes(file_path)
+        except Exception as e:
+            logger.error("Error reading file %s: %s", file_path, e)
+            return None
+        try:
+            text = data.decode('utf-8')
+        except UnicodeDecodeError:
+            text = data.decode('latin-1')
+        # Same line breaks as a file opened in text mode
+        return text.replace('\r\n', '\n').replace('\r', '\n')
     try:
         # Try UTF-8 first
         with open(file_path, 'r', encoding='utf-8') as f:
@@ -46,10 +69,10 @@ def read_file(file_path: Path) -> Optional[str]:
             with open(file_path, 'r', encoding='latin-1') as f:
                 return f.read()
         except Exception as e:
-            print(f"Error reading file {file_path}: {e}")
+            logger.error("Error reading file %s: %s", file_path, e)
             return None
     except Exception as e:
-        print(f"Error reading file {file_path}: {e}")
+        logger.error("Error reading file %s: %s", file_path, e)
         return None
 
 def find_python_files_old(directory: str, exclude_patterns: List[str]) -> List[str]:
@@ -98,6 +121,9 @@ def read_file_old(filepath: str) -> str:
         IOError: 如果读取文件时发生其他 I/O 错误。
         UnicodeDecodeError: 如果文件内容无法用常见编码解码。
     """
+    # chardet is slow to import and only needed here
+    import chardet
+
     try:
         with open(filepath, 'rb') as f:
             raw_data = f.read()
@@ -0,0 +1,231 @@
+"""
+Dependency graph model with compact integer node IDs
+"""
+import json
+import sys
+from array import array
+from collections import deque
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from .ast_parser import get_module_name
+
+
+_NO_IMPORTS: FrozenSet[str] = frozenset()
+
+
+class DependencyGraph:
+    """Import graph between project files.
+
+    Every file gets a compact integer ID in insertion order. Edges are kept
+    twice, as forward (file -> files it imports) and reverse (file -> files
+    importing it) adjacency lists indexed by ID, so both directions can be
+    queried without rebuilding anything. Adjacency lists are ``array('I')``
+    and node keys and module names are interned, which keeps graphs of tens
+    of thousands of files small.
+    """
+
+    def __init__(self, source_dir: Optional[Path] = None):
+        self.source_dir = Path(source_dir) if source_dir is not None else None
+        self.nodes: List[str] = []
+        self.forward: List[array] = []
+        self.reverse: List[array] = []
+        self.external_imports: List[FrozenSet[str]] = []
+        self._ids: Dict[str, int] = {}
+        self._labels: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def from_dict(cls, mapping: Dict[str, Iterable[str]], source_dir: Optional[Path] = None) -> 'DependencyGraph':
+        """Build a graph from a ``{file: [imported files]}`` mapping"""
+        graph = cls(source_dir)
+        for node in mapping:
+            graph.add_node(node)
+        for node, deps in mapping.items():
+            for dep in deps:
+                graph.add_edge(node, dep)
+        return graph
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __contains__(self, name: str) -> bool:
+        try:
+            self.node_id(name)
+        except KeyError:
+            return False
+        return True
+
+    @property
+    def edge_count(self) -> int:
+        return sum(len(deps) for deps in self.forward)
+
+    def add_node(self, key: str) -> int:
+        """Add a node if needed and return its ID"""
+        key = str(key)
+        node_id = self._ids.get(key)
+        if node_id is None:
+            key = sys.intern(key)
+            node_id = len(self.nodes)
+            self._ids[key] = node_id
+            self.nodes.append(key)
+            self.forward.append(array('I'))
+            self.reverse.append(array('I'))
+            self.external_imports.append(_NO_IMPORTS)
+            self._labels = None
+        return node_id
+
+    def add_edge(self, src: str, dst: str):
+        """Add an import edge, ignoring duplicates"""
+        src_id = self.add_node(src)
+        dst_id = self.add_node(dst)
+        if dst_id not in self.forward[src_id]:
+            self.forward[src_id].append(dst_id)
+            self.reverse[dst_id].append(src_id)
+
+    def add_external_imports(self, key: str, modules: Iterable[str]):
+        """Record imports of a file that do not resolve inside the project"""
+        node_id = self.add_node(key)
+        modules = frozenset(sys.intern(m) for m in modules)
+        if modules:
+            self.external_imports[node_id] = self.external_imports[node_id] | modules
+
+    def label(self, node_id: int) -> str:
+        """Dotted module name of a node, relative to the source directory"""
+        path = self.nodes[node_id]
+        if self.source_dir is None:
+            return path
+        return get_module_name(Path(path), self.source_dir)
+
+    def node_id(self, name: str) -> int:
+        """Look up a node by file path, relative path or module name"""
+        name = str(name)
+        if name in self._ids:
+            return self._ids[name]
+        if self.source_dir is not None:
+            candidate = str(self.source_dir / name)
+            if candidate in self._ids:
+                return self._ids[candidate]
+        if self._labels is None:
+            self._labels = {self.label(i): i for i in range(len(self.nodes))}
+        if name in self._labels:
+            return self._labels[name]
+        raise KeyError(f"Unknown module: {name}")
+
+    def to_dict(self) -> Dict[str, List[str]]:
+        """Convert back to the ``{file: [imported files]}`` mapping"""
+        return {
+            self.nodes[i]: [self.nodes[j] for j in deps]
+            for i, deps in enumerate(self.forward)
+        }
+
+    def dependencies(self, name: str) -> List[str]:
+        """Files imported directly by ``name``"""
+        return [self.nodes[i] for i in self.forward[self.node_id(name)]]
+
+    def reverse_dependencies(self, name: str) -> List[str]:
+        """Files that import ``name`` directly"""
+        return [self.nodes[i] for i in self.reverse[self.node_id(name)]]
+
+    def _reachable_ids(self, start: int, reverse: bool = False) -> List[int]:
+        adjacency = self.reverse if reverse else self.forward
+        seen = {start}
+        order = []
+        queue = deque([start])
+        while queue:
+            current = queue.popleft()
+            for nxt in adjacency[current]:
+                if nxt not in seen:
+                    seen.add(nxt)
+                    order.append(nxt)
+                    queue.append(nxt)
+        return order
+
+    def transitive_closure(self, name: str, reverse: bool = False) -> List[str]:
+        """All files reachable from ``name`` (or reaching it when ``reverse``), in BFS order"""
+        return [self.nodes[i] for i in self._reachable_ids(self.node_id(name), reverse)]
+
+    def shortest_path(self, src: str, dst: str) -> Optional[List[str]]:
+        """Shortest import chain from ``src`` to ``dst``, or None if there is none"""
+        start, goal = self.node_id(src), self.node_id(dst)
+        parents = {start: None}
+        queue = deque([start])
+        while queue:
+            current = queue.popleft()
+            if current == goal:
+                path = []
+                while current is not None:
+                    path.append(self.nodes[current])
+                    current = parents[current]
+                return path[::-1]
+            for nxt in self.forward[current]:
+                if nxt not in parents:
+                    parents[nxt] = current
+                    queue.append(nxt)
+        return None
+
+    def fan_in_ranking(self, limit: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Files sorted by how many files import them"""
+        ranking = sorted(
+            ((self.nodes[i], len(deps)) for i, deps in enumerate(self.reverse)),
+            key=lambda item: (-item[1], item[0])
+        )
+        return ranking[:limit] if limit is not None else ranking
+
+    def importers_of(self, package: str, root: Optional[str] = None) -> List[Tuple[str, List[str]]]:
+        """Files importing an external package, each with its import chain from ``root``.
+
+        A file matches when it imports ``package`` or one of its submodules.
+        When ``root`` is given only files reachable from it are returned.
+        """
+        prefix = package + '.'
+        if root is not None:
+            root_id = self.node_id(root)
+            candidates = [root_id] + self._reachable_ids(root_id)
+        else:
+            candidates = range(len(self.nodes))
+
+        result = []
+        for node_id in candidates:
+            modules = self.external_imports[node_id]
+            if any(m == package or m.startswith(prefix) for m in modules):
+                node = self.nodes[node_id]
+                chain = self.shortest_path(root, node) if root is not None else [node]
+                result.append((node, chain))
+        return result
+
+    def adjacency_matrix(self) -> List[List[int]]:
+        """Dense 0/1 adjacency matrix in node ID order"""
+        size = len(self.nodes)
+        matrix = [[0] * size for _ in range(size)]
+        for i, deps in enumerate(self.forward):
+            for j in deps:
+                matrix[i][j] = 1
+        return matrix
+
+    def to_dot(self, name: str = 'dependencies') -> str:
+        """Export the graph in Graphviz DOT format"""
+        lines = [f'digraph "{name}" {{', '    node [shape=box];']
+        for i in range(len(self.nodes)):
+            lines.append(f'    n{i} [label="{self.label(i)}"];')
+        for i, deps in enumerate(self.forward):
+            for j in deps:
+                lines.append(f'    n{i} -> n{j};')
+        lines.append('}')
+        return '\n'.join(lines) + '\n'
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        """Export nodes, edges and external imports as JSON"""
+        data = {
+            'source_dir': str(self.source_dir) if self.source_dir is not None else None,
+            'nodes': [
+                {
+                    'id': i,
+                    'path': self.nodes[i],
+                    'module': self.label(i),
+                    'external_imports': sorted(self.external_imports[i]),
+                }
+                for i in range(len(self.nodes))
+            ],
+            'edges': [[i, j] for i, deps in enumerate(self.forward) for j in deps],
+        }
+        return json.dumps(data, indent=indent, ensure_ascii=False)
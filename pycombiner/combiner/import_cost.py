@@ -0,0 +1,234 @@
+"""
+Cost analysis for the third-party imports hoisted into the bundle header
+"""
+import ast
+import subprocess
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+MODULE_SCOPE = '<module>'
+MARKER = '@@pycombiner-import '
+
+# Header helper emitted into bundles that use lazy imports
+LAZY_IMPORT_HELPER = '''class _PyCombinerLazyModule:
+    """Import a module on first attribute access and rebind the global name"""
+    def __init__(self, module, name, namespace):
+        self.__dict__.update(_module=module, _name=name, _namespace=namespace)
+
+    def __getattr__(self, attr):
+        module = __import__(self._module)
+        self._namespace[self._name] = module
+        return getattr(module, attr)
+'''
+
+
+@dataclass
+class HoistedImport:
+    """A hoisted import statement and what the bundle does with it"""
+    statement: str
+    module: str
+    names: List[str]
+    users: Set[str] = field(default_factory=set)
+    cost_us: Optional[int] = None
+    action: Optional[str] = None
+
+    @property
+    def function_users(self) -> Set[str]:
+        return {user for user in self.users if not user.endswith(MODULE_SCOPE)}
+
+    @property
+    def used_at_module_level(self) -> bool:
+        return any(user.endswith(MODULE_SCOPE) for user in self.users)
+
+
+def parse_statement(statement: str) -> Tuple[str, List[str], bool]:
+    """Return (module, bound names, is_from_import) for a header import statement"""
+    node = ast.parse(statement).body[0]
+    if isinstance(node, ast.ImportFrom):
+        return node.module or '', [alias.name for alias in node.names], True
+    return node.names[0].name, [node.names[0].name.split('.')[0]], False
+
+
+class _UsageVisitor(ast.NodeVisitor):
+    """Record which top-level function (or module scope) loads each watched name"""
+
+    def __init__(self, names: Set[str], label: str):
+        self.names = names
+        self.label = label
+        self.qualname: List[str] = []
+        self.function: Optional[str] = None
+        self.uses: Dict[str, Set[str]] = {}
+
+    def _record(self, name: str):
+        scope = self.function if self.function is not None else MODULE_SCOPE
+        self.uses.setdefault(name, set()).add(f"{self.label}:{scope}")
+
+    def visit_Name(self, node: ast.Name):
+        if node.id in self.names:
+            self._record(node.id)
+
+    def visit_FunctionDef(self, node):
+        # Decorators, defaults and annotations run in the enclosing scope
+        for decorator in node.decorator_list:
+            self.visit(decorator)
+        self.visit(node.args)
+        if node.returns is not None:
+            self.visit(node.returns)
+
+        self.qualname.append(node.name)
+        outermost = self.function is None
+        if outermost:
+            self.function = '.'.join(self.qualname)
+        for stmt in node.body:
+            self.visit(stmt)
+        if outermost:
+            self.function = None
+        self.qualname.pop()
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node: ast.ClassDef):
+        for expr in node.decorator_list + node.bases + [kw.value for kw in node.keywords]:
+            self.visit(expr)
+        self.qualname.append(node.name)
+        for stmt in node.body:
+            self.visit(stmt)
+        self.qualname.pop()
+
+
+def find_import_users(trees: Iterable[Tuple[str, ast.AST]], imports: List[HoistedImport]):
+    """Fill ``users`` of each hoisted import from the files of the bundle"""
+    by_name: Dict[str, List[HoistedImport]] = {}
+    for imp in imports:
+        for name in imp.names:
+            by_name.setdefault(name, []).append(imp)
+
+    for label, tree in trees:
+        visitor = _UsageVisitor(set(by_name), label)
+        visitor.visit(tree)
+        for name, users in visitor.uses.items():
+            for imp in by_name[name]:
+                imp.users.update(users)
+
+
+def function_insertion_points(tree: ast.AST, lines: List[str]) -> Dict[str, Tuple[int, str, Set[str]]]:
+    """Map top-level function qualnames to (line to insert before, indentation, declared globals).
+
+    The insertion point is the first statement after the docstring, or the
+    line after the docstring when it is the whole body. Functions where that
+    statement does not start its own line (``def f(): ...`` or
+    semicolon-joined bodies) have no safe insertion point and are left out.
+    """
+    points = {}
+
+    def visit(body, prefix: str):
+        for node in body:
+            if isinstance(node, ast.ClassDef):
+                visit(node.body, f"{prefix}{node.name}.")
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                stmts = node.body
+                first = stmts[0]
+                docstring_only = False
+                if (isinstance(first, ast.Expr) and isinstance(first.value, ast.Constant)
+                        and isinstance(first.value.value, str)):
+                    if len(stmts) > 1:
+                        first = stmts[1]
+                    else:
+                        docstring_only = True
+                line = lines[first.lineno - 1]
+                indent = line[:len(line) - len(line.lstrip())]
+                if line[:first.col_offset].strip():
+                    continue
+                if docstring_only:
+                    # Nothing may follow the docstring on its last line
+                    end_line = lines[first.end_lineno - 1]
+                    if end_line[first.end_col_offset:].strip() and not end_line[first.end_col_offset:].lstrip().startswith('#'):
+                        continue
+                declared = set()
+                for child in ast.walk(node):
+                    if isinstance(child, (ast.Global, ast.Nonlocal)):
+                        declared.update(child.names)
+                lineno = first.end_lineno + 1 if docstring_only else first.lineno
+                points[f"{prefix}{node.name}"] = (lineno, indent, declared)
+
+    visit(tree.body, '')
+    return points
+
+
+def plan_deferrals(imports: List[HoistedImport], mode: str, deferrable: Dict[str, Set[str]]):
+    """Decide which hoisted imports to move out of the header.
+
+    ``local`` moves imports used by exactly one function into that function.
+    ``lazy`` replaces plain ``import x`` statements that are only used inside
+    functions with a proxy that imports on first attribute access.
+    ``deferrable`` maps function users that have a safe insertion point to
+    the names they declare ``global``/``nonlocal``.
+    """
+    if mode not in ('local', 'lazy'):
+        raise ValueError(f"Unknown import deferral mode: {mode}")
+
+    bound = {}
+    for imp in imports:
+        for name in imp.names:
+            bound[name] = bound.get(name, 0) + 1
+
+    for imp in imports:
+        if imp.module == '__future__' or '*' in imp.names or not imp.users:
+            continue
+        if imp.used_at_module_level or any(bound[name] > 1 for name in imp.names):
+            continue
+        users = imp.function_users
+        if mode == 'local' and len(users) == 1:
+            user = next(iter(users))
+            if user in deferrable and not deferrable[user].intersection(imp.names):
+                imp.action = 'local'
+        elif mode == 'lazy' and not imp.statement.startswith('from '):
+            imp.action = 'lazy'
+
+
+def lazy_binding(imp: HoistedImport) -> str:
+    """Header line that binds a lazily imported module"""
+    return f"{imp.names[0]} = _PyCombinerLazyModule({imp.module!r}, {imp.names[0]!r}, globals())"
+
+
+def measure_import_times(statements: List[str], python: Optional[str] = None, timeout: float = 120.0) -> Dict[str, int]:
+    """Run the statements in a fresh interpreter under ``-X importtime``.
+
+    Statements run in order, exactly like the bundle header, so a module that
+    was already imported by an earlier statement costs nothing for later ones.
+    Returns the cumulative import time in microseconds per statement.
+    Statements that fail to import are reported with a cost of -1.
+    """
+    script = ['import sys']
+    for i, statement in enumerate(statements):
+        script.append(f"sys.stderr.write({MARKER + str(i)!r} + '\\n')")
+        script.append('try:')
+        script.append(f"    {statement}")
+        script.append('except Exception:')
+        script.append(f"    sys.stderr.write({MARKER + str(i) + ' failed'!r} + '\\n')")
+
+    result = subprocess.run(
+        [python or sys.executable, '-X', 'importtime', '-c', '\n'.join(script)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=timeout, text=True
+    )
+
+    costs = {statement: 0 for statement in statements}
+    current = None
+    for line in result.stderr.splitlines():
+        if line.startswith(MARKER):
+            parts = line[len(MARKER):].split()
+            current = statements[int(parts[0])]
+            if len(parts) > 1:
+                costs[current] = -1
+            continue
+        if current is None or costs[current] < 0 or not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2]
+        # Only top-level entries; nested ones are included in their parent's cumulative time
+        if name.startswith(' ') and not name.startswith('  '):
+            costs[current] += int(fields[1])
+    return costs
@@ -0,0 +1,219 @@
+"""
+Shared project index and parse cache
+"""
+import ast
+import sys
+import threading
+from array import array
+from pathlib import Path
+from typing import Dict, Hashable, List, Optional, Tuple, Union
+
+from .prescan import imported_modules
+from .sources import LocalSource, SourceProvider
+
+
+class ModuleIndex:
+    """Python files under a source directory, indexed by dotted module name.
+
+    The tree is walked once; afterwards resolving an import is a dict lookup
+    instead of a handful of filesystem probes. One index can be shared by
+    any number of combiners working on the same source directory.
+
+    Files are kept as interned relative paths and only turned into Path
+    objects when asked for, so large trees cost little to index.
+    """
+
+    def __init__(self, source_dir: Path, source: Optional[SourceProvider] = None):
+        self.source_dir = Path(source_dir)
+        self.source = source if source is not None else LocalSource(self.source_dir)
+        self._names: List[str] = []
+        self._modules: Dict[str, int] = {}
+        # Sorted, so file IDs and everything ordered by them do not depend on the filesystem
+        for file_path in sorted(self.source.files('.py'), key=lambda path: path.as_posix()):
+            file_id = len(self._names)
+            try:
+                self._names.append(sys.intern(file_path.relative_to(self.source_dir).as_posix()))
+            except ValueError:
+                self._names.append(sys.intern(str(file_path)))
+            module = self.module_name(file_path)
+            if module is None:
+                continue
+            if file_path.name == '__init__.py':
+                # A module file wins over a package of the same name
+                self._modules.setdefault(sys.intern(module), file_id)
+            else:
+                self._modules[sys.intern(module)] = file_id
+
+    def _path(self, file_id: int) -> Path:
+        return self.source_dir / self._names[file_id]
+
+    @property
+    def files(self) -> List[Path]:
+        """All indexed files, sorted by path"""
+        return [self._path(i) for i in range(len(self._names))]
+
+    @property
+    def names(self) -> List[str]:
+        """Posix paths of all indexed files relative to the source directory, sorted"""
+        return list(self._names)
+
+    def module_name(self, file_path: Path) -> Optional[str]:
+        """Dotted module name of a file, or None if it is outside the source directory"""
+        try:
+            parts = Path(file_path).relative_to(self.source_dir).with_suffix('').parts
+        except ValueError:
+            return None
+        if parts and parts[-1] == '__init__':
+            parts = parts[:-1]
+        return '.'.join(parts) if parts else None
+
+    def is_local(self, module: str) -> bool:
+        """Whether an imported module resolves to a file of the project"""
+        return module in self._modules
+
+    def resolve(self, module: str) -> Optional[Path]:
+        """File implementing a module (``a/b.py`` or ``a/b/__init__.py``)"""
+        file_id = self._modules.get(module)
+        return self._path(file_id) if file_id is not None else None
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
+class ParseCache:
+    """Thread-safe cache of file contents and parsed syntax trees.
+
+    Files are read through a source provider (the working tree by default).
+    With ``validate`` every lookup re-checks the provider's stamp for the
+    file (size and modification time on disk), so a long-lived cache picks
+    up edited files.
+
+    Contents live UTF-8 encoded in one shared buffer and are decoded on
+    access. The modules imported by each file are always cached; syntax
+    trees only with ``keep_trees``, since they take many times the memory
+    of the source. Without it every ``parse`` builds a fresh tree.
+    """
+
+    def __init__(self, validate: bool = False, source: Optional[SourceProvider] = None, keep_trees: bool = True):
+        self.validate = validate
+        self.source = source if source is not None else LocalSource(Path.cwd())
+        self.keep_trees = keep_trees
+        self._slots: Dict[str, int] = {}
+        self._stamps: List[Optional[Hashable]] = []
+        self._offsets = array('Q')
+        self._sizes = array('Q')
+        self._buffer = bytearray()
+        self._garbage = 0
+        self._trees: Dict[int, Union[ast.AST, SyntaxError]] = {}
+        self._imports: Dict[int, Union[Tuple[str, ...], SyntaxError]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _slot(self, file_path: Path) -> int:
+        key = str(file_path)
+        stamp = self.source.stamp(file_path) if self.validate else None
+        slot = self._slots.get(key)
+        if slot is not None and self._stamps[slot] == stamp:
+            self.hits += 1
+            return slot
+        self.misses += 1
+        data = self.source.read_text(file_path).encode('utf-8')
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is not None and self._stamps[slot] == stamp:
+                # Loaded by another thread in the meantime
+                return slot
+            if slot is None:
+                slot = len(self._stamps)
+                self._slots[sys.intern(key)] = slot
+                self._stamps.append(stamp)
+                self._offsets.append(len(self._buffer))
+                self._sizes.append(len(data))
+            else:
+                # The file changed: its old bytes stay behind until the next compaction
+                self._garbage += self._sizes[slot]
+                self._stamps[slot] = stamp
+                self._offsets[slot] = len(self._buffer)
+                self._sizes[slot] = len(data)
+                self._trees.pop(slot, None)
+                self._imports.pop(slot, None)
+            self._buffer += data
+            if self._garbage > len(self._buffer) // 2:
+                self._compact()
+        return slot
+
+    def _compact(self):
+        buffer = bytearray()
+        for slot, (offset, size) in enumerate(zip(self._offsets, self._sizes)):
+            self._offsets[slot] = len(buffer)
+            buffer += self._buffer[offset:offset + size]
+        self._buffer = buffer
+        self._garbage = 0
+
+    def _text(self, slot: int) -> str:
+        with self._lock:
+            offset = self._offsets[slot]
+            data = bytes(self._buffer[offset:offset + self._sizes[slot]])
+        return data.decode('utf-8')
+
+    def read(self, file_path: Path) -> str:
+        """Return the text of a file"""
+        return self._text(self._slot(file_path))
+
+    def parse(self, file_path: Path) -> ast.AST:
+        """Return the syntax tree of a file, raising SyntaxError for invalid files"""
+        slot = self._slot(file_path)
+        tree = self._trees.get(slot)
+        if tree is None:
+            try:
+                tree = ast.parse(self._text(slot))
+            except SyntaxError as e:
+                tree = e
+            if self.keep_trees or isinstance(tree, SyntaxError):
+                with self._lock:
+                    self._trees[slot] = tree
+        if isinstance(tree, SyntaxError):
+            raise tree
+        return tree
+
+    def imports(self, file_path: Path) -> Tuple[str, ...]:
+        """Modules named by the import statements of a file, in ``ast.walk`` order.
+
+        Relative imports without a module (``from . import x``) are left out.
+        The file is only lexed (see prescan), not parsed: graph discovery
+        never builds syntax trees. Raises SyntaxError for unterminated
+        strings and unbalanced brackets; other syntax errors surface when
+        the file is parsed for merging.
+        """
+        slot = self._slot(file_path)
+        modules = self._imports.get(slot)
+        if modules is None:
+            try:
+                modules = imported_modules(self._text(slot))
+            except SyntaxError as e:
+                modules = e
+            with self._lock:
+                self._imports[slot] = modules
+        if isinstance(modules, SyntaxError):
+            raise modules
+        return modules
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the shared source buffer"""
+        return len(self._buffer)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def clear(self):
+        with self._lock:
+            self._slots.clear()
+            self._stamps.clear()
+            self._offsets = array('Q')
+            self._sizes = array('Q')
+            self._buffer = bytearray()
+            self._garbage = 0
+            self._trees.clear()
+            self._imports.clear()
@@ -0,0 +1,98 @@
+"""
+Logging setup shared by all pycombiner modules
+
+Each subsystem logs to its own ``pycombiner.<subsystem>`` logger
+(``pycombiner.ast_parser``, ``pycombiner.merger``, ...). Messages use
+``%``-style arguments, so nothing is formatted unless a handler will
+actually emit the record. The package logger only has a NullHandler: the
+library stays silent until an application configures logging, either with
+the standard ``logging`` module or with ``configure`` below.
+"""
+import json
+import logging
+import sys
+from typing import IO, Optional, Union
+
+ROOT_LOGGER = 'pycombiner'
+
+logging.getLogger(ROOT_LOGGER).addHandler(logging.NullHandler())
+
+# Attributes of every LogRecord; anything else was passed through ``extra``
+_RECORD_FIELDS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+def get_logger(subsystem: str) -> logging.Logger:
+    """Logger of a subsystem, e.g. ``get_logger('merger')`` for ``pycombiner.merger``"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{subsystem}")
+
+
+class ConsoleFormatter(logging.Formatter):
+    """``[LEVEL] message`` lines, with the level colored on terminals"""
+
+    COLORS = {
+        logging.DEBUG: '\033[33m',
+        logging.WARNING: '\033[93m',
+        logging.ERROR: '\033[91m',
+        logging.CRITICAL: '\033[91m',
+    }
+    RESET = '\033[0m'
+
+    def __init__(self, color: bool = False):
+        super().__init__()
+        self.color = color
+
+    def format(self, record: logging.LogRecord) -> str:
+        level = f"[{record.levelname}]"
+        if self.color and record.levelno in self.COLORS:
+            level = f"{self.COLORS[record.levelno]}{level}{self.RESET}"
+        text = f"{level} {record.getMessage()}"
+        if record.exc_info:
+            text += '\n' + self.formatException(record.exc_info)
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and any ``extra`` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'time': round(record.created, 6),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                data[key] = value
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+_handler: Optional[logging.Handler] = None
+
+
+def configure(level: Union[int, str] = logging.INFO, json_format: bool = False,
+              stream: Optional[IO] = None) -> logging.Handler:
+    """Send pycombiner log records to ``stream`` (stderr by default).
+
+    Replaces the handler installed by an earlier call. Records are not
+    passed on to the root logger, so they are not printed twice when the
+    application has configured logging as well.
+    """
+    global _handler
+    stream = stream if stream is not None else sys.stderr
+    logger = logging.getLogger(ROOT_LOGGER)
+    if _handler is not None:
+        logger.removeHandler(_handler)
+
+    handler = logging.StreamHandler(stream)
+    if json_format:
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(ConsoleFormatter(color=hasattr(stream, 'isatty') and stream.isatty()))
+    logger.addHandler(handler)
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    logger.propagate = False
+    _handler = handler
+    return handler
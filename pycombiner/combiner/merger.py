@@ -2,12 +2,18 @@
 Merger module for combining Python files
 """
 
+import ast
+import logging
 import os
 from typing import List, Dict, Tuple, Set
 from collections import defaultdict, deque
 from pathlib import Path
 from .file_handler import read_file
 from .ast_parser import analyze_file, get_module_name, ImportInfo
+from .log import get_logger
+from .rewriter import strip_imports
+
+logger = get_logger('merger')
 
 def topological_sort_files(dependency_graph: Dict[str, Set[str]]) -> List[Path]:
     """Sort files based on their dependencies"""
@@ -68,11 +74,30 @@ def merge_files(
     dependency_graph: Dict[str, Set[str]],
     source_dir: Path,
     output_file: Path,
-    entry_file: Path = None
+    entry_file: Path = None,
+    debug: bool = False
 ) -> None:
-    """Merge Python files into a single file"""
-    print("\n[DEBUG] Starting file merge process:")
-    print("----------------------------------------")
+    """Merge Python files into a single file (``debug`` is only kept for compatibility)"""
+    content = merge_sources(files, dependency_graph, source_dir, entry_file)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write(content)
+    logger.info("Output written to %s", output_file)
+
+def merge_sources(
+    files: List[Path],
+    dependency_graph: Dict[str, Set[str]],
+    source_dir: Path,
+    entry_file: Path = None,
+    debug: bool = False
+) -> str:
+    """Merge Python files and return the merged source.
+
+    Progress is logged at DEBUG level on ``pycombiner.merger`` when that
+    level is enabled; ``debug`` is only kept for compatibility.
+    """
+    trace = logger.isEnabledFor(logging.DEBUG)
+    if trace:
+        logger.debug("Starting file merge process")
     
     # Use provided entry file or find main.py
     if not entry_file:
@@ -84,7 +109,8 @@ def merge_files(
     if not entry_file:
         raise ValueError("No entry file specified and no main.py found in the source directory")
     
-    print(f"\n[DEBUG] Entry point: {entry_file}")
+    if trace:
+        logger.debug("Entry point: %s", entry_file)
     
     # Get all files that are referenced from the entry point
     referenced_files = set()
@@ -124,9 +150,8 @@ def merge_files(
                 if py_file.exists():
                     to_process.add(py_file)
     
-    print("\n[DEBUG] Referenced files:")
-    for file in sorted(referenced_files):
-        print(f"  - {file}")
+    if trace:
+        logger.debug("Referenced files: %s", ', '.join(map(str, sorted(referenced_files))))
     
     # Read and merge file contents
     merged_content = []
@@ -137,8 +162,8 @@ def merge_files(
     main_py_content = []  # Store main.py's content
     local_modules = set()  # Store all local module names
     
-    print("\n[DEBUG] Collecting module definitions and imports:")
-    print("----------------------------------------")
+    if trace:
+        logger.debug("Collecting module definitions and imports")
     
     # First pass: collect all module definitions and imports
     for file_path in referenced_files:
@@ -172,18 +197,15 @@ def merge_files(
                     main_py_content.append(line)
                     main_py_content.append('    main()')
                     break
-            print(f"  - Found entry file content: {len(main_py_content)} lines")
+            if trace:
+                logger.debug("Found entry file content: %d lines", len(main_py_content))
         
-        print(f"\n[DEBUG] Module {module_name} defines:")
-        for name in defined_names:
-            print(f"  - {name}")
-    
-    print("\n[DEBUG] Local modules:")
-    for module in sorted(local_modules):
-        print(f"  - {module}")
+        if trace:
+            logger.debug("Module %s defines: %s", module_name, ', '.join(sorted(defined_names)))
     
-    print("\n[DEBUG] Processing imports:")
-    print("----------------------------------------")
+    if trace:
+        logger.debug("Local modules: %s", ', '.join(sorted(local_modules)))
+        logger.debug("Processing imports")
     
     # Process all imports
     for imp in all_imports:
@@ -191,10 +213,12 @@ def merge_files(
         if imp.is_from_import:
             module_parts = imp.module.split('.')
             if module_parts[0] in local_modules:
-                print(f"  - Skipping {imp} (local module)")
+                if trace:
+                    logger.debug("Skipping %s (local module)", imp)
                 continue
         elif imp.module.split('.')[0] in local_modules:
-            print(f"  - Skipping {imp} (local module)")
+            if trace:
+                logger.debug("Skipping %s (local module)", imp)
             continue
             
         # Format the import statement
@@ -226,17 +250,12 @@ def merge_files(
         merged_content.append(f"# File: {file_path}")
         merged_content.append(f"#{'='*80}\n")
         
-        # Write non-import statements
-        lines = content.split('\n')
-        in_import_section = True
-        for line in lines:
-            stripped = line.strip()
-            if in_import_section and not (stripped.startswith('import ') or stripped.startswith('from ')):
-                in_import_section = False
-            if not in_import_section:
-                merged_content.append(line)
-    
-    # Write the merged content to the output file
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(merged_content))
-    print(f"  - Output written to {output_file}")
+        # Write non-import statements; every import was collected into the header above
+        try:
+            tree = ast.parse(content)
+        except SyntaxError:
+            merged_content.append(content)
+            continue
+        merged_content.append(strip_imports(content, tree, lambda node: ''))
+    
+    return '\n'.join(merged_content)
@@ -2,15 +2,42 @@
 Output formatting module for PyCombiner
 """
 from datetime import datetime
+import logging
 from pathlib import Path
-from typing import Dict, List, Set, Tuple
+from typing import Any, Callable, Dict, List, Set, Tuple, Union
 import time
 import sys
+from .log import get_logger
 
-# ANSI color codes
-class Colors:
-    YELLOW = '\033[93m'
-    RESET = '\033[0m'
+logger = get_logger('report')
+
+class FileInfo:
+    """Report row of one merged file.
+
+    Uses slots instead of a dict per file; ``info['lines']`` and
+    ``info.get('import_statements')`` keep working as before.
+    """
+    __slots__ = ('path', 'lines', 'imports', 'unhandled_imports', 'import_statements', 'unhandled_import_statements')
+
+    def __init__(self, path: Path, lines: int, imports=(), unhandled_imports=(),
+                 import_statements=(), unhandled_import_statements=()):
+        self.path = path
+        self.lines = lines
+        self.imports = tuple(imports)
+        self.unhandled_imports = tuple(unhandled_imports)
+        self.import_statements = tuple(import_statements)
+        self.unhandled_import_statements = tuple(unhandled_import_statements)
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in self.__slots__ else default
 
 class MergeReport:
     def __init__(self, entry_file: Path, source_dir: Path, output_file: Path, debug: bool = False, show_details: bool = False):
@@ -20,10 +47,17 @@ class MergeReport:
         self.start_time = time.time()
         self.debug = debug
         self.show_details = show_details
-        self.files_info: List[Dict] = []
+        self.files_info: List[FileInfo] = []
+        self._file_rows: Dict[Path, int] = {}
+        self._order_positions: Dict[Path, int] = {}
         self.imports_by_file: Dict[str, List[str]] = {}
         self.dependency_graph: Dict[str, Set[str]] = {}
         self.merge_order: List[Path] = []
+        self.hoisted_imports: List = []
+        self._import_classes: Union[Dict[str, List[str]], Callable[[], Dict[str, List[str]]]] = {}
+        self.vendored_modules: List[str] = []
+        self.hot_files: List[str] = []
+        self.lazy_files: List[str] = []
         self.stats = {
             'total_imports': 0,
             'duplicate_imports': 0,
@@ -34,33 +68,77 @@ class MergeReport:
             'total_time': 0.0
         }
 
-    def debug_print(self, message: str):
-        """Print debug message if debug mode is enabled"""
-        if self.debug:
-            print(f"{Colors.YELLOW}[DEBUG]{Colors.RESET} {message}")
+    def debug_print(self, message: str, *args):
+        """Log a debug message, formatted lazily with ``args``; the logger's level decides if it is emitted"""
+        logger.debug(message, *args)
 
     def add_file_info(self, file_path: Path, lines: int, imports: Set[str], unhandled_imports: Set[str], import_info: Dict = None):
-        """Add information about a processed file"""
-        self.files_info.append({
-            'path': file_path,
-            'lines': lines,
-            'imports': imports,
-            'unhandled_imports': unhandled_imports,
-            'import_statements': import_info.get('import_statements', []) if import_info else [],
-            'unhandled_import_statements': import_info.get('unhandled_import_statements', []) if import_info else []
-        })
+        """Add information about a processed file, replacing earlier information about it"""
+        info = FileInfo(
+            file_path,
+            lines,
+            imports,
+            unhandled_imports,
+            import_info.get('import_statements', []) if import_info else [],
+            import_info.get('unhandled_import_statements', []) if import_info else []
+        )
+        row = self._file_rows.get(file_path)
+        if row is None:
+            self._file_rows[file_path] = len(self.files_info)
+            self.files_info.append(info)
+        else:
+            self.stats['total_lines'] -= self.files_info[row].lines
+            self.files_info[row] = info
         self.stats['total_lines'] += lines
-        self.debug_print(f"Added file info: {file_path} ({lines} lines)")
+        self.debug_print("Added file info: %s (%d lines)", file_path, lines)
 
-    def set_dependency_graph(self, graph: Dict[str, Set[str]]):
-        """Set the dependency graph"""
+    def set_dependency_graph(self, graph):
+        """Set the dependency graph (a DependencyGraph or a ``{file: deps}`` mapping)"""
         self.dependency_graph = graph
-        self.debug_print(f"Set dependency graph with {len(graph)} nodes")
+        self.debug_print("Set dependency graph with %d nodes", len(graph))
+
+    def _graph_edge_count(self) -> int:
+        if hasattr(self.dependency_graph, 'edge_count'):
+            return self.dependency_graph.edge_count
+        return sum(len(deps) for deps in self.dependency_graph.values())
 
     def set_merge_order(self, order: List[Path]):
         """Set the merge order of files"""
         self.merge_order = order
-        self.debug_print(f"Set merge order: {[str(p) for p in order]}")
+        self._order_positions = {path: i for i, path in enumerate(order, 1)}
+        if logger.isEnabledFor(logging.DEBUG):
+            self.debug_print("Set merge order: %s", [str(p) for p in order])
+
+    def set_hoisted_imports(self, hoisted_imports: List):
+        """Set the analyzed hoisted imports (see import_cost.HoistedImport)"""
+        self.hoisted_imports = hoisted_imports
+        self.debug_print("Set %d hoisted imports", len(hoisted_imports))
+
+    def set_import_classes(self, import_classes: Union[Dict[str, List[str]], Callable[[], Dict[str, List[str]]]]):
+        """Set the imported modules grouped by origin (see classify.ImportClassifier.breakdown).
+
+        A callable is only called when the report first needs the groups.
+        """
+        self._import_classes = import_classes
+
+    @property
+    def import_classes(self) -> Dict[str, List[str]]:
+        """The imported modules grouped by origin"""
+        if callable(self._import_classes):
+            self._import_classes = self._import_classes()
+            self.debug_print("Set import classes: %s", {k: len(v) for k, v in self._import_classes.items()})
+        return self._import_classes
+
+    def set_vendored_modules(self, modules: List[str]):
+        """Set the names of the modules embedded by vendoring"""
+        self.vendored_modules = modules
+        self.debug_print("Set %d vendored modules", len(modules))
+
+    def set_profiled_files(self, hot_files: List[str], lazy_files: List[str]):
+        """Set the files used by the profiling run and those merged behind lazy boundaries"""
+        self.hot_files = hot_files
+        self.lazy_files = lazy_files
+        self.debug_print("Set %d hot and %d lazy files", len(hot_files), len(lazy_files))
 
     def update_stats(self, stats: Dict[str, int]):
         """Update statistics"""
@@ -69,10 +147,7 @@ class MergeReport:
 
     def _get_file_order(self, file_path: Path) -> int:
         """Get the order number of a file in the merge order"""
-        try:
-            return self.merge_order.index(file_path) + 1
-        except ValueError:
-            return 0
+        return self._order_positions.get(file_path, 0)
 
     def _get_relative_path(self, path: Path) -> Path:
         """Get path relative to source directory"""
@@ -129,13 +204,13 @@ class MergeReport:
             items = sorted(tree.items())
             for i, (name, value) in enumerate(items):
                 is_last_item = i == len(items) - 1
-                if isinstance(value, dict) and not any(key in value for key in ['path', 'lines', 'imports', 'unhandled_imports']):  # Directory
+                if isinstance(value, dict):  # Directory
                     result.append(f"{prefix}{'└── ' if is_last_item else '├── '}{name}/")
                     new_prefix = prefix + ("    " if is_last_item else "│   ")
                     result.extend(format_tree(value, new_prefix, is_last_item))
                 else:  # File
                     info = value
-                    if isinstance(info, dict) and 'path' in info:
+                    if isinstance(info, FileInfo):
                         order = self._get_file_order(info['path'])
                         order_str = f"[{order}] " if order > 0 else ""
                         is_entry = info['path'] == self.entry_file
@@ -274,6 +349,57 @@ class MergeReport:
         lines.append("")
         return lines
 
+    def _format_import_costs(self) -> List[str]:
+        """Format the hoisted import cost section"""
+        lines = []
+        lines.append("🐢 Hoisted Import Cost")
+        lines.append("─" * 100)
+        lines.append(f"{'Import':<50} {'Cost':<10} {'Users':<8} {'Action'}")
+        lines.append("─" * 100)
+
+        def sort_key(imp):
+            return (-(imp.cost_us or 0), imp.statement)
+
+        for imp in sorted(self.hoisted_imports, key=sort_key):
+            if imp.cost_us is None:
+                cost = "-"
+            elif imp.cost_us < 0:
+                cost = "failed"
+            else:
+                cost = f"{imp.cost_us / 1000:.1f} ms"
+            if imp.action == 'local':
+                action = "moved into function"
+            elif imp.action == 'lazy':
+                action = "lazy"
+            elif not imp.used_at_module_level and len(imp.function_users) == 1:
+                action = "deferrable"
+            else:
+                action = ""
+            lines.append(f"{imp.statement:<50} {cost:<10} {len(imp.users):<8} {action}")
+            if self.show_details:
+                for user in sorted(imp.users):
+                    lines.append(f"    - {user}")
+        lines.append("─" * 100)
+        lines.append("")
+        return lines
+
+    def _format_import_classes(self) -> List[str]:
+        """Format the imported modules by origin section"""
+        lines = []
+        lines.append("🏷️ Import Origins")
+        lines.append("─" * 100)
+        lines.append(f"{'Origin':<14} {'Modules':<8} {'Names'}")
+        lines.append("─" * 100)
+        shown = None if self.show_details else 8
+        for category, modules in self.import_classes.items():
+            names = ", ".join(modules[:shown])
+            if shown is not None and len(modules) > shown:
+                names += f", … (+{len(modules) - shown})"
+            lines.append(f"{category:<14} {len(modules):<8} {names}")
+        lines.append("─" * 100)
+        lines.append("")
+        return lines
+
     def format_report(self) -> str:
         """Format the report as a string."""
         # Calculate total time
@@ -294,14 +420,33 @@ class MergeReport:
         # Add import details
         report.extend(self._format_import_details())
 
+        # Add import origins
+        if self.import_classes:
+            report.extend(self._format_import_classes())
+
+        # Add hoisted import costs
+        if self.hoisted_imports:
+            report.extend(self._format_import_costs())
+
         # Add summary
         report.append("⚙️ Summary")
         report.append("─" * 100)
         report.append(f" • Total import statements analyzed…… {self.stats['total_imports']}")
-        report.append(f" • Dependency graph built……………… {len(self.dependency_graph)} nodes / {sum(len(deps) for deps in self.dependency_graph.values())} edges")
+        report.append(f" • Dependency graph built……………… {len(self.dependency_graph)} nodes / {self._graph_edge_count()} edges")
         report.append(f" • Duplicate local imports skipped…… {self.stats['duplicate_imports']}")
         report.append(f" • Lines written to merged output…… {self.stats['functions'] + self.stats['classes']} ")
         report.append(f" • Redundant imports removed………… {self.stats['redundant_imports']}")
+        if self.vendored_modules:
+            packages = sorted({name.partition('.')[0] for name in self.vendored_modules})
+            report.append(f" • Vendored modules embedded……………… {len(self.vendored_modules)} from {', '.join(packages)}")
+            if self.show_details:
+                for name in self.vendored_modules:
+                    report.append(f"    - {name}")
+        if self.hot_files or self.lazy_files:
+            report.append(f" • Profile-guided order……………… {len(self.hot_files)} hot files, {len(self.lazy_files)} behind lazy boundaries")
+            if self.show_details:
+                for label in self.lazy_files:
+                    report.append(f"    - lazy: {label}")
         report.append(f" • Total time elapsed………………… {self.stats['total_time']:.2f} s")
         report.append("")
         
@@ -0,0 +1,269 @@
+"""
+Lexer-based import scanner for building the dependency graph without parsing
+"""
+import re
+import sys
+from typing import List, NamedTuple, Optional, Tuple
+
+
+class ScannedImport(NamedTuple):
+    """A module named by an import statement.
+
+    ``depth`` is the nesting depth of the statement in the syntax tree
+    (1 for the module body), which ``ast.walk`` order is based on. For
+    ``from`` imports ``level`` counts the leading dots and ``names`` holds
+    the imported names; ``module`` is empty for ``from . import x``.
+    """
+    module: str
+    lineno: int
+    end_lineno: int
+    depth: int
+    level: int = 0
+    names: Tuple[str, ...] = ()
+
+
+# What the scanner stops at inside a logical line; everything else is skipped by the regex engine
+_TOKEN = re.compile(r'''
+    (?P<string>[rRbBuUfF]{0,2}(?:\'\'\'|"""|'|"))
+  | (?P<comment>\#[^\r\n]*)
+  | (?P<open>[(\[{])
+  | (?P<close>[)\]}])
+  | (?P<cont>\\(?:\r\n|\r|\n))
+  | (?P<newline>\r\n|\r|\n)
+  | (?P<semi>;)
+  | (?P<colon>:(?!=))
+''', re.VERBOSE)
+
+_STRING_END = {
+    "'": re.compile(r"[^'\\\r\n]*(?:\\.[^'\\\r\n]*)*'", re.DOTALL),
+    '"': re.compile(r'[^"\\\r\n]*(?:\\.[^"\\\r\n]*)*"', re.DOTALL),
+    "'''": re.compile(r"[^'\\]*(?:(?:\\.|'(?!''))[^'\\]*)*'''", re.DOTALL),
+    '"""': re.compile(r'[^"\\]*(?:(?:\\.|"(?!""))[^"\\]*)*"""', re.DOTALL),
+}
+
+_INDENT = re.compile(r'[ \t\f]*')
+_KEYWORD = re.compile(r'(async\s+)?([A-Za-z_]+)\b')
+_IMPORT = re.compile(r'import\b(.*)', re.DOTALL)
+_FROM = re.compile(r'from\b([\s.]*)(.*?)\bimport\b', re.DOTALL)
+_SPACE = re.compile(r'\s+')
+
+# Compound statements whose body is one level below the header
+_BLOCK_KEYWORDS = frozenset({'if', 'for', 'while', 'with', 'def', 'class', 'try', 'finally'})
+_IMPORT_KEYWORDS = frozenset({'import', 'from'})
+
+
+class _Block:
+    """Statements sharing one indentation"""
+    __slots__ = ('indent', 'depth', 'last', 'chain')
+
+    def __init__(self, indent: int, depth: int):
+        self.indent = indent
+        self.depth = depth        # Tree depth of the statements in the block
+        self.last = None          # Keyword of the previous compound statement at this level
+        self.chain = depth        # Depth of the innermost If of an if/elif chain
+
+
+def _indent_width(text: str) -> int:
+    width = 0
+    for char in text:
+        if char == '\t':
+            width = (width // 8 + 1) * 8
+        elif char == ' ':
+            width += 1
+        else:
+            width = 0  # Form feed resets the column, like the tokenizer
+    return width
+
+
+def _body_depth(block: _Block, depth: int, keyword: Optional[str]) -> Optional[int]:
+    """Depth of the body of a compound statement starting with ``keyword``, or None for simple statements"""
+    if keyword == 'if':
+        block.chain = depth
+    elif keyword == 'elif':
+        # An elif is an If nested in the orelse of the previous one
+        block.chain = (block.chain if block.last in ('if', 'elif') else depth) + 1
+        return block.chain + 1
+    elif keyword == 'else':
+        if block.last in ('if', 'elif'):
+            return block.chain + 1
+        return depth + 1
+    elif keyword == 'except':
+        # Statements of a handler sit below its ExceptHandler node
+        return depth + 2
+    elif keyword == 'match':
+        # Case clauses are match_case nodes one level below the Match
+        return depth + 1
+    elif keyword == 'case':
+        return depth + 1
+    elif keyword not in _BLOCK_KEYWORDS:
+        return None
+    return depth + 1
+
+
+def _alias_names(text: str) -> List[str]:
+    """Names of ``a.b as c, d`` lists, without the aliases"""
+    names = []
+    for item in text.strip().strip('()').split(','):
+        name = _SPACE.sub(' ', item.strip()).split(' as ')[0]
+        name = _SPACE.sub('', name)
+        if name:
+            names.append(name)
+    return names
+
+
+def _import_records(code: str) -> List[Tuple[str, int, Tuple[str, ...]]]:
+    """``(module, level, names)`` of an import statement, or [] for other statements"""
+    if code.startswith('import'):
+        match = _IMPORT.match(code)
+        if match is None:
+            return []
+        return [(name, 0, ()) for name in _alias_names(match.group(1))]
+    if code.startswith('from'):
+        match = _FROM.match(code)
+        if match is None:
+            return []
+        level = match.group(1).count('.')
+        # Relative imports keep their dotted tail only, like ast's ImportFrom.module
+        module = _SPACE.sub('', match.group(2))
+        return [(module, level, tuple(_alias_names(code[match.end():])))]
+    return []
+
+
+def scan_imports(source: str) -> List[ScannedImport]:
+    """Import statements of a source, ordered like ``ast.walk`` visits them.
+
+    Only what is needed to find statements is lexed: strings, comments,
+    brackets, line continuations, ';' and the ':' ending compound statement
+    headers. Scanning stops after the last occurrence of ``import``, so the
+    data tables and code following the imports are never looked at.
+
+    Raises SyntaxError for unterminated strings and unbalanced brackets
+    seen on the way; other syntax errors go unnoticed.
+    """
+    stop = source.rfind('import')
+    if stop < 0:
+        return []
+
+    found: List[ScannedImport] = []
+    blocks = [_Block(0, 1)]
+    pending_depth: Optional[int] = None  # Body depth of a header ending its line with ':'
+    pos = 0
+    lineno = 1
+    counted = 0  # Position up to which newlines are counted into lineno
+    size = len(source)
+
+    def line_at(offset: int) -> int:
+        nonlocal lineno, counted
+        lineno += source.count('\n', counted, offset)
+        counted = offset
+        return lineno
+
+    while pos < size and pos <= stop:
+        # Start of a logical line: measure the indentation
+        indent_end = _INDENT.match(source, pos).end()
+        if indent_end >= size:
+            break
+        if source[indent_end] in '\r\n#\\':
+            # Blank and comment-only lines do not change the indentation
+            match = _TOKEN.search(source, indent_end)
+            while match is not None and match.lastgroup not in ('newline', 'cont'):
+                match = _TOKEN.search(source, match.end())
+            pos = match.end() if match is not None else size
+            continue
+
+        width = _indent_width(source[pos:indent_end])
+        if pending_depth is not None and width > blocks[-1].indent:
+            blocks.append(_Block(width, pending_depth))
+        else:
+            while len(blocks) > 1 and blocks[-1].indent > width:
+                blocks.pop()
+        pending_depth = None
+        block = blocks[-1]
+        depth = block.depth
+        line_header = None  # Keyword of a compound statement starting this line
+
+        # Walk the statements of the logical line
+        pos = stmt_start = indent_end
+        keyword_match = _KEYWORD.match(source, stmt_start)
+        keyword = keyword_match.group(2) if keyword_match else None
+        collect = keyword in _IMPORT_KEYWORDS
+        segments: List[str] = []  # Code of an import statement without comments and continuations
+        segment_start = stmt_start
+        brackets = 0
+
+        while True:
+            match = _TOKEN.search(source, pos)
+            end = match.start() if match is not None else size
+            kind = match.lastgroup if match is not None else 'newline'
+            if match is None and brackets:
+                raise SyntaxError(f"'(' was never closed (line {line_at(size)})")
+            if kind == 'string':
+                quote = match.group().lstrip('rRbBuUfF')
+                string_end = _STRING_END[quote].match(source, match.end())
+                if string_end is None:
+                    raise SyntaxError(f"unterminated string literal (line {line_at(match.start())})")
+                pos = string_end.end()
+                continue
+            pos = match.end() if match is not None else size
+            if kind == 'open':
+                brackets += 1
+                continue
+            if kind == 'close':
+                brackets -= 1
+                if brackets < 0:
+                    raise SyntaxError(f"unmatched '{match.group()}' (line {line_at(match.start())})")
+                continue
+            if kind == 'comment' or kind == 'cont':
+                if collect:
+                    segments.append(source[segment_start:end])
+                    segment_start = pos
+                continue
+            if brackets:
+                # Newlines, ';' and ':' inside brackets belong to an expression
+                continue
+            if kind == 'colon':
+                if line_header is not None or collect:
+                    continue
+                body = _body_depth(block, depth, keyword)
+                if body is None:
+                    # An annotation, or a soft keyword used as a name
+                    continue
+                line_header = block.last = keyword
+                rest = _INDENT.match(source, pos).end()
+                if rest < size and source[rest] not in '\r\n#\\':
+                    # The body follows on the same line
+                    depth = body
+                    pos = stmt_start = segment_start = rest
+                    keyword_match = _KEYWORD.match(source, stmt_start)
+                    keyword = keyword_match.group(2) if keyword_match else None
+                    collect = keyword in _IMPORT_KEYWORDS
+                else:
+                    pending_depth = body
+                continue
+
+            # End of a simple statement: ';', the end of the line or of the file
+            if collect:
+                code = ''.join(segments) + source[segment_start:end]
+                first = line_at(stmt_start)
+                last = line_at(end)
+                found.extend(ScannedImport(sys.intern(module), first, last, depth, level, names)
+                             for module, level, names in _import_records(code))
+                segments = []
+            if kind == 'semi':
+                pos = stmt_start = segment_start = _INDENT.match(source, pos).end()
+                keyword_match = _KEYWORD.match(source, stmt_start)
+                keyword = keyword_match.group(2) if keyword_match else None
+                collect = keyword in _IMPORT_KEYWORDS
+                continue
+            break
+
+        if line_header is None:
+            block.last = None
+
+    found.sort(key=lambda item: item.depth)
+    return found
+
+
+def imported_modules(source: str) -> Tuple[str, ...]:
+    """Modules imported by a source, in ``ast.walk`` order (see ParseCache.imports)"""
+    return tuple(item.module for item in scan_imports(source) if item.module)
@@ -0,0 +1,213 @@
+"""
+Profile-guided merge order and lazy boundaries
+
+The entry file runs once in a child interpreter with a profile hook that
+records, for the files under the source directory, the order in which
+their module bodies finished running and the functions called in each, in
+first-call order. The profile then shapes the bundle:
+
+- files that ran are merged in the order their bodies finished, which is
+  the first-use order of the run and an order Python itself found valid
+- files that did not run keep the static order, still before the entry
+- cold files (none of their functions called) holding nothing but
+  functions are merged behind a lazy boundary: their code is kept as a
+  string and run in the bundle namespace by the first call to any of
+  their functions, through stubs bound to the same names
+"""
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+from .log import get_logger
+
+logger = get_logger('profile')
+
+# Run as: python -c PROFILE_RUNNER <output.json> <source dir> <entry file> [args...]
+PROFILE_RUNNER = '''\
+import json, os, runpy, sys, threading
+output, root, entry = sys.argv[1:4]
+root = os.path.join(os.path.abspath(root), '')
+modules, functions, finished = [], {}, set()
+
+def hook(frame, event, arg):
+    path = frame.f_code.co_filename
+    if not path.startswith(root):
+        return
+    name = frame.f_code.co_name
+    if name == '<module>':
+        if event == 'return' and path not in finished:
+            finished.add(path)
+            modules.append(path[len(root):].replace(os.sep, '/'))
+    elif event == 'call' and (name == '<lambda>' or not name.startswith('<')):
+        label = path[len(root):].replace(os.sep, '/')
+        functions.setdefault(label, {}).setdefault(getattr(frame.f_code, 'co_qualname', name))
+
+sys.argv = [entry] + sys.argv[4:]
+sys.path[0] = os.path.dirname(entry)
+sys.path.insert(1, root)
+code = 0
+sys.setprofile(hook)
+threading.setprofile(hook)
+try:
+    runpy.run_path(entry, run_name='__main__')
+except SystemExit as e:
+    code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+except BaseException:
+    import traceback
+    traceback.print_exc()
+    code = 1
+finally:
+    sys.setprofile(None)
+    threading.setprofile(None)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'modules': modules, 'functions': {k: list(v) for k, v in functions.items()}, 'returncode': code}, f)
+'''
+
+# Emitted once into bundles with lazy files
+LAZY_FILE_LOADER = '''\
+_PYCOMBINER_LAZY_FILES = {}
+
+def _pycombiner_load_lazy(label):
+    """Run a cold file's code in the bundle namespace, replacing its stubs"""
+    source = _PYCOMBINER_LAZY_FILES.get(label)
+    if source is not None:
+        exec(compile(source, label, 'exec'), globals())
+        del _PYCOMBINER_LAZY_FILES[label]
+'''
+
+
+@dataclass
+class RunProfile:
+    """What one run of the entry file used, by file label (path relative to the source directory)"""
+    modules: List[str] = field(default_factory=list)                # Module bodies, in the order they finished
+    functions: Dict[str, List[str]] = field(default_factory=dict)  # Functions called per file, first call first
+    returncode: int = 0
+
+    def is_hot(self, label: str) -> bool:
+        """Whether any function of a file was called"""
+        return bool(self.functions.get(label))
+
+    def to_json(self) -> str:
+        return json.dumps({'modules': self.modules, 'functions': self.functions, 'returncode': self.returncode},
+                          sort_keys=True)
+
+    @classmethod
+    def from_json(cls, text: str) -> 'RunProfile':
+        data = json.loads(text)
+        return cls(data['modules'], data['functions'], data.get('returncode', 0))
+
+    @property
+    def digest(self) -> str:
+        """Hash of what shapes the bundle, for cache keys and content hashes"""
+        return hashlib.sha256(self.to_json().encode('utf-8')).hexdigest()
+
+
+def profile_entry(entry_file: Path, source_dir: Path, args: Sequence[str] = (),
+                  timeout: Optional[float] = None) -> RunProfile:
+    """Run the entry file once with ``args`` and record what it used.
+
+    The program's output is discarded. A run ending with an error still
+    gives a profile, of the path it took until then; the exit status is
+    kept in ``returncode``.
+    """
+    with tempfile.TemporaryDirectory(prefix='pycombiner-profile-') as tmp:
+        output = Path(tmp) / 'profile.json'
+        command = [sys.executable, '-c', PROFILE_RUNNER, str(output),
+                   os.path.abspath(source_dir), os.path.abspath(entry_file), *args]
+        result = subprocess.run(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                stderr=subprocess.PIPE, timeout=timeout)
+        if not output.exists():
+            raise RuntimeError(f"Profiling run of {entry_file} failed: "
+                               f"{result.stderr.decode(errors='replace').strip() or result.returncode}")
+        profile = RunProfile.from_json(output.read_text(encoding='utf-8'))
+    if profile.returncode:
+        logger.warning("Profiling run of %s exited with status %d", entry_file, profile.returncode)
+    logger.debug("Profile: %d files ran, %d with functions called", len(profile.modules), len(profile.functions))
+    return profile
+
+
+def profiled_order(order: Sequence[str], entry: str, reachable: int, profile: RunProfile) -> List[str]:
+    """Reorder file labels for a profile.
+
+    ``order`` is the static merge order, whose first ``reachable`` labels
+    (ending with ``entry``) are reachable from the entry file. Files that
+    ran come first in the order they finished, then the other reachable
+    files, the entry file and the rest, all in static order.
+    """
+    known = set(order)
+    ran = [label for label in profile.modules if label in known and label != entry]
+    placed = set(ran)
+    placed.add(entry)
+    head = ran + [label for label in order[:reachable] if label not in placed]
+    tail = [label for label in order[reachable:] if label not in placed]
+    return head + ([entry] if entry in known else []) + tail
+
+
+def lazy_functions(tree: ast.Module) -> Optional[List[str]]:
+    """Names of a file's functions if it holds nothing else, or None.
+
+    Imports and a docstring are allowed. Decorated functions are not, as
+    decorators run when the function is defined.
+    """
+    names = []
+    for i, node in enumerate(tree.body):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and not node.decorator_list:
+            names.append(node.name)
+        elif isinstance(node, (ast.Import, ast.ImportFrom, ast.Pass)):
+            continue
+        elif i == 0 and isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant) \
+                and isinstance(node.value.value, str):
+            continue
+        else:
+            return None
+    return names or None
+
+
+def bound_names(tree: ast.Module, is_local) -> Set[str]:
+    """Names a file binds at the top level of the bundle namespace.
+
+    Imports of project modules (``is_local``) are removed when merging, so
+    they bind nothing.
+    """
+    names = set()
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.Import):
+            names.update((alias.asname or alias.name).partition('.')[0]
+                         for alias in node.names if not is_local(alias.name))
+        elif isinstance(node, ast.ImportFrom):
+            if not (node.module and is_local(node.module)):
+                names.update(alias.asname or alias.name for alias in node.names)
+        else:
+            for child in ast.walk(node):
+                if isinstance(child, ast.Name) and isinstance(child.ctx, ast.Store):
+                    names.add(child.id)
+                elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                    names.add(child.name)
+    return names
+
+
+def lazy_stub(label: str, name: str) -> str:
+    """Function standing for ``name`` until its file is loaded; the real one replaces it.
+
+    The parameter names cannot be those of a function in the file.
+    """
+    return (f"def {name}(*__pyc_args, **__pyc_kwargs):\n"
+            f"    _pycombiner_load_lazy({label!r})\n"
+            f"    return {name}(*__pyc_args, **__pyc_kwargs)\n")
+
+
+def lazy_block(label: str, text: str, names: Iterable[str]) -> str:
+    """A cold file's code kept as a string, and the stubs that load it"""
+    lines = [f"_PYCOMBINER_LAZY_FILES[{label!r}] = ("]
+    lines.extend(f"    {line!r}" for line in text.splitlines(keepends=True))
+    lines.append(")")
+    return '\n'.join(lines) + '\n\n' + '\n'.join(lazy_stub(label, name) for name in names)
@@ -0,0 +1,172 @@
+"""
+Span-based rewriting of import statements
+"""
+import ast
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+
+class Statement(NamedTuple):
+    """Position of a statement; ``node`` is set for import statements only"""
+    lineno: int
+    col_offset: int
+    end_lineno: int
+    end_col_offset: int
+    node: Optional[ast.stmt] = None
+
+
+class Block(NamedTuple):
+    """A statement list; ``required`` when it must keep at least one statement"""
+    statements: List[Statement]
+    required: bool = True
+
+
+# Decides what happens to an import: None keeps it, '' removes it, other text replaces it
+Decision = Callable[[ast.stmt], Optional[str]]
+
+
+def import_blocks(tree: ast.AST) -> List[Block]:
+    """Statement lists (module body, function/class/if/try/... bodies) that contain imports.
+
+    Only positions and the import nodes themselves are kept, so the tree can
+    be dropped afterwards.
+    """
+    blocks = []
+    for node in ast.walk(tree):
+        for _, value in ast.iter_fields(node):
+            if not isinstance(value, list) or not value or not isinstance(value[0], ast.stmt):
+                continue
+            if not any(isinstance(stmt, (ast.Import, ast.ImportFrom)) for stmt in value):
+                continue
+            statements = [
+                Statement(
+                    stmt.lineno, stmt.col_offset, stmt.end_lineno, stmt.end_col_offset,
+                    stmt if isinstance(stmt, (ast.Import, ast.ImportFrom)) else None
+                )
+                for stmt in value
+            ]
+            blocks.append(Block(statements, not isinstance(node, ast.Module)))
+    return blocks
+
+
+def _line_starts(data: bytes) -> List[int]:
+    # Same line breaks as the tokenizer: \n, \r\n and \r (bytes.splitlines splits on nothing else)
+    starts = [0]
+    for line in data.splitlines(keepends=True):
+        starts.append(starts[-1] + len(line))
+    return starts
+
+
+def _is_blank_tail(text: bytes) -> bool:
+    """Whether the rest of a line holds nothing but an optional ';' and a comment"""
+    text = text.strip()
+    if text.startswith(b';'):
+        text = text[1:].lstrip()
+    return not text or text.startswith(b'#')
+
+
+def _block_edits(data: bytes, starts: List[int], block: Block, decide: Decision) -> List[Tuple[int, int, bytes]]:
+    def offset(lineno: int, col: int) -> int:
+        return starts[lineno - 1] + col
+
+    def line_end(lineno: int) -> int:
+        # End of a line without its line break
+        end = starts[lineno] if lineno < len(starts) else len(data)
+        while end > starts[lineno - 1] and data[end - 1:end] in (b'\n', b'\r'):
+            end -= 1
+        return end
+
+    required = block.required
+    block = block.statements
+    decisions = [decide(stmt.node) if stmt.node is not None else None for stmt in block]
+    if required and all(decision == '' for decision in decisions):
+        # A block cannot become empty
+        decisions[0] = 'pass'
+
+    edits = []
+    for stmt, decision in zip(block, decisions):
+        if decision:
+            edits.append((offset(stmt.lineno, stmt.col_offset), offset(stmt.end_lineno, stmt.end_col_offset), decision.encode('utf-8')))
+
+    # Statements joined by ';' share lines; each run of them is handled together
+    runs: List[List[int]] = []
+    for i, stmt in enumerate(block):
+        if runs and block[runs[-1][-1]].end_lineno == stmt.lineno:
+            runs[-1].append(i)
+        else:
+            runs.append([i])
+
+    for run in runs:
+        removed = [decisions[i] == '' for i in run]
+        if not any(removed):
+            continue
+        first, last = block[run[0]], block[run[-1]]
+        head = data[starts[first.lineno - 1]:offset(first.lineno, first.col_offset)]
+        tail = data[offset(last.end_lineno, last.end_col_offset):line_end(last.end_lineno)]
+        if all(removed) and not head.strip() and _is_blank_tail(tail):
+            # The statements fill their lines: drop the lines, line breaks included
+            end = starts[last.end_lineno] if last.end_lineno < len(starts) else len(data)
+            edits.append((starts[first.lineno - 1], end, b''))
+            continue
+        for k, i in enumerate(run):
+            if not removed[k]:
+                continue
+            stmt = block[i]
+            if not all(removed[k + 1:]):
+                # Something is kept later on the line: remove up to the next statement, eating the ';'
+                nxt = block[run[k + 1]]
+                edits.append((offset(stmt.lineno, stmt.col_offset), offset(nxt.lineno, nxt.col_offset), b''))
+            elif k > 0:
+                # Only removed statements follow: remove from the end of the previous one, eating its ';'
+                prev = block[run[k - 1]]
+                edits.append((offset(prev.end_lineno, prev.end_col_offset), offset(stmt.end_lineno, stmt.end_col_offset), b''))
+            else:
+                edits.append((offset(stmt.lineno, stmt.col_offset), offset(stmt.end_lineno, stmt.end_col_offset), b''))
+    return edits
+
+
+def rewrite_imports(
+    source: str,
+    blocks: List[Block],
+    decide: Decision,
+    insertions: Optional[Dict[int, List[str]]] = None
+) -> str:
+    """Remove or replace import statements by their exact source spans.
+
+    ``decide`` is called for every import of ``blocks`` (see import_blocks).
+    Removed statements take their ';' separator with them, lines left empty
+    are dropped, and a block whose statements are all removed gets ``pass``.
+    ``insertions`` maps 1-based line numbers to lines inserted before them.
+
+    Column offsets in the tree are UTF-8 byte offsets, so the result is
+    stitched together from byte slices of the encoded source.
+    """
+    data = source.encode('utf-8')
+    starts = _line_starts(data)
+
+    edits = []
+    for block in blocks:
+        edits.extend(_block_edits(data, starts, block, decide))
+    for lineno, lines in (insertions or {}).items():
+        at = starts[lineno - 1] if lineno <= len(starts) else len(data)
+        text = ''.join(line + '\n' for line in lines).encode('utf-8')
+        if at == len(data) and data and not data.endswith((b'\n', b'\r')):
+            # Inserting after a last line without a line break
+            text = b'\n' + text
+        edits.append((at, at, text))
+    if not edits:
+        return source
+
+    pieces = []
+    pos = 0
+    for start, end, replacement in sorted(edits, key=lambda edit: (edit[0], edit[1])):
+        start = max(start, pos)
+        pieces.append(data[pos:start])
+        pieces.append(replacement)
+        pos = max(pos, end)
+    pieces.append(data[pos:])
+    return b''.join(pieces).decode('utf-8')
+
+
+def strip_imports(source: str, tree: ast.AST, decide: Decision, insertions: Optional[Dict[int, List[str]]] = None) -> str:
+    """Rewrite the imports of a parsed source in one step"""
+    return rewrite_imports(source, import_blocks(tree), decide, insertions)
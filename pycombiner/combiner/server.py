@@ -0,0 +1,232 @@
+"""
+Long-running bundler daemon on a Unix domain socket
+
+Requests and responses are single-line JSON objects (see pycombiner.client):
+
+    {"command": "bundle", "args": {...parsed CLI arguments...}}
+    {"command": "ping"} / {"command": "stats"} / {"command": "shutdown"}
+
+Every response has a ``status`` (0 on success); bundle responses carry the
+text the CLI would have printed in ``output``.
+"""
+import argparse
+import io
+import os
+import socketserver
+import threading
+import time
+import traceback
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from ..client import default_socket_path, read_message, request, write_message
+from .index import ModuleIndex, ParseCache
+from .log import get_logger
+from .sources import LocalSource, SourceProvider
+
+logger = get_logger('server')
+
+
+def _directory_stamps(root: Path) -> Dict[str, int]:
+    """Modification time of every directory below ``root``; adding, removing or renaming files changes them"""
+    stamps = {}
+    for directory, _, _ in os.walk(root):
+        try:
+            stamps[directory] = os.stat(directory).st_mtime_ns
+        except OSError:
+            pass
+    return stamps
+
+
+class RootState:
+    """Warm state of one source root: its module index and a validating parse cache"""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.source = LocalSource(root)
+        self.lock = threading.Lock()
+        # Every lookup re-checks the file's size and modification time
+        self.parse_cache = ParseCache(validate=True, source=self.source)
+        self.index: Optional[ModuleIndex] = None
+        self._stamps: Dict[str, int] = {}
+        self.requests = 0
+        self.rebuilds = 0
+
+    def _index_is_current(self) -> bool:
+        for directory, stamp in self._stamps.items():
+            try:
+                if os.stat(directory).st_mtime_ns != stamp:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def current_index(self) -> ModuleIndex:
+        """The module index, rebuilt when files were added, removed or renamed since it was built"""
+        with self.lock:
+            self.requests += 1
+            if self.index is None or not self._index_is_current():
+                # Stamps first: changes made while walking are seen by the next request
+                self._stamps = _directory_stamps(self.root)
+                self.index = ModuleIndex(self.root, self.source)
+                self.rebuilds += 1
+                logger.debug("Indexed %s: %d files", self.root, len(self.index))
+            return self.index
+
+
+class Workspace:
+    """Warm state per source root, shared by all requests of the daemon"""
+
+    def __init__(self):
+        self._roots: Dict[Path, RootState] = {}
+        self._lock = threading.Lock()
+
+    def state(self, root: Path) -> RootState:
+        with self._lock:
+            state = self._roots.get(root)
+            if state is None:
+                state = self._roots[root] = RootState(root)
+            return state
+
+    def resources(self, source: SourceProvider) -> Dict[str, Any]:
+        """PyCombiner arguments reusing warm state; archives and git revisions get none"""
+        if type(source) is not LocalSource:
+            return {}
+        state = self.state(source.root)
+        return {'index': state.current_index(), 'parse_cache': state.parse_cache}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            states = list(self._roots.values())
+        return {
+            str(state.root): {
+                'requests': state.requests,
+                'index_rebuilds': state.rebuilds,
+                'files': len(state.index) if state.index is not None else 0,
+                'cached_files': len(state.parse_cache),
+                'cached_bytes': state.parse_cache.nbytes,
+                'cache_hits': state.parse_cache.hits,
+                'cache_misses': state.parse_cache.misses,
+            }
+            for state in states
+        }
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            message = read_message(self.rfile)
+        except ValueError as e:
+            write_message(self.wfile, {'status': 2, 'output': f"Error: invalid request: {e}\n"})
+            return
+        if message is not None:
+            write_message(self.wfile, self.server.dispatch(message))
+
+
+class BundleServer(socketserver.ThreadingUnixStreamServer):
+    """Serves bundle requests concurrently, one thread per connection"""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self.workspace = Workspace()
+        self.started = time.time()
+        # Only the owner may talk to the daemon
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(socket_path, RequestHandler)
+        finally:
+            os.umask(old_umask)
+
+    def _bundle(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        from ..__main__ import build_parser, run_bundle
+
+        # Start from the parser defaults so older clients can omit new options
+        args = build_parser().parse_args([arguments.get('source_path', ''), arguments.get('output_file', '')])
+        vars(args).update(arguments)
+        out = io.StringIO()
+        try:
+            status = run_bundle(args, out, self.workspace)
+        except Exception:
+            logger.exception("Bundle request failed")
+            out.write(traceback.format_exc())
+            status = 1
+        return {'status': status, 'output': out.getvalue()}
+
+    def dispatch(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        command = message.get('command')
+        if command == 'bundle':
+            return self._bundle(message.get('args', {}))
+        if command == 'ping':
+            return {'status': 0, 'pid': os.getpid(), 'uptime': time.time() - self.started}
+        if command == 'stats':
+            return {'status': 0, 'roots': self.workspace.stats()}
+        if command == 'shutdown':
+            # shutdown() waits for serve_forever, which is busy running this request
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {'status': 0}
+        return {'status': 2, 'output': f"Error: unknown command {command!r}\n"}
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.socket_path)
+        except OSError:
+            pass
+
+
+def _remove_stale_socket(socket_path: str):
+    """Remove a socket file left behind by a daemon that is gone; refuse to replace a live one"""
+    if not os.path.exists(socket_path):
+        return
+    try:
+        request({'command': 'ping'}, socket_path, timeout=1)
+    except OSError:
+        os.unlink(socket_path)
+        return
+    raise RuntimeError(f"A daemon is already listening on {socket_path}")
+
+
+def serve(socket_path: Optional[str] = None) -> BundleServer:
+    """Create a daemon listening on ``socket_path``; call ``serve_forever`` on it to run"""
+    socket_path = socket_path or default_socket_path()
+    _remove_stale_socket(socket_path)
+    return BundleServer(socket_path)
+
+
+def serve_main(argv) -> int:
+    """``pycombiner serve``: run the daemon, or stop or query a running one"""
+    parser = argparse.ArgumentParser(prog='pycombiner serve', description='Serve bundle requests from a warm daemon')
+    parser.add_argument('--socket', type=str, help='Socket path (default: PYCOMBINER_SOCKET or a per-user socket)')
+    parser.add_argument('--stop', action='store_true', help='Stop the running daemon')
+    parser.add_argument('--stats', action='store_true', help='Show cache statistics of the running daemon')
+    args = parser.parse_args(argv)
+    socket_path = args.socket or default_socket_path()
+
+    if args.stop or args.stats:
+        try:
+            response = request({'command': 'shutdown' if args.stop else 'stats'}, socket_path, timeout=5)
+        except OSError as e:
+            print(f"Error: no daemon on {socket_path}: {e}")
+            return 1
+        if args.stats:
+            for root, stats in response['roots'].items():
+                print(root)
+                for key, value in stats.items():
+                    print(f"  {key:<16} {value}")
+        return 0
+
+    try:
+        server = serve(socket_path)
+    except (OSError, RuntimeError) as e:
+        print(f"Error: {e}")
+        return 1
+    print(f"Listening on {socket_path}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
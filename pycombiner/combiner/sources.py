@@ -0,0 +1,258 @@
+"""
+Source providers: read project files from a directory, an archive, a git revision or memory
+"""
+import os
+import subprocess
+from abc import ABC, abstractmethod
+import tarfile
+import threading
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import Dict, Hashable, List, Optional, Tuple, Union
+
+
+class SourceProvider(ABC):
+    """Read-only view of a source tree.
+
+    Files are addressed by paths under ``root``, exactly like files on disk,
+    so the rest of the combiner does not care where they come from. For
+    providers that are not backed by a directory ``root`` is only a label.
+    Subclasses implement ``files``, ``read_bytes`` and ``exists``.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def relative(self, path: Path) -> str:
+        """Posix path of a file relative to the root"""
+        return Path(path).relative_to(self.root).as_posix()
+
+    @abstractmethod
+    def files(self, suffix: str = '.py') -> List[Path]:
+        """All files with the given suffix"""
+
+    @abstractmethod
+    def read_bytes(self, path: Path) -> bytes:
+        """Raw content of a file"""
+
+    def read_text(self, path: Path) -> str:
+        """UTF-8 content with CRLF and CR line breaks turned into LF, like a file opened in text mode"""
+        return self.read_bytes(path).decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+
+    @abstractmethod
+    def exists(self, path: Path) -> bool:
+        """Whether a file exists"""
+
+    def stamp(self, path: Path) -> Optional[Hashable]:
+        """Value that changes when the file changes, or None for immutable sources"""
+        return None
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LocalSource(SourceProvider):
+    """Files in a directory of the working tree"""
+
+    def files(self, suffix: str = '.py') -> List[Path]:
+        return list(self.root.rglob(f'*{suffix}'))
+
+    def read_bytes(self, path: Path) -> bytes:
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def read_text(self, path: Path) -> str:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def exists(self, path: Path) -> bool:
+        return Path(path).is_file()
+
+    def stamp(self, path: Path) -> Optional[Hashable]:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+
+class MemorySource(SourceProvider):
+    """Files held in a ``{relative path: text or bytes}`` dict"""
+
+    def __init__(self, files: Dict[str, Union[str, bytes]], root: Path = Path('/<memory>')):
+        super().__init__(root)
+        self._files = {
+            PurePosixPath(name).as_posix(): data.encode('utf-8') if isinstance(data, str) else data
+            for name, data in files.items()
+        }
+
+    def files(self, suffix: str = '.py') -> List[Path]:
+        return [self.root / name for name in self._files if name.endswith(suffix)]
+
+    def read_bytes(self, path: Path) -> bytes:
+        try:
+            return self._files[self.relative(path)]
+        except KeyError:
+            raise FileNotFoundError(str(path))
+
+    def exists(self, path: Path) -> bool:
+        try:
+            return self.relative(path) in self._files
+        except ValueError:
+            return False
+
+
+class ArchiveSource(MemorySource):
+    """Files inside a zip or tar archive, below ``prefix``.
+
+    When ``prefix`` is None and every file sits in one top-level directory
+    (as in ``git archive --prefix`` or sdist tarballs) that directory is
+    used. The archive path serves as the root label, so reported paths look
+    like ``/builds/app.zip/pkg/main.py``.
+    """
+
+    def __init__(self, archive: Path, prefix: Optional[str] = None, suffixes: Tuple[str, ...] = ('.py',)):
+        archive = Path(archive)
+        members: Dict[str, bytes] = {}
+
+        if zipfile.is_zipfile(archive):
+            with zipfile.ZipFile(archive) as zf:
+                for info in zf.infolist():
+                    if not info.is_dir() and info.filename.endswith(suffixes):
+                        members[info.filename] = zf.read(info)
+        elif tarfile.is_tarfile(archive):
+            # Compressed tar archives cannot seek, so members are read in one pass
+            with tarfile.open(archive) as tf:
+                for info in tf:
+                    if info.isfile() and info.name.endswith(suffixes):
+                        members[info.name] = tf.extractfile(info).read()
+        else:
+            raise ValueError(f"Not a zip or tar archive: {archive}")
+
+        members = {PurePosixPath(name).as_posix(): data for name, data in members.items()}
+        if prefix is None:
+            tops = {name.split('/', 1)[0] for name in members}
+            prefix = tops.pop() if len(tops) == 1 and all('/' in name for name in members) else ''
+        prefix = prefix.strip('/')
+        if prefix:
+            start = len(prefix) + 1
+            members = {name[start:]: data for name, data in members.items() if name.startswith(prefix + '/')}
+
+        super().__init__(members, archive / prefix if prefix else archive)
+
+
+class GitSource(SourceProvider):
+    """Files of a git tree at a given revision, read straight from the object store.
+
+    Blobs are streamed through one long-lived ``git cat-file --batch``
+    process, so nothing is checked out. ``root`` is the matching working
+    tree directory, used as a label only.
+    """
+
+    def __init__(self, repo: Path, rev: str = 'HEAD', subdir: str = ''):
+        self.repo = Path(repo)
+        self.rev = rev
+        self.subdir = subdir.strip('/')
+        super().__init__(self.repo / self.subdir if self.subdir else self.repo)
+        self._blobs = self._list_tree()
+        self._process: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_path(cls, path: Path, rev: str = 'HEAD') -> 'GitSource':
+        """Provider for a directory inside a git work tree"""
+        path = Path(path).resolve()
+        top = subprocess.run(
+            ['git', '-C', str(path), 'rev-parse', '--show-toplevel'],
+            check=True, capture_output=True, text=True
+        ).stdout.strip()
+        top = Path(top).resolve()
+        return cls(top, rev, path.relative_to(top).as_posix() if path != top else '')
+
+    def _git(self, *args) -> bytes:
+        return subprocess.run(['git', '-C', str(self.repo)] + list(args), check=True, capture_output=True).stdout
+
+    def _list_tree(self) -> Dict[str, str]:
+        args = ['ls-tree', '-r', '-z', self.rev]
+        if self.subdir:
+            args += ['--', self.subdir + '/']
+        blobs = {}
+        prefix = self.subdir + '/' if self.subdir else ''
+        for entry in self._git(*args).split(b'\0'):
+            if not entry:
+                continue
+            meta, name = entry.split(b'\t', 1)
+            mode, kind, sha = meta.decode().split()
+            # Symlinks (120000) and submodules are skipped
+            if kind == 'blob' and mode != '120000':
+                blobs[name.decode('utf-8')[len(prefix):]] = sha
+        return blobs
+
+    def files(self, suffix: str = '.py') -> List[Path]:
+        return [self.root / name for name in self._blobs if name.endswith(suffix)]
+
+    def exists(self, path: Path) -> bool:
+        try:
+            return self.relative(path) in self._blobs
+        except ValueError:
+            return False
+
+    def stamp(self, path: Path) -> Optional[Hashable]:
+        return self._blobs.get(self.relative(path))
+
+    def read_bytes(self, path: Path) -> bytes:
+        try:
+            sha = self._blobs[self.relative(path)]
+        except KeyError:
+            raise FileNotFoundError(str(path))
+        with self._lock:
+            if self._process is None:
+                self._process = subprocess.Popen(
+                    ['git', '-C', str(self.repo), 'cat-file', '--batch'],
+                    stdin=subprocess.PIPE, stdout=subprocess.PIPE
+                )
+            self._process.stdin.write(sha.encode() + b'\n')
+            self._process.stdin.flush()
+            header = self._process.stdout.readline().split()
+            if len(header) < 3 or header[1] == b'missing':
+                raise FileNotFoundError(f"{path} ({sha} missing from repository)")
+            data = self._process.stdout.read(int(header[2]))
+            self._process.stdout.read(1)  # trailing newline
+            return data
+
+    def close(self):
+        with self._lock:
+            if self._process is not None:
+                self._process.stdin.close()
+                self._process.wait()
+                self._process.stdout.close()
+                self._process = None
+
+
+def open_source(source_path: Path, rev: Optional[str] = None, entry: Optional[str] = None) -> Tuple[SourceProvider, Path]:
+    """Pick a provider for a command-line source path and return it with the entry file.
+
+    ``source_path`` may be a directory or entry file (read from the work tree,
+    or from git at ``rev`` when given) or a zip/tar archive. ``entry`` is
+    relative to the source root and defaults to the given file or ``main.py``.
+    """
+    source_path = Path(source_path).resolve()
+    entry_name = entry
+
+    if source_path.is_file() and source_path.suffix != '.py':
+        provider = ArchiveSource(source_path)
+    else:
+        directory = source_path
+        if source_path.suffix == '.py' and not source_path.is_dir():
+            directory = source_path.parent
+            entry_name = entry_name or source_path.name
+        provider = GitSource.for_path(directory, rev) if rev else LocalSource(directory)
+
+    entry_file = provider.root / (entry_name or 'main.py')
+    if not provider.exists(entry_file):
+        provider.close()
+        raise FileNotFoundError(f"Entry file not found: {entry_file}")
+    return provider, entry_file
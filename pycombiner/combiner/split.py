@@ -0,0 +1,227 @@
+"""
+Code splitting: modules shared by several entry points go into chunk files
+
+Every reachable file is labelled with the set of entry points reaching it.
+Files reached by one entry only are merged into that entry's bundle; files
+sharing the same set of two or more entries form one chunk. A chunk is
+written once, named by the hash of its content, and each bundle loads the
+chunks it needs at run time by executing them in its own namespace, the
+same namespace merged files share in a single bundle.
+
+A dependency of a file is reached by every entry reaching the file, so a
+chunk only depends on chunks shared by a superset of its entries. Bundles
+load chunks shared by more entries first, then run their own files.
+"""
+import hashlib
+import os
+import re
+from array import array
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, TextIO, Tuple
+
+from .combiner import PyCombiner, dependency_order
+from .graph import DependencyGraph
+from .index import ModuleIndex, ParseCache
+from .log import get_logger
+
+logger = get_logger('split')
+
+# Defined once per bundle; chunk paths are relative to the bundle's directory
+CHUNK_LOADER = '''\
+def _pycombiner_load_chunk(name, _loaded=set()):
+    """Run a shared chunk in this bundle's namespace, once"""
+    if name in _loaded:
+        return
+    _loaded.add(name)
+    import os as _os
+    path = _os.path.join(_os.path.dirname(_os.path.abspath(__file__)), name)
+    with open(path, encoding='utf-8') as f:
+        exec(compile(f.read(), path, 'exec'), globals())
+'''
+
+_CHUNK_NAME = re.compile(r'chunk-[0-9a-f]{16}\.py')
+
+
+@dataclass
+class Chunk:
+    """Files shared by the same set of entry points"""
+    entries: Tuple[str, ...]      # Labels of the entry files sharing the chunk, sorted
+    files: List[Path]
+    name: str = ''                # chunk-<hash>.py, set once rendered
+    size: int = 0
+
+
+@dataclass
+class SplitResult:
+    """Bundles and chunks written by ``split_bundles``"""
+    bundles: List[Path] = field(default_factory=list)
+    chunks: List[Chunk] = field(default_factory=list)
+    bundle_chunks: Dict[Path, List[str]] = field(default_factory=dict)  # Chunk names loaded per bundle
+    chunk_dir: Optional[Path] = None
+    pruned: List[Path] = field(default_factory=list)  # Stale chunk files removed
+
+    @property
+    def total_size(self) -> int:
+        return sum(path.stat().st_size for path in self.bundles) + sum(chunk.size for chunk in self.chunks)
+
+
+def _label(path: Path, source_dir: Path) -> str:
+    try:
+        return Path(path).relative_to(source_dir).as_posix()
+    except ValueError:
+        return str(path)
+
+
+def plan_chunks(graph: DependencyGraph, entries: Sequence[Path],
+                source_dir: Path) -> Tuple[Dict[Path, List[Path]], List[Chunk]]:
+    """Split the files reachable from ``entries`` into per-entry files and shared chunks.
+
+    Returns each entry's own files in merge order, and the chunks ordered
+    so that every chunk comes after the chunks it may depend on. Chunks and
+    the order of their files only depend on the graph and the set of
+    entries, not on the order the entries are given in.
+    """
+    entries = sorted(entries, key=lambda path: _label(path, source_dir))
+    labels = [_label(entry, source_dir) for entry in entries]
+    orders = [dependency_order(graph.forward, [graph.node_id(str(entry))]) for entry in entries]
+
+    owners: Dict[int, List[int]] = {}
+    canonical = array('I')  # Dependencies first across all entries
+    for k, order in enumerate(orders):
+        for node in order:
+            reached = owners.setdefault(node, [])
+            if not reached:
+                canonical.append(node)
+            reached.append(k)
+
+    own = {
+        entry: [Path(graph.nodes[node]) for node in order if len(owners[node]) == 1]
+        for entry, order in zip(entries, orders)
+    }
+
+    groups: Dict[Tuple[int, ...], List[Path]] = {}
+    for node in canonical:
+        if len(owners[node]) > 1:
+            groups.setdefault(tuple(owners[node]), []).append(Path(graph.nodes[node]))
+    chunks = [
+        Chunk(tuple(labels[k] for k in key), files)
+        for key, files in sorted(groups.items(), key=lambda item: (-len(item[0]), item[0]))
+    ]
+    return own, chunks
+
+
+class _ChunkCombiner(PyCombiner):
+    """Renders the files of a chunk; paths are always relative so the content only depends on the files"""
+
+    def __init__(self, chunk: Chunk, source_dir: Path, **kwargs):
+        kwargs['reproducible'] = True
+        super().__init__(chunk.files[0], source_dir, None, quiet=True, **kwargs)
+        self.chunk = chunk
+
+    def _get_merge_order(self) -> array:
+        return array('I', [self.graph.node_id(str(path)) for path in self.chunk.files])
+
+    def _write_header(self, out: TextIO):
+        out.write("# Generated by PyCombiner\n")
+        out.write(f"# Chunk shared by: {', '.join(self.chunk.entries)}\n\n")
+
+
+class _EntryCombiner(PyCombiner):
+    """Renders an entry point's own files, loading its shared chunks first"""
+
+    def __init__(self, entry_file: Path, source_dir: Path, output_file: Path, files: List[Path],
+                 chunk_paths: List[str], **kwargs):
+        super().__init__(entry_file, source_dir, output_file, quiet=True, **kwargs)
+        self.files = files
+        self.chunk_paths = chunk_paths
+
+    def _get_merge_order(self) -> array:
+        return array('I', [self.graph.node_id(str(path)) for path in self.files])
+
+    def _compute_content_hash(self) -> str:
+        digest = hashlib.sha256(super()._compute_content_hash().encode('ascii'))
+        for path in self.chunk_paths:
+            digest.update(f"\0chunk:{path}".encode('utf-8'))
+        return digest.hexdigest()
+
+    def _write_preamble(self, out: TextIO):
+        if not self.chunk_paths:
+            return
+        out.write(CHUNK_LOADER + '\n')
+        for path in self.chunk_paths:
+            out.write(f"_pycombiner_load_chunk({path!r})\n")
+        out.write('\n')
+
+
+def prune_chunks(chunk_dir: Path, keep: Iterable[str]) -> List[Path]:
+    """Remove the chunk files of ``chunk_dir`` not named in ``keep`` and return their paths"""
+    keep = set(keep)
+    removed = []
+    for path in sorted(Path(chunk_dir).iterdir()):
+        if _CHUNK_NAME.fullmatch(path.name) and path.name not in keep:
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            removed.append(path)
+    return removed
+
+
+def split_bundles(entries: Dict[Path, Path], source_dir: Path, chunk_dir: Optional[Path] = None,
+                  index: Optional[ModuleIndex] = None, parse_cache: Optional[ParseCache] = None,
+                  prune: bool = True, **options) -> SplitResult:
+    """Write one bundle per ``{entry file: output file}`` and the chunks they share.
+
+    Chunks go to ``chunk_dir`` (default: the directory of the first
+    output) as ``chunk-<hash>.py``; an unchanged chunk keeps its name, so
+    it is only rewritten when its files change. With ``prune`` the chunk
+    files no bundle loads any more are then removed, so ``chunk_dir``
+    should only hold the chunks of this set of entries. ``options`` are
+    passed to PyCombiner.
+    """
+    if options.get('vendor'):
+        raise ValueError("Vendoring is not supported together with code splitting")
+    source_dir = Path(source_dir)
+    index = index if index is not None else ModuleIndex(source_dir)
+    parse_cache = parse_cache if parse_cache is not None else ParseCache(source=index.source)
+    first_entry = next(iter(entries))
+    graph = PyCombiner(first_entry, source_dir, None, index=index, parse_cache=parse_cache).build_graph()
+    for entry in entries:
+        graph.add_node(str(entry))
+    shared = {'index': index, 'parse_cache': parse_cache, 'graph': graph}
+
+    own, chunks = plan_chunks(graph, list(entries), source_dir)
+    chunk_dir = Path(chunk_dir) if chunk_dir is not None else Path(entries[first_entry]).parent
+    chunk_dir.mkdir(parents=True, exist_ok=True)
+
+    result = SplitResult(chunks=chunks, chunk_dir=chunk_dir)
+    for chunk in chunks:
+        combiner = _ChunkCombiner(chunk, source_dir, **shared, **options)
+        data = combiner.render().encode('utf-8')
+        chunk.name = f"chunk-{hashlib.sha256(data).hexdigest()[:16]}.py"
+        chunk.size = len(data)
+        path = chunk_dir / chunk.name
+        if not path.exists():
+            # Same name, same content: unchanged chunks are left alone
+            combiner.output_file = path
+            combiner._write_output(data)
+        logger.debug("Chunk %s: %d files shared by %s", chunk.name, len(chunk.files), ', '.join(chunk.entries))
+
+    for entry, output_file in entries.items():
+        output_file = Path(output_file)
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        label = _label(entry, source_dir)
+        chunk_paths = [
+            Path(os.path.relpath(chunk_dir / chunk.name, output_file.parent)).as_posix()
+            for chunk in chunks if label in chunk.entries
+        ]
+        combiner = _EntryCombiner(entry, source_dir, output_file, own[entry], chunk_paths, **shared, **options)
+        combiner.combine()
+        result.bundles.append(output_file)
+        result.bundle_chunks[output_file] = [chunk.name for chunk in chunks if label in chunk.entries]
+    if prune:
+        result.pruned = prune_chunks(chunk_dir, (chunk.name for chunk in chunks))
+        for path in result.pruned:
+            logger.debug("Removed stale chunk %s", path.name)
+    return result
@@ -0,0 +1,358 @@
+"""
+Start-up benchmark of a bundle against the files it was built from
+
+The entry file and the bundle are launched alternately in fresh
+interpreters under ``-X importtime``. Each run records the wall-clock time,
+the total import time and the peak resident set size of the child. The
+difference between the two is then broken down into:
+
+- local modules: imported (found, loaded and run) by the original
+- module bodies: the same modules inlined into the bundle, where only their
+  bodies run, timed section by section in a separate instrumented launch
+- bundle load: the main script is never cached as bytecode, so the bundle
+  is compiled again on every launch; a compressed bundle also decodes and
+  decompresses its payload, then compiles or unmarshals it
+- hoisted imports: the modules the bundle header (and a compressed
+  bundle's stub) imports, typically up front where the original only
+  imported them on some paths
+"""
+import base64
+import json
+import marshal
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .compress import decompress_payload, split_stub
+from .index import ModuleIndex
+from .log import get_logger
+from .prescan import scan_imports
+
+logger = get_logger('startup')
+
+# ru_maxrss is in kilobytes on Linux and in bytes on macOS
+_RSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+
+# A child's peak RSS starts from its parent's at fork time, so scripts are
+# spawned from this small interpreter instead of from the (larger) bundler
+_LAUNCHER = '''\
+import os, sys, time
+null = os.open(os.devnull, os.O_RDWR)
+start = time.perf_counter()
+pid = os.posix_spawn(sys.executable, [sys.executable] + sys.argv[1:], os.environ,
+                     file_actions=[(os.POSIX_SPAWN_DUP2, null, 0), (os.POSIX_SPAWN_DUP2, null, 1)])
+_, status, usage = os.wait4(pid, 0)
+wall = time.perf_counter() - start
+code = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+sys.stdout.write('%r %d %d' % (wall, usage.ru_maxrss, code))
+'''
+
+# Section separators written by the combiner; what precedes the first one is the header
+_SECTION = re.compile(r"^#={80}\n# \[\d+\] .*? : (.*?)(?: \(lazy\))?\n#={80}$", re.M)
+
+# Runs a bundle section by section in one namespace, timing each section's body:
+# python -c _SECTION_RUNNER <output.json> <bundle source> <script name> [args]
+_SECTION_RUNNER = '''\
+import json, os, re, sys, time, types
+out, path, script = sys.argv[1:4]
+sys.argv = [script] + sys.argv[4:]
+sys.path[0] = os.path.dirname(os.path.abspath(script))
+with open(path, encoding='utf-8') as f:
+    source = f.read()
+marks = list(re.finditer(%r, source, re.M))
+bounds = [(None, 0)] + [(m.group(1), m.end()) for m in marks]
+ends = [m.start() for m in marks] + [len(source)]
+main = sys.modules['__main__'] = types.ModuleType('__main__')
+main.__file__ = script
+namespace = main.__dict__
+times = []
+try:
+    for (name, start), end in zip(bounds, ends):
+        # Padded so line numbers match the bundle
+        code = compile('\\n' * source.count('\\n', 0, start) + source[start:end], script, 'exec')
+        began = time.perf_counter()
+        try:
+            exec(code, namespace)
+        finally:
+            times.append((name, time.perf_counter() - began))
+finally:
+    with open(out, 'w') as f:
+        json.dump(times, f)
+''' % _SECTION.pattern
+
+
+@dataclass
+class StartupRun:
+    """One launch of a script"""
+    wall: float                   # Seconds from spawn to exit
+    import_us: int                # Total -X importtime, top-level cumulative times
+    max_rss: Optional[int]        # Peak RSS in bytes, None where os.wait4 is missing (Windows)
+    returncode: int
+    self_us: Dict[str, int] = field(default_factory=dict)        # Import self time per module
+    cumulative_us: Dict[str, int] = field(default_factory=dict)  # Import time per module, nested imports included
+
+
+def parse_importtime(stderr: str) -> Tuple[int, Dict[str, int], Dict[str, int]]:
+    """Return (total, self times per module, cumulative times per module), in microseconds, from ``-X importtime`` output"""
+    total = 0
+    self_us: Dict[str, int] = {}
+    cumulative_us: Dict[str, int] = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2]
+        module = name.strip()
+        self_us[module] = self_us.get(module, 0) + int(fields[0])
+        cumulative_us[module] = cumulative_us.get(module, 0) + int(fields[1])
+        # Nested entries are included in their parent's cumulative time
+        if name.startswith(' ') and not name.startswith('  '):
+            total += int(fields[1])
+    return total, self_us, cumulative_us
+
+
+def run_once(argv: Sequence[str], env: Optional[Dict[str, str]] = None) -> StartupRun:
+    """Launch ``python -X importtime argv`` and measure it"""
+    command = ['-X', 'importtime', *argv]
+    if hasattr(os, 'posix_spawn') and hasattr(os, 'wait4'):
+        result = subprocess.run([sys.executable, '-c', _LAUNCHER, *command], stdin=subprocess.DEVNULL,
+                                capture_output=True, env=env, check=True)
+        wall, max_rss, returncode = result.stdout.split()
+        wall, max_rss, returncode = float(wall), int(max_rss) * _RSS_UNIT, int(returncode)
+    else:
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, *command], stdin=subprocess.DEVNULL,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, env=env)
+        wall, max_rss, returncode = time.perf_counter() - start, None, result.returncode
+    total, self_us, cumulative_us = parse_importtime(result.stderr.decode('utf-8', errors='replace'))
+    return StartupRun(wall, total, max_rss, returncode, self_us, cumulative_us)
+
+
+def distribution(values: Iterable[float]) -> Dict[str, float]:
+    """Median, 90th percentile, minimum and maximum of a series"""
+    values = sorted(values)
+    if not values:
+        return {}
+    return {
+        'median': statistics.median(values),
+        'p90': values[min(len(values) - 1, int(round(0.9 * (len(values) - 1))))],
+        'min': values[0],
+        'max': values[-1],
+    }
+
+
+def _median(runs: List[StartupRun], times: str, module: str) -> float:
+    return statistics.median(getattr(run, times).get(module, 0) for run in runs)
+
+
+@dataclass
+class StartupComparison:
+    """Runs of the original entry file and of its bundle"""
+    original: List[StartupRun]
+    bundle: List[StartupRun]
+    local_modules: Set[str]
+    load_us: float                # Median time to compile the bundle, and to unpack a compressed one, in process
+    hoisted_modules: Set[str] = field(default_factory=set)  # Imported by the bundle header or stub
+    # Median run time of each inlined module's body; None when not measured (marshalled code)
+    body_us: Optional[Dict[str, float]] = None
+
+    def metrics(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Distribution of each measure, for the original and the bundle"""
+        result = {}
+        for name, value in (('wall_ms', lambda run: run.wall * 1000),
+                            ('import_ms', lambda run: run.import_us / 1000),
+                            ('max_rss_mib', lambda run: run.max_rss / 2 ** 20 if run.max_rss is not None else None)):
+            result[name] = {}
+            for label, runs in (('original', self.original), ('bundle', self.bundle)):
+                values = [v for v in map(value, runs) if v is not None]
+                result[name][label] = distribution(values)
+        return result
+
+    def attribution(self, top: int = 10, threshold_us: int = 50) -> Dict[str, object]:
+        """Break the start-up difference down by cause, in median microseconds"""
+        modules = set()
+        for run in self.original:
+            modules.update(run.self_us)
+        body_us = self.body_us or {}
+        local = (modules | set(body_us)) & self.local_modules
+
+        # Per local module: import in the original against its inlined body in the bundle
+        per_module = sorted(((_median(self.original, 'self_us', m), body_us.get(m, 0.0), m) for m in local),
+                            key=lambda item: (-(item[0] - item[1]), item[2]))
+        hoisted = []
+        for module in self.hoisted_modules - self.local_modules:
+            delta = _median(self.bundle, 'cumulative_us', module) - _median(self.original, 'cumulative_us', module)
+            if abs(delta) >= threshold_us:
+                hoisted.append((delta, module))
+        hoisted.sort(key=lambda item: (-abs(item[0]), item[1]))
+
+        wall_delta = (statistics.median(r.wall for r in self.bundle)
+                      - statistics.median(r.wall for r in self.original)) * 1e6
+        local_total = sum(cost for cost, _, _ in per_module)
+        body_total = sum(body for _, body, _ in per_module)
+        hoisted_total = sum(delta for delta, _ in hoisted)
+        return {
+            'wall_delta_us': wall_delta,
+            'local_modules_us': local_total,
+            'local_modules': [(m, cost) for cost, _, m in per_module[:top] if cost > 0],
+            'module_bodies_us': body_total,
+            'module_bodies': [(m, cost, body) for cost, body, m in per_module[:top]],
+            'bundle_load_us': self.load_us,
+            'hoisted_imports_us': hoisted_total,
+            'hoisted_imports': [(m, delta) for delta, m in hoisted[:top]],
+            'other_us': wall_delta + local_total - body_total - self.load_us - hoisted_total,
+        }
+
+    @property
+    def returncodes(self) -> Tuple[Set[int], Set[int]]:
+        return {run.returncode for run in self.original}, {run.returncode for run in self.bundle}
+
+
+def unpack_bundle(text: str) -> Tuple[Optional[str], str]:
+    """(merged source, stub) of a bundle; the source is None for marshalled code, the stub '' for a plain bundle"""
+    stub = split_stub(text)
+    if stub is None:
+        return text, ''
+    method, marshalled, encoded = stub
+    if marshalled:
+        return None, text
+    return decompress_payload(base64.b85decode(encoded), method).decode('utf-8'), text
+
+
+def header_imports(source: str) -> Set[str]:
+    """Modules imported at the top level of a bundle's header, before its first section"""
+    first = _SECTION.search(source)
+    header = source[:first.start()] if first else source
+    return {item.module for item in scan_imports(header) if item.module and not item.level and item.depth == 1}
+
+
+def _load_time(path: Path, repeat: int = 5) -> float:
+    """Median time to compile a bundle, then decode, decompress and compile or unmarshal its payload"""
+    text = path.read_text(encoding='utf-8')
+    stub = split_stub(text)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        compile(text, str(path), 'exec')
+        if stub is not None:
+            method, marshalled, encoded = stub
+            payload = decompress_payload(base64.b85decode(encoded), method)
+            if marshalled:
+                marshal.loads(payload)
+            else:
+                compile(payload, str(path), 'exec')
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1e6
+
+
+def section_times(bundle_file: Path, source: str, args: Sequence[str] = (), env: Optional[Dict[str, str]] = None,
+                  runs: int = 3) -> Dict[str, float]:
+    """Median seconds spent running each section of a merged source, by the path in its separator.
+
+    ``source`` is the bundle's merged source (unpacked if compressed); it
+    runs as ``bundle_file`` with ``args``, one section at a time. The
+    header is listed under ''.
+    """
+    samples: Dict[str, List[float]] = {}
+    with tempfile.TemporaryDirectory(prefix='pycombiner-sections-') as tmp:
+        source_file, output = Path(tmp) / 'bundle.py', Path(tmp) / 'sections.json'
+        source_file.write_text(source, encoding='utf-8')
+        for _ in range(runs):
+            subprocess.run([sys.executable, '-c', _SECTION_RUNNER, str(output), str(source_file), str(bundle_file), *args],
+                           stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env)
+            if not output.exists():
+                continue
+            for name, seconds in json.loads(output.read_text(encoding='utf-8')):
+                samples.setdefault(name or '', []).append(seconds)
+            output.unlink()
+    return {name: statistics.median(values) for name, values in samples.items()}
+
+
+def bench_startup(entry_file: Path, bundle_file: Path, source_dir: Optional[Path] = None, runs: int = 20,
+                  args: Sequence[str] = (), warmup: int = 1) -> StartupComparison:
+    """Launch the entry file and its bundle ``runs`` times each, alternately.
+
+    ``source_dir`` (default: the entry file's directory) is put on
+    PYTHONPATH for the original, as the combiner resolves imports from it.
+    ``warmup`` launches of each are not measured; they also write the
+    bytecode caches a deployed original would have. The module bodies of a
+    bundle of marshalled code cannot be timed separately.
+    """
+    entry_file, bundle_file = Path(entry_file), Path(bundle_file)
+    source_dir = Path(source_dir) if source_dir is not None else entry_file.parent
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(source_dir), env.get('PYTHONPATH')]))
+    bundle_env = dict(os.environ)
+
+    original, bundle = [], []
+    for i in range(warmup + runs):
+        first = run_once([str(entry_file), *args], env)
+        second = run_once([str(bundle_file), *args], bundle_env)
+        if i >= warmup:
+            original.append(first)
+            bundle.append(second)
+    logger.debug("Measured %d launches of %s and %s", runs, entry_file, bundle_file)
+
+    index = ModuleIndex(source_dir)
+    local_modules = {index.module_name(path) for path in index.files} - {None}
+
+    source, stub = unpack_bundle(bundle_file.read_text(encoding='utf-8'))
+    hoisted_modules = header_imports(stub) if stub else set()
+    body_us = None
+    if source is not None:
+        body_us = {}
+        hoisted_modules |= header_imports(source)
+        for shown, seconds in section_times(bundle_file, source, args, bundle_env, min(runs, 3)).items():
+            path = Path(shown)
+            path = path if path.is_absolute() else source_dir / path
+            # The entry file's section is the program itself, which the original runs too
+            if shown and path != entry_file.resolve() and path != entry_file:
+                module = index.module_name(path)
+                if module is not None:
+                    body_us[module] = body_us.get(module, 0.0) + seconds * 1e6
+    return StartupComparison(original, bundle, local_modules, _load_time(bundle_file), hoisted_modules, body_us)
+
+
+def format_comparison(comparison: StartupComparison, top: int = 10) -> str:
+    """Text report of a comparison"""
+    lines = [f"Start-up: original vs bundle, {len(comparison.original)} launches each", ""]
+    lines.append(f"{'':<16}{'original (median / p90 / min)':>34}{'bundle (median / p90 / min)':>34}{'change':>10}")
+    metrics = comparison.metrics()
+    for name, label in (('wall_ms', 'wall (ms)'), ('import_ms', 'imports (ms)'), ('max_rss_mib', 'peak RSS (MiB)')):
+        stats = metrics[name]
+        if not stats['original'] or not stats['bundle']:
+            continue
+        cells = [f"{s['median']:.1f} / {s['p90']:.1f} / {s['min']:.1f}" for s in (stats['original'], stats['bundle'])]
+        change = stats['bundle']['median'] / stats['original']['median'] - 1 if stats['original']['median'] else 0.0
+        lines.append(f"{label:<16}{cells[0]:>34}{cells[1]:>34}{change:>+10.1%}")
+
+    attribution = comparison.attribution(top)
+    lines.append("")
+    lines.append(f"Attribution of the wall-clock change ({attribution['wall_delta_us'] / 1000:+.2f} ms):")
+    lines.append(f"  {-attribution['local_modules_us'] / 1000:+8.2f} ms  local modules no longer imported")
+    if comparison.body_us is None:
+        lines.append(f"  {'':>11}  their bodies run inlined in the bundle: not measured for marshalled code, see other")
+    else:
+        lines.append(f"  {attribution['module_bodies_us'] / 1000:+8.2f} ms  their bodies run inlined in the bundle")
+    for module, cost, body in attribution['module_bodies']:
+        lines.append(f"  {'':>11}  - {module} ({cost / 1000:.2f} ms imported, {body / 1000:.2f} ms inlined)")
+    lines.append(f"  {attribution['bundle_load_us'] / 1000:+8.2f} ms  loading the bundle (compile, unpack; no cached bytecode)")
+    lines.append(f"  {attribution['hoisted_imports_us'] / 1000:+8.2f} ms  imports hoisted into the bundle header")
+    for module, delta in attribution['hoisted_imports']:
+        lines.append(f"  {'':>11}  - {module} ({delta / 1000:+.2f} ms)")
+    lines.append(f"  {attribution['other_us'] / 1000:+8.2f} ms  other (interpreter, noise)")
+
+    original_codes, bundle_codes = comparison.returncodes
+    if original_codes != bundle_codes:
+        lines.append("")
+        lines.append(f"⚠️  Exit statuses differ: original {sorted(original_codes)}, bundle {sorted(bundle_codes)}")
+    return '\n'.join(lines)
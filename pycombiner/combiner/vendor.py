@@ -0,0 +1,290 @@
+"""
+Vendoring of pure-Python third-party packages into the bundle
+
+Vendored modules are not merged into the bundle's namespace like project
+files: their sources are embedded as strings and served by an import hook
+installed at the top of the bundle, so packages keep their own module
+objects, relative imports and ``import a.b`` semantics. Only the submodules
+reachable from the project's imports are embedded.
+"""
+import hashlib
+import importlib.machinery
+import importlib.util
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .classify import stdlib_module_names
+from .graph import DependencyGraph
+from .index import ModuleIndex
+from .log import get_logger
+from .prescan import ScannedImport, scan_imports
+from .sources import LocalSource
+
+logger = get_logger('vendor')
+
+# Written once into the bundle header, before the imports it serves
+VENDOR_LOADER = '''\
+import importlib.abc as _pycombiner_abc
+import importlib.util as _pycombiner_util
+import sys as _pycombiner_sys
+
+class _PyCombinerVendorImporter(_pycombiner_abc.MetaPathFinder, _pycombiner_abc.Loader):
+    """Imports vendored modules from the sources embedded in this bundle"""
+
+    def __init__(self, modules):
+        self.modules = modules  # {name: (is_package, source)}
+
+    def find_spec(self, fullname, path=None, target=None):
+        if fullname not in self.modules:
+            return None
+        return _pycombiner_util.spec_from_loader(fullname, self, is_package=self.modules[fullname][0])
+
+    def create_module(self, spec):
+        return None
+
+    def exec_module(self, module):
+        source = self.modules[module.__name__][1]
+        exec(compile(source, '<vendored ' + module.__name__ + '>', 'exec'), module.__dict__)
+
+    def get_source(self, fullname):
+        return self.modules[fullname][1]
+'''
+
+
+class VendoredModule(NamedTuple):
+    """A module of a vendored package"""
+    name: str
+    path: Path
+    is_package: bool
+
+
+class VendoredPackage:
+    """An installed pure-Python package (or single module), found in the active environment"""
+
+    def __init__(self, name: str):
+        if '.' in name:
+            raise ValueError(f"Vendor top-level packages only, not '{name}'")
+        if name in stdlib_module_names():
+            raise ValueError(f"'{name}' is part of the standard library")
+        spec = importlib.util.find_spec(name)
+        if spec is None:
+            raise ValueError(f"'{name}' is not installed in this environment")
+        if spec.submodule_search_locations is not None:
+            locations = list(spec.submodule_search_locations)
+            if spec.origin is None or len(locations) != 1:
+                raise ValueError(f"'{name}' is a namespace package, which cannot be vendored")
+            self.location = Path(locations[0])
+        elif spec.origin and spec.origin.endswith('.py'):
+            self.location = Path(spec.origin)
+        else:
+            raise ValueError(f"'{name}' is not a pure-Python module ({spec.origin})")
+        self.name = name
+        self.root = self.location.parent
+        self._check_pure_python()
+        self.index = ModuleIndex(self.root, _PackageSource(self.root, self.location))
+
+    def _check_pure_python(self):
+        if not self.location.is_dir():
+            return
+        suffixes = tuple(importlib.machinery.EXTENSION_SUFFIXES)
+        for directory, _, files in os.walk(self.location):
+            for file in files:
+                if file.endswith(suffixes):
+                    raise ValueError(f"'{self.name}' contains extension modules ({Path(directory) / file})")
+
+
+class _PackageSource(LocalSource):
+    """Files of one installed package; paths stay relative to its site directory"""
+
+    def __init__(self, root: Path, location: Path):
+        super().__init__(root)
+        self.location = location
+
+    def files(self, suffix: str = '.py') -> List[Path]:
+        if self.location.is_dir():
+            return list(self.location.rglob(f'*{suffix}'))
+        return [self.location] if self.location.name.endswith(suffix) else []
+
+
+Record = Tuple[str, int, Tuple[str, ...]]
+
+
+class ImportRecordCache:
+    """Import records of installed files, shared by every project vendoring them.
+
+    Records are kept per file together with its size and modification time,
+    in memory and, with ``cache_dir``, in one JSON file per package
+    location, so a package is scanned once per version rather than once
+    per project and build.
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None):
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self._tables: Dict[Path, Dict[str, list]] = {}
+        self._dirty: set = set()
+        self.hits = 0
+        self.misses = 0
+
+    def _table_path(self, location: Path) -> Path:
+        digest = hashlib.sha256(str(location).encode('utf-8')).hexdigest()[:32]
+        return self.cache_dir / f"{digest}.json"
+
+    def _table(self, location: Path) -> Dict[str, list]:
+        table = self._tables.get(location)
+        if table is None:
+            table = {}
+            if self.cache_dir is not None:
+                try:
+                    with open(self._table_path(location), encoding='utf-8') as f:
+                        table = json.load(f)
+                except (OSError, ValueError):
+                    pass
+            self._tables[location] = table
+        return table
+
+    def records(self, package: VendoredPackage, path: Path) -> List[Record]:
+        """``(module, level, names)`` of the imports of an installed file"""
+        stat = os.stat(path)
+        table = self._table(package.location)
+        key = package.index.source.relative(path)
+        entry = table.get(key)
+        if entry is not None and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            self.hits += 1
+            return [(module, level, tuple(names)) for module, level, names in entry[2]]
+        self.misses += 1
+        with open(path, encoding='utf-8') as f:
+            found = scan_imports(f.read())
+        records = [(item.module, item.level, item.names) for item in found]
+        table[key] = [stat.st_size, stat.st_mtime_ns, [[m, l, list(n)] for m, l, n in records]]
+        self._dirty.add(package.location)
+        return records
+
+    def flush(self):
+        """Write changed tables to ``cache_dir``"""
+        if self.cache_dir is None:
+            self._dirty.clear()
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        for location in self._dirty:
+            path = self._table_path(location)
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, prefix='.tmp-')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(self._tables[location], f)
+                os.replace(tmp, path)
+            except OSError as e:
+                logger.warning("Cannot write vendor cache %s: %s", path, e)
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+        self._dirty.clear()
+
+
+def _resolve_base(module: str, is_package: bool, level: int) -> Optional[str]:
+    """Package a relative import of ``level`` dots in ``module`` refers to"""
+    parts = module.split('.') if is_package else module.split('.')[:-1]
+    if level - 1 > len(parts) - 1:
+        return None
+    return '.'.join(parts[:len(parts) - level + 1])
+
+
+class Vendor:
+    """Selects and embeds the reachable modules of the packages to vendor"""
+
+    def __init__(self, names: Iterable[str], records: Optional[ImportRecordCache] = None):
+        self.packages: Dict[str, VendoredPackage] = {}
+        for name in names:
+            if name not in self.packages:
+                self.packages[name] = VendoredPackage(name)
+        self.records = records if records is not None else ImportRecordCache()
+        self.graph = DependencyGraph()
+        self.modules: List[VendoredModule] = []
+        self._sources: Dict[str, str] = {}
+
+    def _lookup(self, module: str) -> Optional[VendoredModule]:
+        package = self.packages.get(module.partition('.')[0])
+        if package is None:
+            return None
+        path = package.index.resolve(module)
+        if path is None:
+            return None
+        return VendoredModule(module, path, path.name == '__init__.py')
+
+    def _targets(self, record: Record, importer: Optional[VendoredModule] = None) -> List[VendoredModule]:
+        """Vendored modules an import executes: the module, its parent packages and imported submodules"""
+        module, level, names = record
+        if level:
+            if importer is None:
+                return []
+            base = _resolve_base(importer.name, importer.is_package, level)
+            if base is None:
+                return []
+            module = f"{base}.{module}" if module else base
+        found = []
+        parts = module.split('.')
+        for i in range(1, len(parts) + 1):
+            target = self._lookup('.'.join(parts[:i]))
+            if target is not None:
+                found.append(target)
+        for name in names:
+            if name != '*':
+                target = self._lookup(f"{module}.{name}")
+                if target is not None:
+                    found.append(target)
+        return found
+
+    def select(self, project_imports: Iterable[ScannedImport]) -> List[VendoredModule]:
+        """Vendored modules reachable from the project's imports, sorted by name"""
+        self.graph.add_node('<bundle>')
+        known: Dict[str, VendoredModule] = {}
+        queue: List[VendoredModule] = []
+
+        def link(src: str, targets: List[VendoredModule]):
+            for target in targets:
+                if target.name not in known:
+                    known[target.name] = target
+                    queue.append(target)
+                self.graph.add_edge(src, target.name)
+
+        for item in project_imports:
+            if not item.level:
+                link('<bundle>', self._targets((item.module, 0, item.names)))
+        while queue:
+            current = queue.pop()
+            package = self.packages[current.name.partition('.')[0]]
+            try:
+                records = self.records.records(package, current.path)
+            except SyntaxError as e:
+                logger.warning("Cannot scan vendored module %s: %s", current.name, e)
+                continue
+            self.graph.add_node(current.name)
+            for record in records:
+                link(current.name, self._targets(record, current))
+        self.records.flush()
+
+        reachable = self.graph.transitive_closure('<bundle>')
+        self.modules = sorted((known[name] for name in reachable), key=lambda m: m.name)
+        logger.debug("Vendoring %d of %d modules", len(self.modules),
+                     sum(len(p.index) for p in self.packages.values()))
+        return self.modules
+
+    def source(self, module: VendoredModule) -> str:
+        """Text of a vendored module with newlines normalized, as it is embedded"""
+        text = self._sources.get(module.name)
+        if text is None:
+            with open(module.path, encoding='utf-8') as f:
+                text = self._sources[module.name] = f.read()
+        return text
+
+    def render(self) -> str:
+        """Import hook and embedded sources of the selected modules"""
+        lines = [VENDOR_LOADER, '_pycombiner_sys.meta_path.insert(0, _PyCombinerVendorImporter({']
+        for module in self.modules:
+            lines.append(f"    {module.name!r}: ({module.is_package!r}, {self.source(module)!r}),")
+        lines.append('}))')
+        lines.append('')
+        return '\n'.join(lines)
@@ -0,0 +1,95 @@
+import unittest
+import io
+import contextlib
+from pathlib import Path
+import tempfile
+import shutil
+from pycombiner.combiner.api import bundle
+from pycombiner.combiner.merger import merge_sources
+
+class TestBundleAPI(unittest.TestCase):
+    def setUp(self):
+        # Create temporary directory
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.source_dir = self.test_dir / "src"
+        (self.source_dir / "utils").mkdir(parents=True)
+        (self.source_dir / "utils" / "helper.py").write_text(
+            "import json\n\ndef helper():\n    return json.dumps([1])\n"
+        )
+        (self.source_dir / "main.py").write_text(
+            "from utils.helper import helper\n\nprint(helper())\n"
+        )
+
+    def test_bundle_in_memory(self):
+        """Test that bundling returns the source and writes nothing"""
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            result = bundle(self.source_dir)
+        self.assertEqual(stdout.getvalue(), "")
+        self.assertIn("def helper():", result.source)
+        self.assertEqual(result.unhandled_imports, ["import json"])
+        self.assertEqual([p.name for p in result.files], ["helper.py", "main.py"])
+        self.assertEqual(result.to_bytes(), result.source.encode("utf-8"))
+        self.assertEqual(sorted(p.name for p in self.test_dir.iterdir()), ["src"])
+
+    def test_deep_import_chain(self):
+        """Test that long import chains do not hit the recursion limit"""
+        depth = 1500
+        for i in range(depth):
+            body = f"from m{i + 1} import f{i + 1}\n" if i + 1 < depth else ""
+            (self.source_dir / f"m{i}.py").write_text(body + f"def f{i}():\n    return {i}\n")
+        (self.source_dir / "main.py").write_text("from m0 import f0\n\nprint(f0())\n")
+        result = bundle(self.source_dir, reachable_only=True)
+        self.assertEqual(len(result.files), depth + 1)
+        self.assertEqual(result.files[0].name, f"m{depth - 1}.py")
+        self.assertEqual(result.files[-1].name, "main.py")
+
+    def test_bundle_sinks(self):
+        """Test file, stream and callback sinks"""
+        output_file = self.test_dir / "out.py"
+        text_stream = io.StringIO()
+        received = []
+        result = bundle(self.source_dir / "main.py", output_file=output_file,
+                        stream=text_stream, callback=received.append)
+        self.assertEqual(output_file.read_text(encoding="utf-8"), result.source)
+        self.assertEqual(text_stream.getvalue(), result.source)
+        self.assertIs(received[0], result)
+
+        binary_stream = io.BytesIO()
+        result = bundle(self.source_dir / "main.py", stream=binary_stream)
+        self.assertEqual(binary_stream.getvalue(), result.to_bytes())
+
+    def test_reproducible(self):
+        """Test that copies of a tree in other places give byte-identical bundles"""
+        copy_dir = self.test_dir / "elsewhere" / "src"
+        shutil.copytree(self.source_dir, copy_dir)
+        helper = copy_dir / "utils" / "helper.py"
+        helper.write_bytes(helper.read_bytes().replace(b"\n", b"\r\n"))
+        (copy_dir / "zz_unused.py").write_text("X = 1\n")
+        (self.source_dir / "zz_unused.py").write_text("X = 1\n")
+
+        first = bundle(self.source_dir, reproducible=True)
+        second = bundle(copy_dir, reproducible=True)
+        self.assertEqual(first.source, second.source)
+        self.assertIn(f"# Content hash: sha256:{first.content_hash}\n", first.source)
+        self.assertNotIn(str(self.test_dir), first.source)
+        self.assertNotIn("\r", second.source)
+
+        (copy_dir / "zz_unused.py").write_text("X = 2\n")
+        self.assertNotEqual(bundle(copy_dir, reproducible=True).content_hash, first.content_hash)
+        self.assertIsNone(bundle(self.source_dir).content_hash)
+
+    def test_merge_sources_is_quiet(self):
+        """Test that the merger never prints"""
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            content = merge_sources([Path("main.py")], {}, self.source_dir, self.source_dir / "main.py")
+        self.assertEqual(stdout.getvalue(), "")
+        self.assertIn("print(helper())", content)
+
+    def tearDown(self):
+        # Clean up temporary directory
+        shutil.rmtree(self.test_dir)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import unittest
+from pathlib import Path
+import tempfile
+import shutil
+from pycombiner.combiner.batch import BundleSpec, combine_many, load_manifest, parse_pair
+from pycombiner.combiner.index import ModuleIndex, ParseCache
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        # Create temporary directory
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.source_dir = self.test_dir / "src"
+        (self.source_dir / "lib").mkdir(parents=True)
+        (self.source_dir / "lib" / "__init__.py").write_text("")
+        (self.source_dir / "lib" / "shared.py").write_text("def shared():\n    return 'shared'\n")
+        (self.source_dir / "lib" / "extra.py").write_text("def extra():\n    return 'extra'\n")
+        (self.source_dir / "one.py").write_text(
+            "from lib.shared import shared\n\nprint('one', shared())\n"
+        )
+        (self.source_dir / "two.py").write_text(
+            "from lib.shared import shared\nfrom lib.extra import extra\n\nprint('two', shared(), extra())\n"
+        )
+
+    def test_module_index(self):
+        """Test resolving modules without touching the filesystem"""
+        index = ModuleIndex(self.source_dir)
+        self.assertEqual(len(index), 5)
+        self.assertTrue(index.is_local("lib.shared"))
+        self.assertEqual(index.resolve("lib"), self.source_dir / "lib" / "__init__.py")
+        self.assertFalse(index.is_local("os"))
+
+    def test_parse_cache(self):
+        """Test that files are parsed once and syntax errors are cached"""
+        cache = ParseCache()
+        path = self.source_dir / "one.py"
+        self.assertIs(cache.parse(path), cache.parse(path))
+        self.assertEqual(cache.misses, 1)
+
+        bad = self.source_dir / "bad.py"
+        bad.write_text("def broken(:\n")
+        with self.assertRaises(SyntaxError):
+            cache.parse(bad)
+
+    def test_parse_cache_without_trees(self):
+        """Test that a lean cache keeps sources and imports but not syntax trees"""
+        cache = ParseCache(validate=True, keep_trees=False)
+        path = self.source_dir / "two.py"
+        self.assertIsNot(cache.parse(path), cache.parse(path))
+        self.assertEqual(cache.imports(path), ("lib.shared", "lib.extra"))
+        self.assertEqual(cache.misses, 1)
+
+        path.write_text("import os\n\nprint('changed, and longer than before')\n")
+        self.assertEqual(cache.imports(path), ("os",))
+        self.assertIn("changed", cache.read(path))
+        self.assertEqual(cache.read(self.source_dir / "one.py"), (self.source_dir / "one.py").read_text())
+
+    def test_parse_pair(self):
+        """Test ENTRY:OUTPUT parsing"""
+        spec = parse_pair("one.py:out/one.py", self.test_dir)
+        self.assertEqual(spec.entry_file, (self.test_dir / "one.py").resolve())
+        self.assertEqual(spec.output_file, (self.test_dir / "out" / "one.py").resolve())
+        with self.assertRaises(ValueError):
+            parse_pair("one.py", self.test_dir)
+
+    def test_combine_many(self):
+        """Test bundling several entries from one shared index"""
+        manifest = self.test_dir / "bundles.json"
+        manifest.write_text('''{
+            "source_dir": "src",
+            "reachable_only": true,
+            "bundle": [
+                {"entry": "src/one.py", "output": "dist/one.py"},
+                {"entry": "src/two.py", "output": "dist/two.py"}
+            ]
+        }''')
+        specs = load_manifest(manifest)
+        self.assertEqual(len(specs), 2)
+
+        outcomes = combine_many(specs, jobs=2)
+        self.assertTrue(all(outcome.error is None for outcome in outcomes))
+        self.assertEqual([outcome.files for outcome in outcomes], [2, 3])
+
+        one = (self.test_dir / "dist" / "one.py").read_text()
+        self.assertIn("def shared():", one)
+        self.assertNotIn("def extra():", one)
+        two = (self.test_dir / "dist" / "two.py").read_text()
+        self.assertIn("def extra():", two)
+
+    def test_combine_many_in_one_process(self):
+        """Test that one job bundles in this process, in the given order, with errors kept per bundle"""
+        specs = [
+            BundleSpec(self.source_dir / "two.py", self.test_dir / "dist" / "two.py", self.source_dir, {'reachable_only': True}),
+            BundleSpec(self.test_dir / "outside.py", self.test_dir / "dist" / "outside.py", self.source_dir,
+                       {'reachable_only': True}),
+            BundleSpec(self.source_dir / "one.py", self.test_dir / "dist" / "one.py", options={'reachable_only': True}),
+            BundleSpec(self.source_dir / "one.py", self.test_dir / "dist" / "bad.py", options={'compress': 'nope'}),
+        ]
+        (self.test_dir / "outside.py").write_text("print('outside')\n")
+        outcomes = combine_many(specs, jobs=1)
+        self.assertEqual([outcome.spec.output_file.name for outcome in outcomes], ["two.py", "outside.py", "one.py", "bad.py"])
+        self.assertEqual([outcome.files for outcome in outcomes[:3]], [3, 1, 2])
+        self.assertIsInstance(outcomes[3].error, ValueError)
+        # The caller's specs are left alone
+        self.assertIsNone(specs[2].source_dir)
+        self.assertEqual(outcomes[2].spec.source_dir, self.source_dir)
+
+    def tearDown(self):
+        # Clean up temporary directory
+        shutil.rmtree(self.test_dir)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from pycombiner.combiner.api import bundle
+from pycombiner.combiner.cache import BundleCache, parse_size
+from pycombiner.combiner.combiner import PyCombiner
+from pycombiner.combiner.sources import MemorySource
+
+class TestBundleCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.cache = BundleCache(self.test_dir / "cache")
+        self.source_dir = self.make_tree(self.test_dir / "checkout1")
+
+    def make_tree(self, root):
+        (root / "pkg").mkdir(parents=True)
+        (root / "pkg" / "util.py").write_text("def util():\n    return 1\n")
+        (root / "main.py").write_text("from pkg.util import util\n\nprint(util())\n")
+        return root
+
+    def combine(self, source_dir, output_name="out.py", **options):
+        combiner = PyCombiner(source_dir / "main.py", source_dir, self.test_dir / output_name,
+                              quiet=True, reproducible=True, cache=self.cache, **options)
+        combiner.combine()
+        return combiner
+
+    def test_hit_and_miss(self):
+        """Test reuse of unchanged inputs and rebuilds after changes"""
+        self.assertFalse(self.combine(self.source_dir).cache_hit)
+        first = (self.test_dir / "out.py").read_text()
+        self.assertTrue(self.combine(self.source_dir).cache_hit)
+        self.assertEqual((self.test_dir / "out.py").read_text(), first)
+
+        (self.source_dir / "pkg" / "util.py").write_text("def util():\n    return 2\n")
+        self.assertFalse(self.combine(self.source_dir).cache_hit)
+        self.assertIn("return 2", (self.test_dir / "out.py").read_text())
+
+        # A new file may change how imports resolve
+        (self.source_dir / "extra.py").write_text("")
+        self.assertFalse(self.combine(self.source_dir).cache_hit)
+        # Options are part of the key
+        self.assertFalse(self.combine(self.source_dir, reachable_only=True).cache_hit)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 4))
+
+    def test_shared_between_checkouts(self):
+        """Test that a second checkout gets a hard link to the same bundle"""
+        self.combine(self.source_dir)
+        other = self.make_tree(self.test_dir / "checkout2")
+        self.assertTrue(self.combine(other, "out2.py").cache_hit)
+        out1, out2 = self.test_dir / "out.py", self.test_dir / "out2.py"
+        self.assertEqual(out1.read_bytes(), out2.read_bytes())
+        cached = next(self.cache.objects_dir.iterdir())
+        self.assertTrue(os.path.samefile(out2, cached))
+
+        # Rebuilding replaces the linked output instead of writing into the cache
+        (other / "main.py").write_text("from pkg.util import util\n\nprint(util() + 1)\n")
+        self.combine(other, "out2.py")
+        self.assertFalse(os.path.samefile(out2, cached))
+        self.assertEqual(cached.read_bytes(), out1.read_bytes())
+        self.assertEqual(len(list(self.cache.objects_dir.iterdir())), 2)
+
+    def test_eviction(self):
+        """Test that the least recently used bundles are evicted first"""
+        cache = BundleCache(self.test_dir / "small", max_size=250)
+        for i in range(3):
+            # Older uses get older modification times
+            for path in cache.objects_dir.iterdir():
+                os.utime(path, (0, path.stat().st_mtime - 10))
+            cache.store(f"key{i}", [("main.py", str(i))], bytes([65 + i]) * 100)
+        self.assertLessEqual(cache.size(), 250)
+        self.assertEqual(len(list(cache.objects_dir.iterdir())), 2)
+        self.assertEqual(len(list(cache.entries_dir.iterdir())), 2)
+        self.assertFalse((cache.entries_dir / "key0.json").exists())
+
+    def test_api_bundle(self):
+        """Test bundle() with a cache, and over an output linked into the cache"""
+        self.combine(self.source_dir)
+        self.combine(self.source_dir)
+        output = self.test_dir / "out.py"
+        cached = next(self.cache.objects_dir.iterdir())
+        self.assertTrue(os.path.samefile(output, cached))
+
+        other = self.make_tree(self.test_dir / "checkout2")
+        (other / "main.py").write_text("print('other')\n")
+        bundle(other / "main.py", output_file=output)
+        self.assertIn("print('other')", output.read_text())
+        self.assertEqual(hashlib.sha256(cached.read_bytes()).hexdigest(), cached.name)
+
+        result = bundle(self.source_dir / "main.py", output_file=output, reproducible=True, cache=self.cache)
+        self.assertTrue(result.cache_hit)
+        self.assertEqual(result.source, cached.read_text())
+        self.assertTrue(os.path.samefile(output, cached))
+        self.assertFalse(bundle(other / "main.py", reproducible=True, cache=self.cache).cache_hit)
+        self.assertTrue(bundle(other / "main.py", reproducible=True, cache=self.cache).cache_hit)
+
+    def test_damaged_object(self):
+        """Test that an object changed after it was stored is not served"""
+        self.combine(self.source_dir)
+        expected = (self.test_dir / "out.py").read_bytes()
+        cached = next(self.cache.objects_dir.iterdir())
+        cached.chmod(0o644)
+        cached.write_text("print('damaged')\n")
+        self.assertFalse(self.combine(self.source_dir).cache_hit)
+        self.assertEqual((self.test_dir / "out.py").read_bytes(), expected)
+        self.assertTrue(self.combine(self.source_dir).cache_hit)
+
+    def test_unchanged_files_not_hashed(self):
+        """Test that hits after the first only stat the inputs"""
+        self.combine(self.source_dir)
+        self.assertTrue(self.combine(self.source_dir).cache_hit)
+        hashed = self.cache.files_hashed
+        self.assertTrue(self.combine(self.source_dir).cache_hit)
+        self.assertEqual(self.cache.files_hashed, hashed)
+
+        util = self.source_dir / "pkg" / "util.py"
+        util.write_text("def util():\n    return 2\n")
+        self.assertFalse(self.combine(self.source_dir).cache_hit)
+        self.assertEqual(self.cache.files_hashed, hashed + 1)
+
+    def test_files_outside_the_tree(self):
+        """Test inputs outside a non-local source tree, like vendored modules"""
+        vendored = self.test_dir / "site.py"
+        vendored.write_bytes(b"V = 1\n")
+        source = MemorySource({"main.py": "print(1)\n"})
+        main_sha = hashlib.sha256(b"print(1)\n").hexdigest()
+        self.cache.store("key", [("main.py", main_sha)], b"bundle",
+                         [(str(vendored), hashlib.sha256(b"V = 1\n").hexdigest())])
+        self.assertIsNotNone(self.cache.lookup("key", source))
+        vendored.write_bytes(b"V = 2\n")
+        self.assertIsNone(self.cache.lookup("key", source))
+
+        # Names the provider cannot resolve are a miss, not an error
+        self.cache.store("other", [("../elsewhere.py", main_sha)], b"bundle")
+        self.assertIsNone(self.cache.lookup("other", source))
+
+    def test_parse_size(self):
+        """Test human-readable cache sizes"""
+        self.assertEqual(parse_size("1024"), 1024)
+        self.assertEqual(parse_size("500M"), 500 << 20)
+        self.assertEqual(parse_size("1.5GiB"), 3 << 29)
+        with self.assertRaises(ValueError):
+            parse_size("lots")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+if __name__ == '__main__':
+    unittest.main()
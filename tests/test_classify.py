@@ -0,0 +1,46 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from pycombiner.combiner.classify import ImportClassifier, LOCAL, STDLIB, THIRD_PARTY, UNKNOWN
+from pycombiner.combiner.combiner import PyCombiner
+from pycombiner.combiner.index import ModuleIndex
+
+class TestImportClassifier(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        (self.test_dir / "json").mkdir()
+        (self.test_dir / "json" / "__init__.py").write_text("")
+        (self.test_dir / "util.py").write_text("from collections import abc\n")
+        (self.test_dir / "main.py").write_text("import os.path\nimport util\nimport pip\nimport missing_module_xyz\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_classify(self):
+        """Test the four categories, with local modules shadowing stdlib ones"""
+        classifier = ImportClassifier(ModuleIndex(self.test_dir))
+        self.assertEqual(classifier.classify("os.path"), STDLIB)
+        self.assertEqual(classifier.classify("util"), LOCAL)
+        self.assertEqual(classifier.classify("json"), LOCAL)
+        self.assertEqual(classifier.classify("pip._internal"), THIRD_PARTY)
+        self.assertEqual(classifier.distribution("pip._internal"), "pip")
+        self.assertEqual(classifier.classify("missing_module_xyz"), UNKNOWN)
+        self.assertEqual(ImportClassifier().classify("json"), STDLIB)
+
+    def test_report_breakdown(self):
+        """Test the breakdown of the imports of merged files, computed when the report needs it"""
+        combiner = PyCombiner(self.test_dir / "main.py", self.test_dir, self.test_dir / "out.py", quiet=True,
+                              reachable_only=True)
+        combiner.combine()
+        self.assertTrue(callable(combiner.report._import_classes))
+        self.assertEqual(combiner.report.import_classes, {
+            STDLIB: ["collections", "os.path"],
+            THIRD_PARTY: ["pip"],
+            LOCAL: ["util"],
+            UNKNOWN: ["missing_module_xyz"],
+        })
+        self.assertIn("🏷️ Import Origins", combiner.report.format_report())
+
+if __name__ == '__main__':
+    unittest.main()
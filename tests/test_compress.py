@@ -0,0 +1,69 @@
+import contextlib
+import io
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from pycombiner.__main__ import build_parser, check_compress_arguments
+from pycombiner.combiner.combiner import PyCombiner
+from pycombiner.combiner.compress import compress_payload, self_extracting
+
+class TestCompress(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.src = self.test_dir / "src"
+        self.src.mkdir()
+        (self.src / "helper.py").write_text("def shout(text):\n    return text.upper() + '!'\n")
+        (self.src / "main.py").write_text("from helper import shout\n\nprint(shout('hello'), __name__)\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def run_bundle(self, path):
+        return subprocess.run([sys.executable, str(path)], capture_output=True, text=True)
+
+    def test_bundles_run(self):
+        """Test that zlib and lzma bundles, with source or marshalled code, run like the plain bundle"""
+        for method in ("zlib", "lzma"):
+            for marshal_code in (False, True):
+                output = self.test_dir / f"out_{method}_{marshal_code}.py"
+                PyCombiner(self.src / "main.py", self.src, output, quiet=True,
+                           compress=method, marshal_code=marshal_code).combine()
+                text = output.read_text()
+                self.assertTrue(text.startswith("# Generated by PyCombiner"))
+                self.assertNotIn("def shout", text)
+                result = self.run_bundle(output)
+                self.assertEqual(result.stdout, "HELLO! __main__\n", result.stderr)
+
+    def test_marshal_version_guard(self):
+        """Test that a marshalled bundle refuses to run on another Python version"""
+        stub = self_extracting("print('ran')\n", "zlib", marshal_code=True)
+        other = f"({sys.version_info[0]}, {sys.version_info[1]})"
+        path = self.test_dir / "stub.py"
+        path.write_text(stub.replace(other, f"({sys.version_info[0]}, {sys.version_info[1] + 1})"))
+        result = self.run_bundle(path)
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn("ImportError", result.stderr)
+
+    def test_invalid_options(self):
+        """Test errors for unknown methods and out of range levels"""
+        with self.assertRaises(ValueError):
+            compress_payload(b"data", "brotli")
+        with self.assertRaises(ValueError):
+            compress_payload(b"data", "zlib", 12)
+
+    def test_options_need_compress(self):
+        """Test that --marshal and --compress-level are rejected without --compress"""
+        parser = build_parser()
+        for options in (["--marshal"], ["--compress-level", "3"]):
+            args = parser.parse_args([str(self.src), str(self.test_dir / "out.py"), *options])
+            with contextlib.redirect_stderr(io.StringIO()) as stderr, self.assertRaises(SystemExit):
+                check_compress_arguments(parser, args)
+            self.assertIn("requires --compress", stderr.getvalue())
+        args = parser.parse_args([str(self.src), str(self.test_dir / "out.py"), "--compress", "zlib", "--marshal"])
+        check_compress_arguments(parser, args)
+
+if __name__ == '__main__':
+    unittest.main()
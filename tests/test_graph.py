@@ -0,0 +1,66 @@
+import unittest
+import json
+from pathlib import Path
+from pycombiner.combiner.graph import DependencyGraph
+
+class TestDependencyGraph(unittest.TestCase):
+    def setUp(self):
+        self.source_dir = Path('/project')
+        mapping = {
+            '/project/main.py': ['/project/services/auth.py', '/project/services/database.py'],
+            '/project/services/auth.py': ['/project/models/user.py'],
+            '/project/services/database.py': ['/project/models/user.py'],
+            '/project/models/user.py': [],
+            '/project/unused.py': [],
+        }
+        self.graph = DependencyGraph.from_dict(mapping, self.source_dir)
+        self.graph.add_external_imports('/project/services/database.py', {'sqlalchemy.orm', 'os'})
+
+    def test_node_ids(self):
+        """Test that nodes get compact IDs and can be looked up by several names"""
+        self.assertEqual(len(self.graph), 5)
+        self.assertEqual(self.graph.edge_count, 4)
+        self.assertEqual(self.graph.node_id('/project/main.py'), 0)
+        self.assertEqual(self.graph.node_id('models.user'), self.graph.node_id('models/user.py'))
+        self.assertIn('services.auth', self.graph)
+        self.assertNotIn('missing', self.graph)
+
+    def test_queries(self):
+        """Test reverse dependencies, closure, shortest path and fan-in"""
+        self.assertEqual(
+            sorted(self.graph.reverse_dependencies('models.user')),
+            ['/project/services/auth.py', '/project/services/database.py']
+        )
+        self.assertEqual(len(self.graph.transitive_closure('main')), 3)
+        self.assertEqual(
+            self.graph.shortest_path('main', 'models.user'),
+            ['/project/main.py', '/project/services/auth.py', '/project/models/user.py']
+        )
+        self.assertIsNone(self.graph.shortest_path('models.user', 'main'))
+        self.assertEqual(self.graph.fan_in_ranking(1), [('/project/models/user.py', 2)])
+
+    def test_importers_of(self):
+        """Test finding which modules pull in an external package"""
+        matches = self.graph.importers_of('sqlalchemy', '/project/main.py')
+        self.assertEqual(len(matches), 1)
+        node, chain = matches[0]
+        self.assertEqual(node, '/project/services/database.py')
+        self.assertEqual(chain, ['/project/main.py', '/project/services/database.py'])
+
+    def test_exports(self):
+        """Test DOT, JSON and matrix exports"""
+        dot = self.graph.to_dot()
+        self.assertIn('n0 [label="main"];', dot)
+        self.assertIn('n0 -> n1;', dot)
+
+        data = json.loads(self.graph.to_json())
+        self.assertEqual(len(data['nodes']), 5)
+        self.assertIn([0, 1], data['edges'])
+        self.assertEqual(data['nodes'][2]['external_imports'], ['os', 'sqlalchemy.orm'])
+
+        matrix = self.graph.adjacency_matrix()
+        self.assertEqual(matrix[0], [0, 1, 1, 0, 0])
+        self.assertEqual(self.graph.to_dict()['/project/models/user.py'], [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import unittest
+import ast
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from pycombiner.combiner.combiner import PyCombiner
+from pycombiner.combiner.import_cost import (
+    HoistedImport, find_import_users, function_insertion_points, measure_import_times,
+    parse_statement, plan_deferrals
+)
+
+SOURCE = '''import json
+import csv
+import os.path
+
+LOG_DIR = os.path.join("a", "b")
+
+def dump(data):
+    """Serialize data"""
+    return json.dumps(data)
+
+def parse(text): return csv.reader(text)
+
+class Loader:
+    def load(self, path):
+        return csv.reader(open(path))
+'''
+
+class TestImportCost(unittest.TestCase):
+    def setUp(self):
+        self.tree = ast.parse(SOURCE)
+        self.imports = []
+        for statement in ['import json', 'import csv', 'import os.path']:
+            module, names, _ = parse_statement(statement)
+            self.imports.append(HoistedImport(statement, module, names))
+        find_import_users([('tools.py', self.tree)], self.imports)
+
+    def test_parse_statement(self):
+        """Test the names bound by header statements"""
+        self.assertEqual(parse_statement('import os.path'), ('os.path', ['os'], False))
+        self.assertEqual(parse_statement('from a.b import c, d'), ('a.b', ['c', 'd'], True))
+
+    def test_find_import_users(self):
+        """Test mapping imports to the functions that use them"""
+        json_imp, csv_imp, os_imp = self.imports
+        self.assertEqual(json_imp.users, {'tools.py:dump'})
+        self.assertEqual(csv_imp.users, {'tools.py:parse', 'tools.py:Loader.load'})
+        self.assertTrue(os_imp.used_at_module_level)
+
+    def test_function_insertion_points(self):
+        """Test that one-line functions have no insertion point"""
+        points = function_insertion_points(self.tree, SOURCE.split('\n'))
+        self.assertEqual(points['dump'], (9, '    ', set()))
+        self.assertIn('Loader.load', points)
+        self.assertNotIn('parse', points)
+
+    def test_plan_deferrals(self):
+        """Test choosing which imports to defer"""
+        points = function_insertion_points(self.tree, SOURCE.split('\n'))
+        deferrable = {f"tools.py:{name}": point[2] for name, point in points.items()}
+        plan_deferrals(self.imports, 'local', deferrable)
+        self.assertEqual([imp.action for imp in self.imports], ['local', None, None])
+
+        for imp in self.imports:
+            imp.action = None
+        plan_deferrals(self.imports, 'lazy', deferrable)
+        self.assertEqual([imp.action for imp in self.imports], ['lazy', 'lazy', None])
+
+    def test_measure_import_times(self):
+        """Test the -X importtime harness"""
+        costs = measure_import_times(['import json', 'import json', 'import no_such_module_xyz'])
+        self.assertGreaterEqual(costs['import json'], 0)
+        self.assertEqual(costs['import no_such_module_xyz'], -1)
+
+    def test_docstring_only_insertion_point(self):
+        """Test that imports go after a docstring that is the whole body"""
+        source = 'def f():\n    """Doc"""\n\ndef g():\n    """Doc"""  # comment\n'
+        points = function_insertion_points(ast.parse(source), source.split('\n'))
+        self.assertEqual(points['f'], (3, '    ', set()))
+        self.assertEqual(points['g'], (6, '    ', set()))
+
+class TestDeferInBundle(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.src = self.test_dir / "src"
+        self.src.mkdir()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_partially_deferred_import(self):
+        """Test that `import a, b` keeps the modules that are not deferred"""
+        (self.src / "main.py").write_text(
+            "import json, csv\n\nDIALECTS = csv.list_dialects()\n\n"
+            "def dump(data):\n    return json.dumps(data)\n\nprint(dump([1]))\n")
+        output = self.test_dir / "out.py"
+        PyCombiner(self.src / "main.py", self.src, output, quiet=True, defer_imports='local').combine()
+        text = output.read_text()
+        self.assertNotIn("import json, csv", text)
+        self.assertIn("\nimport csv\n\nDIALECTS", text)
+        self.assertIn("def dump(data):\n    import json\n", text)
+        result = subprocess.run([sys.executable, str(output)], capture_output=True, text=True)
+        self.assertEqual(result.stdout, "[1]\n", result.stderr)
+
+    def test_import_cost_timeout(self):
+        """Test that a timed out measurement leaves costs unknown"""
+        site = self.test_dir / "site"
+        site.mkdir()
+        (site / "slow_module_xyz.py").write_text("import time\ntime.sleep(10)\n")
+        (self.src / "main.py").write_text("import slow_module_xyz\n")
+
+        class QuickCombiner(PyCombiner):
+            import_cost_timeout = 0.5
+
+        # The measurement runs in a child interpreter
+        saved = os.environ.get('PYTHONPATH')
+        os.environ['PYTHONPATH'] = str(site)
+        try:
+            combiner = QuickCombiner(self.src / "main.py", self.src, self.test_dir / "out.py", quiet=True,
+                                     measure_import_cost=True)
+            with self.assertLogs('pycombiner.combiner', level='WARNING'):
+                combiner.combine()
+        finally:
+            if saved is None:
+                del os.environ['PYTHONPATH']
+            else:
+                os.environ['PYTHONPATH'] = saved
+        self.assertEqual([imp.cost_us for imp in combiner.hoisted_imports], [None])
+
+if __name__ == '__main__':
+    unittest.main()
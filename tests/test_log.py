@@ -0,0 +1,93 @@
+import io
+import json
+import logging
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from pycombiner.combiner.combiner import PyCombiner
+from pycombiner.combiner.ast_parser import analyze_file
+from pycombiner.combiner.log import configure, get_logger
+from pycombiner.combiner.merger import merge_sources
+
+class Counted:
+    """Counts how often it is formatted"""
+    calls = 0
+
+    def __str__(self):
+        Counted.calls += 1
+        return "counted"
+
+class TestLog(unittest.TestCase):
+    def setUp(self):
+        self.stream = io.StringIO()
+
+    def test_subsystem_loggers(self):
+        """Test per-subsystem debug records from analyze_file"""
+        configure(logging.DEBUG, stream=self.stream)
+        with self.assertLogs("pycombiner.ast_parser", logging.DEBUG) as logs:
+            analyze_file("import os\ndef f():\n    pass\n", "x.py")
+        messages = [record.getMessage() for record in logs.records]
+        self.assertIn("Analyzing file: x.py", messages)
+        self.assertTrue(any("def f()" in m for m in messages))
+
+    def test_level_without_debug_flag(self):
+        """Test that combiner and report debug records follow the log level alone"""
+        test_dir = Path(tempfile.mkdtemp())
+        try:
+            (test_dir / "main.py").write_text("print('hi')\n")
+            configure("debug", stream=self.stream)
+            with self.assertLogs("pycombiner", logging.DEBUG) as logs:
+                PyCombiner(test_dir / "main.py", test_dir, None).render()
+        finally:
+            shutil.rmtree(test_dir)
+        loggers = {record.name for record in logs.records}
+        self.assertIn("pycombiner.combiner", loggers)
+        self.assertIn("pycombiner.report", loggers)
+
+    def test_merger_follows_level(self):
+        """Test that merger and parser debug records follow the log level alone"""
+        test_dir = Path(tempfile.mkdtemp())
+        try:
+            (test_dir / "main.py").write_text("import os\nprint(os.sep)\n")
+            configure("debug", stream=self.stream)
+            with self.assertLogs("pycombiner", logging.DEBUG) as logs:
+                merge_sources([Path("main.py")], {}, test_dir, test_dir / "main.py")
+        finally:
+            shutil.rmtree(test_dir)
+        messages = {(record.name, record.getMessage()) for record in logs.records}
+        self.assertIn(("pycombiner.merger", "Starting file merge process"), messages)
+        self.assertTrue(any(name == "pycombiner.ast_parser" for name, _ in messages))
+
+    def test_lazy_formatting(self):
+        """Test that disabled levels never format their arguments"""
+        configure(logging.WARNING, stream=self.stream)
+        Counted.calls = 0
+        get_logger("test").debug("value %s", Counted())
+        self.assertEqual(Counted.calls, 0)
+        get_logger("test").warning("value %s", Counted())
+        self.assertEqual(self.stream.getvalue(), "[WARNING] value counted\n")
+
+    def test_json_handler(self):
+        """Test JSON lines with extra fields"""
+        configure("info", json_format=True, stream=self.stream)
+        get_logger("merger").info("merged %d files", 3, extra={"files": 3})
+        record = json.loads(self.stream.getvalue())
+        self.assertEqual(record["logger"], "pycombiner.merger")
+        self.assertEqual(record["level"], "INFO")
+        self.assertEqual(record["message"], "merged 3 files")
+        self.assertEqual(record["files"], 3)
+
+    def test_syntax_warning(self):
+        """Test that syntax errors are logged instead of printed"""
+        configure(logging.WARNING, stream=self.stream)
+        imports, names = analyze_file("def (", "bad.py")
+        self.assertEqual((imports, names), ([], set()))
+        self.assertIn("[WARNING] Syntax error in bad.py", self.stream.getvalue())
+
+    def tearDown(self):
+        # Back to the library default: silent
+        configure(logging.WARNING, stream=io.StringIO())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,19 @@ from pathlib import Path
 from pycombiner.combiner.output import MergeReport, print_merge_report
 
 class TestOutput(unittest.TestCase):
+    def test_file_info_rows(self):
+        """Test that file rows read like dicts and re-adding a file replaces its row"""
+        report = MergeReport(Path('main.py'), Path('.'), Path('out.py'))
+        report.add_file_info(Path('main.py'), 3, set(), set())
+        report.add_file_info(Path('main.py'), 5, {'models.user'}, {'import os'},
+                             {'unhandled_import_statements': ['import os']})
+        self.assertEqual(len(report.files_info), 1)
+        info = report.files_info[0]
+        self.assertEqual(info['lines'], 5)
+        self.assertEqual(info.get('unhandled_import_statements'), ('import os',))
+        self.assertIsNone(info.get('missing'))
+        self.assertEqual(report.stats['total_lines'], 5)
+
     def test_print_merge_report(self):
         # Create a sample MergeReport
         source_dir = Path('pycombiner/tests/examples/deep_demo')
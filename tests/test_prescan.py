@@ -0,0 +1,80 @@
+import ast
+import unittest
+from pycombiner.combiner.prescan import imported_modules, scan_imports
+
+def walk_imports(source):
+    """Reference: the modules ParseCache found with ast.walk before the scanner"""
+    found = []
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.Import):
+            found.extend(name.name for name in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            found.append(node.module)
+    return tuple(found)
+
+SAMPLE = '''\
+"""Docstring mentioning import fake"""
+import os, sys as system
+from . import sibling
+from .pkg import (a,  # import nope
+                  b)
+import json; import re
+x = "from fake import y"  # import also_fake
+data = {
+    'key': """
+import inside_string
+""",
+}
+if x: import fast
+try:
+    import ujson
+except ImportError:
+    import json as ujson
+else:
+    from collections import abc
+if x:
+    import one
+elif system:
+    import two
+elif data:
+    import three
+else:
+    import four
+class A:
+    def f(self) -> None:
+        from \\
+            deep.module import thing
+with open(x) as f: import with_body
+'''
+
+class TestPrescan(unittest.TestCase):
+    def test_matches_ast_walk(self):
+        """Test the same modules in the same order as ast.walk"""
+        self.assertEqual(imported_modules(SAMPLE), walk_imports(SAMPLE))
+        modules = imported_modules(SAMPLE)
+        for fake in ("fake", "nope", "also_fake", "inside_string", "sibling"):
+            self.assertNotIn(fake, modules)
+
+    def test_line_spans(self):
+        """Test line spans of multi-line import statements"""
+        spans = {item.module: (item.lineno, item.end_lineno) for item in scan_imports(SAMPLE)}
+        self.assertEqual(spans["pkg"], (4, 5))
+        self.assertEqual(spans["deep.module"], (30, 31))
+        self.assertEqual(spans["re"], (6, 6))
+
+    def test_stops_after_last_import(self):
+        """Test that code after the last import is never lexed"""
+        source = "import os\nTABLE = [\n" + "    (1, 'x'),\n" * 1000 + "\n'unterminated"
+        self.assertEqual(imported_modules(source), ("os",))
+
+    def test_lexical_errors(self):
+        """Test SyntaxError for unterminated strings and unbalanced brackets"""
+        with self.assertRaises(SyntaxError):
+            imported_modules("x = 'abc\nimport os\n")
+        with self.assertRaises(SyntaxError):
+            imported_modules("x = (1,\nimport os\n")
+        with self.assertRaises(SyntaxError):
+            imported_modules("x = 1)\nimport os\n")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import ast
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from pycombiner.combiner.api import bundle
+from pycombiner.combiner.cache import BundleCache
+from pycombiner.combiner.combiner import PyCombiner
+from pycombiner.combiner.profiling import lazy_functions, profile_entry
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.src = self.test_dir / "src"
+        (self.src / "app").mkdir(parents=True)
+        (self.src / "app" / "__init__.py").write_text("")
+        (self.src / "app" / "config.py").write_text("NAME = 'demo'\n")
+        (self.src / "app" / "core.py").write_text(
+            "from app.config import NAME\n\ndef greet(who):\n    return NAME + ': hello ' + who\n")
+        (self.src / "app" / "report.py").write_text(
+            '"""Rarely used"""\nimport json\n\ndef render(data):\n    return json.dumps(data)\n\n'
+            "def summary(data):\n    return render({'count': len(data)})\n")
+        (self.src / "app" / "hooks.py").write_text("HOOKS = []\n\ndef register(fn):\n    HOOKS.append(fn)\n")
+        (self.src / "main.py").write_text(
+            "import sys\nfrom app.report import summary\nfrom app.hooks import register\nfrom app.core import greet\n\n"
+            "print(summary([1, 2]) if sys.argv[1:] == ['report'] else greet('world'))\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def bundle(self, profile, output="out.py"):
+        combiner = PyCombiner(self.src / "main.py", self.src, self.test_dir / output, quiet=True, profile=profile)
+        combiner.combine()
+        return combiner
+
+    def run_script(self, path, *args):
+        return subprocess.run([sys.executable, str(path), *args], capture_output=True, text=True).stdout
+
+    def test_profile_entry(self):
+        """Test the files run in the order they finished and the functions called"""
+        profile = profile_entry(self.src / "main.py", self.src)
+        self.assertEqual(profile.modules, ["app/__init__.py", "app/report.py", "app/hooks.py", "app/config.py",
+                                           "app/core.py", "main.py"])
+        self.assertEqual(profile.functions, {"app/core.py": ["greet"]})
+        self.assertEqual(profile.returncode, 0)
+        self.assertTrue(profile_entry(self.src / "main.py", self.src, ["report"]).is_hot("app/report.py"))
+
+    def test_profiled_bundle(self):
+        """Test run order, lazy cold files and that both paths still work"""
+        combiner = self.bundle(profile_entry(self.src / "main.py", self.src))
+        labels = [path.relative_to(self.src).as_posix() for path in combiner.merge_order]
+        self.assertEqual(labels[-1], "main.py")
+        self.assertLess(labels.index("app/config.py"), labels.index("app/core.py"))
+        self.assertEqual(combiner.lazy_files, ["app/report.py"])
+        output = self.test_dir / "out.py"
+        self.assertNotIn("\ndef render(data):", output.read_text())
+        self.assertEqual(self.run_script(output), "demo: hello world\n")
+        self.assertEqual(self.run_script(output, "report"), '{"count": 2}\n')
+
+    def test_profile_args(self):
+        """Test that the profiling run's arguments decide which files are hot"""
+        combiner = self.bundle(profile_entry(self.src / "main.py", self.src, ["report"]))
+        self.assertEqual(combiner.lazy_files, ["app/core.py"])
+        output = self.test_dir / "out.py"
+        self.assertEqual(self.run_script(output), "demo: hello world\n")
+        self.assertEqual(self.run_script(output, "report"), '{"count": 2}\n')
+
+    def test_lazy_functions(self):
+        """Test which files hold nothing but functions"""
+        self.assertEqual(lazy_functions(ast.parse('"""Doc"""\nimport os\n\ndef a():\n    pass\n\nasync def b():\n    pass\n')), ["a", "b"])
+        for source in ("X = 1\ndef a():\n    pass\n", "@decorator\ndef a():\n    pass\n", "class A:\n    pass\n", "import os\n"):
+            self.assertIsNone(lazy_functions(ast.parse(source)))
+
+    def test_name_clash(self):
+        """Test that a cold file is not made lazy when another file binds one of its names"""
+        (self.src / "app" / "hooks.py").write_text("HOOKS = []\n\ndef register(fn):\n    HOOKS.append(fn)\n\nrender = str\n")
+        combiner = self.bundle(profile_entry(self.src / "main.py", self.src))
+        self.assertEqual(combiner.lazy_files, [])
+
+    def test_stub_parameter_names(self):
+        """Test lazy functions named like the parameters of the stubs"""
+        (self.src / "app" / "report.py").write_text(
+            "def args(*items):\n    return list(items)\n\ndef kwargs(**options):\n    return sorted(options)\n")
+        (self.src / "main.py").write_text(
+            "import sys\nfrom app.report import args, kwargs\nfrom app.core import greet\n\n"
+            "print((args(1, 2), kwargs(a=1)) if sys.argv[1:] == ['report'] else greet('world'))\n")
+        combiner = self.bundle(profile_entry(self.src / "main.py", self.src))
+        self.assertEqual(combiner.lazy_files, ["app/report.py"])
+        self.assertEqual(self.run_script(self.test_dir / "out.py", "report"), "([1, 2], ['a'])\n")
+
+    def test_profile_run_on_cache_miss(self):
+        """Test that combine() and bundle() profile a run only when the bundle is not cached"""
+        cache = BundleCache(self.test_dir / "cache")
+        first = PyCombiner(self.src / "main.py", self.src, self.test_dir / "out.py", quiet=True, cache=cache,
+                           profile_args=[])
+        first.combine()
+        self.assertEqual(first.lazy_files, ["app/report.py"])
+        second = PyCombiner(self.src / "main.py", self.src, self.test_dir / "out.py", quiet=True, cache=cache,
+                            profile_args=[])
+        second.combine()
+        self.assertTrue(second.cache_hit)
+        self.assertIsNone(second.profile)
+
+        result = bundle(self.src / "main.py", profile_args=["report"], cache=cache)
+        self.assertFalse(result.cache_hit)
+        self.assertIn("app/report.py", result.report.hot_files)
+        self.assertEqual(result.report.lazy_files, ["app/core.py"])
+
+        (self.src / "main.py").write_text("import time\ntime.sleep(10)\n")
+        with self.assertRaises(RuntimeError):
+            PyCombiner(self.src / "main.py", self.src, self.test_dir / "out.py", quiet=True,
+                       profile_args=[], profile_timeout=0.5).combine()
+
+if __name__ == '__main__':
+    unittest.main()
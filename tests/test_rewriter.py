@@ -0,0 +1,75 @@
+import ast
+import unittest
+from pycombiner.combiner.rewriter import import_blocks, rewrite_imports, strip_imports
+
+def drop_local(node):
+    """Remove imports of the 'local' package, keeping other names of plain imports"""
+    if isinstance(node, ast.Import):
+        kept = [alias for alias in node.names if not alias.name.startswith('local')]
+        if len(kept) == len(node.names):
+            return None
+        return 'import ' + ', '.join(ast.unparse(alias) for alias in kept) if kept else ''
+    return '' if (node.module or '').startswith('local') else None
+
+class TestRewriter(unittest.TestCase):
+    def rewrite(self, source, insertions=None):
+        result = strip_imports(source, ast.parse(source), drop_local, insertions)
+        ast.parse(result)
+        return result
+
+    def test_keeps_neighbouring_lines(self):
+        """Test that the line before a from-import survives"""
+        source = "x = 1\nfrom local.a import b\ny = 2\n"
+        self.assertEqual(self.rewrite(source), "x = 1\ny = 2\n")
+
+    def test_multiline_import(self):
+        """Test that parenthesized imports are removed completely"""
+        source = "from local.a import (\n    b,\n    c,\n)\nprint(b, c)\n"
+        self.assertEqual(self.rewrite(source), "print(b, c)\n")
+
+    def test_semicolons(self):
+        """Test imports joined with other statements on one line"""
+        source = "import local.a; x = 1\ny = 2; import local.b  # note\nimport local.c; import local.d\n"
+        self.assertEqual(self.rewrite(source), "x = 1\ny = 2  # note\n")
+
+    def test_partial_import(self):
+        """Test that external names of a mixed import are kept"""
+        self.assertEqual(self.rewrite("import os, local.a as a\n"), "import os\n")
+
+    def test_nested_blocks(self):
+        """Test imports inside try/if/def blocks, which must not become empty"""
+        source = (
+            "try:\n"
+            "    from local.a import b\n"
+            "except ImportError:\n"
+            "    b = None\n"
+            "if b: import local.c\n"
+            "def f():\n"
+            "    import local.d\n"
+            "    import json\n"
+            "    return json\n"
+        )
+        self.assertEqual(self.rewrite(source), (
+            "try:\n"
+            "    pass\n"
+            "except ImportError:\n"
+            "    b = None\n"
+            "if b: pass\n"
+            "def f():\n"
+            "    import json\n"
+            "    return json\n"
+        ))
+
+    def test_non_ascii_and_insertions(self):
+        """Test byte offsets after non-ASCII text and inserted lines"""
+        source = "s = 'é'; import local.a\ndef f():\n    return 1\n"
+        result = self.rewrite(source, {3: ["    import json"]})
+        self.assertEqual(result, "s = 'é'\ndef f():\n    import json\n    return 1\n")
+
+    def test_untouched_source(self):
+        """Test that sources without handled imports come back unchanged"""
+        source = "import os\n\nprint(os.sep)\n"
+        self.assertIs(rewrite_imports(source, import_blocks(ast.parse(source)), drop_local), source)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import io
+import contextlib
+import shutil
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from pycombiner.__main__ import build_parser
+from pycombiner.client import bundle_remote, request
+from pycombiner.combiner.server import serve
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.source_dir = self.test_dir / "src"
+        (self.source_dir / "pkg").mkdir(parents=True)
+        (self.source_dir / "pkg" / "util.py").write_text("def util():\n    return 1\n")
+        (self.source_dir / "main.py").write_text("from pkg.util import util\n\nprint(util())\n")
+
+        self.socket_path = str(self.test_dir / "daemon.sock")
+        self.server = serve(self.socket_path)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def bundle(self, output_name="out.py", *options):
+        args = build_parser().parse_args([str(self.source_dir), str(self.test_dir / output_name), *options])
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            status = bundle_remote(args, self.socket_path)
+        return status, stdout.getvalue()
+
+    def test_bundle_requests(self):
+        """Test bundling through the daemon with warm state that follows file changes"""
+        status, output = self.bundle()
+        self.assertEqual(status, 0)
+        self.assertIn("Merge Report", output)
+        self.assertIn("return 1", (self.test_dir / "out.py").read_text())
+
+        # Edited files are picked up by the stat checks of the parse cache
+        (self.source_dir / "pkg" / "util.py").write_text("def util():\n    return 22\n")
+        self.bundle()
+        self.assertIn("return 22", (self.test_dir / "out.py").read_text())
+
+        # New files trigger a new index
+        (self.source_dir / "pkg" / "extra.py").write_text("EXTRA = 3\n")
+        (self.source_dir / "main.py").write_text("from pkg.util import util\nfrom pkg.extra import EXTRA\n\nprint(util(), EXTRA)\n")
+        self.bundle("out.py", "--reachable-only")
+        self.assertIn("EXTRA = 3", (self.test_dir / "out.py").read_text())
+
+        stats = request({"command": "stats"}, self.socket_path)["roots"][str(self.source_dir)]
+        self.assertEqual(stats["requests"], 3)
+        self.assertEqual(stats["index_rebuilds"], 2)
+
+    def test_concurrent_requests(self):
+        """Test that parallel requests for one root share its state safely"""
+        results = []
+        threads = [threading.Thread(target=lambda i=i: results.append(self.bundle(f"out{i}.py"))) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([status for status, _ in results], [0] * 8)
+        outputs = {(self.test_dir / f"out{i}.py").read_text() for i in range(8)}
+        self.assertEqual(len(outputs), 1)
+
+    def test_errors_and_fallback(self):
+        """Test error responses and the missing-daemon fallback"""
+        status, output = self.bundle("out.py", "--entry", "missing.py")
+        self.assertEqual(status, 1)
+        self.assertIn("Entry file not found", output)
+        self.assertEqual(request({"command": "nope"}, self.socket_path)["status"], 2)
+
+        args = build_parser().parse_args([str(self.source_dir), str(self.test_dir / "out.py")])
+        self.assertIsNone(bundle_remote(args, str(self.test_dir / "nobody.sock")))
+
+    def tearDown(self):
+        request({"command": "shutdown"}, self.socket_path)
+        self.thread.join(5)
+        self.server.server_close()
+        shutil.rmtree(self.test_dir)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+from pathlib import Path
+import tempfile
+import shutil
+import subprocess
+import zipfile
+from pycombiner.combiner.api import bundle
+from pycombiner.combiner.sources import ArchiveSource, GitSource, LocalSource, MemorySource, SourceProvider, open_source
+
+FILES = {
+    "main.py": "from utils.helper import helper\n\nprint(helper())\n",
+    "utils/__init__.py": "",
+    "utils/helper.py": "def helper():\n    return 'help'\n",
+}
+
+class TestSources(unittest.TestCase):
+    def setUp(self):
+        # Create temporary directory
+        self.test_dir = Path(tempfile.mkdtemp())
+
+    def test_memory_source(self):
+        """Test bundling straight from an in-memory dict"""
+        source = MemorySource(FILES)
+        self.assertEqual(len(source.files()), 3)
+        self.assertTrue(source.exists(source.root / "utils" / "helper.py"))
+        self.assertFalse(source.exists(Path("/elsewhere/main.py")))
+
+        result = bundle("main.py", source=source)
+        self.assertIn("def helper():", result.source)
+        self.assertNotIn("from utils.helper import helper", result.source)
+
+    def test_incomplete_provider(self):
+        """Test that a provider missing a method cannot be created"""
+        class NoExists(SourceProvider):
+            def files(self, suffix='.py'):
+                return []
+
+            def read_bytes(self, path):
+                return b''
+
+        with self.assertRaises(TypeError):
+            NoExists(Path("/tree"))
+
+    def test_newlines_match_local_source(self):
+        """Test that every provider reads CRLF and CR line breaks as LF"""
+        (self.test_dir / "crlf.py").write_bytes(b"a = 1\r\nb = 2\rc = 3\n")
+        local = LocalSource(self.test_dir).read_text(self.test_dir / "crlf.py")
+        memory = MemorySource({"crlf.py": b"a = 1\r\nb = 2\rc = 3\n"})
+        self.assertEqual(memory.read_text(memory.root / "crlf.py"), local)
+        self.assertEqual(local, "a = 1\nb = 2\nc = 3\n")
+
+    def test_archive_source(self):
+        """Test reading a zip archive with a single top-level directory"""
+        archive = self.test_dir / "app.zip"
+        with zipfile.ZipFile(archive, "w") as zf:
+            for name, content in FILES.items():
+                zf.writestr(f"app-1.0/{name}", content)
+
+        source = ArchiveSource(archive)
+        self.assertEqual(source.root, archive / "app-1.0")
+        self.assertEqual(source.read_text(source.root / "utils" / "helper.py"), FILES["utils/helper.py"])
+
+        provider, entry_file = open_source(archive)
+        self.assertEqual(entry_file, archive / "app-1.0" / "main.py")
+
+    @unittest.skipUnless(shutil.which("git"), "git is not installed")
+    def test_git_source(self):
+        """Test reading an older revision without checking it out"""
+        repo = self.test_dir / "repo"
+        for name, content in FILES.items():
+            (repo / name).parent.mkdir(parents=True, exist_ok=True)
+            (repo / name).write_text(content)
+
+        def git(*args):
+            subprocess.run(["git", "-C", str(repo), "-c", "user.name=t", "-c", "user.email=t@t"] + list(args),
+                           check=True, capture_output=True)
+
+        git("init", "-q")
+        git("add", ".")
+        git("commit", "-q", "-m", "first")
+        (repo / "utils" / "helper.py").write_text("def helper():\n    return 'changed'\n")
+
+        with GitSource.for_path(repo, "HEAD") as source:
+            self.assertEqual(source.read_text(source.root / "utils" / "helper.py"), FILES["utils/helper.py"])
+            self.assertIsNotNone(source.stamp(source.root / "main.py"))
+            result = bundle("main.py", source=source)
+        self.assertIn("return 'help'", result.source)
+
+    def tearDown(self):
+        # Clean up temporary directory
+        shutil.rmtree(self.test_dir)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import contextlib
+import io
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from pycombiner.__main__ import batch_main
+from pycombiner.combiner.split import split_bundles
+
+class TestSplit(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.src = self.test_dir / "src"
+        (self.src / "lib").mkdir(parents=True)
+        (self.src / "lib" / "__init__.py").write_text("")
+        (self.src / "lib" / "base.py").write_text("BASE = 10\n")
+        (self.src / "lib" / "common.py").write_text("from lib.base import BASE\n\ndef double(x):\n    return BASE + 2 * x\n")
+        (self.src / "lib" / "ab.py").write_text("from lib.base import BASE\n\ndef only_ab():\n    return BASE * 100\n")
+        (self.src / "lib" / "c_only.py").write_text("def only_c():\n    return 'c'\n")
+        (self.src / "a.py").write_text("from lib.common import double\nfrom lib.ab import only_ab\nprint('a', double(1), only_ab())\n")
+        (self.src / "b.py").write_text("from lib.common import double\nfrom lib.ab import only_ab\nprint('b', double(2), only_ab())\n")
+        (self.src / "c.py").write_text("from lib.common import double\nfrom lib.c_only import only_c\nprint(only_c(), double(3))\n")
+        self.dist = self.test_dir / "dist"
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def split(self, names=("a", "b", "c")):
+        entries = {self.src / f"{name}.py": self.dist / f"{name}.py" for name in names}
+        return split_bundles(entries, self.src, self.dist / "chunks")
+
+    def test_chunks(self):
+        """Test chunks grouped by the entries sharing them, outer chunks first"""
+        result = self.split()
+        self.assertEqual([chunk.entries for chunk in result.chunks], [("a.py", "b.py", "c.py"), ("a.py", "b.py")])
+        self.assertEqual([[p.name for p in chunk.files] for chunk in result.chunks], [["base.py", "common.py"], ["ab.py"]])
+        self.assertEqual(result.bundle_chunks[self.dist / "c.py"], [result.chunks[0].name])
+        self.assertNotIn("def double", (self.dist / "a.py").read_text())
+        self.assertIn("def only_c", (self.dist / "c.py").read_text())
+
+    def test_bundles_run(self):
+        """Test that every bundle runs with its chunks loaded"""
+        self.split()
+        outputs = [subprocess.run([sys.executable, str(self.dist / f"{name}.py")], capture_output=True, text=True)
+                   for name in ("a", "b", "c")]
+        self.assertEqual([r.stdout for r in outputs], ["a 12 1000\n", "b 14 1000\n", "c 16\n"])
+
+    def test_stable_names(self):
+        """Test that unchanged chunks keep their names whatever the entry order"""
+        first = [chunk.name for chunk in self.split().chunks]
+        second = [chunk.name for chunk in self.split(("c", "b", "a")).chunks]
+        self.assertEqual(first, second)
+        (self.src / "lib" / "ab.py").write_text("from lib.base import BASE\n\ndef only_ab():\n    return BASE * 1000\n")
+        third = [chunk.name for chunk in self.split().chunks]
+        self.assertEqual(third[0], first[0])
+        self.assertNotEqual(third[1], first[1])
+
+    def test_stale_chunks_removed(self):
+        """Test that chunks no bundle loads any more are removed, and nothing else"""
+        first = self.split()
+        (self.dist / "chunks" / "notes.txt").write_text("kept\n")
+        (self.src / "lib" / "ab.py").write_text("from lib.base import BASE\n\ndef only_ab():\n    return BASE * 1000\n")
+        second = self.split()
+        self.assertEqual([path.name for path in second.pruned], [first.chunks[1].name])
+        self.assertEqual(sorted(path.name for path in (self.dist / "chunks").iterdir()),
+                         sorted([chunk.name for chunk in second.chunks] + ["notes.txt"]))
+
+    def test_batch_split_options(self):
+        """Test that batch --split rejects --jobs and passes --reachable-only on"""
+        pairs = [f"{self.src / name}.py:{self.dist / name}.py" for name in ("a", "b")]
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            batch_main([*pairs, "--split", "-j", "2"])
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(batch_main([*pairs, "--split", "--reachable-only", "--source-dir", str(self.src)]), 0)
+        self.assertTrue((self.dist / "a.py").exists())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from pycombiner.combiner.combiner import PyCombiner
+from pycombiner.combiner.startup import bench_startup, format_comparison, header_imports, parse_importtime, unpack_bundle
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 | _io
+import time:        30 |         30 |     _stat
+import time:        70 |        100 |   stat
+import time:        40 |        140 | os
+import time:        25 |         25 |   stat
+"""
+
+class TestStartup(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.src = self.test_dir / "src"
+        (self.src / "pkg").mkdir(parents=True)
+        (self.src / "pkg" / "__init__.py").write_text("DATA = list(range(1000))\n")
+        (self.src / "pkg" / "stats.py").write_text("from pkg import DATA\n\ndef total():\n    return sum(DATA)\n")
+        (self.src / "main.py").write_text("import sys\nfrom pkg.stats import total\nsys.exit(0 if total() == 499500 else 3)\n")
+        self.bundle = self.test_dir / "bundle.py"
+        PyCombiner(self.src / "main.py", self.src, self.bundle, quiet=True).combine()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_parse_importtime(self):
+        """Test total and per-module self times from -X importtime output"""
+        total, self_us, cumulative_us = parse_importtime(IMPORTTIME + "unrelated line\n")
+        self.assertEqual(total, 260)
+        self.assertEqual(self_us, {'_io': 120, '_stat': 30, 'stat': 95, 'os': 40})
+        self.assertEqual(cumulative_us, {'_io': 120, '_stat': 30, 'stat': 125, 'os': 140})
+
+    def test_bench_startup(self):
+        """Test launches of the original and the bundle and the attribution to local modules"""
+        comparison = bench_startup(self.src / "main.py", self.bundle, self.src, runs=2, warmup=0)
+        self.assertEqual(len(comparison.original), 2)
+        self.assertEqual(comparison.returncodes, ({0}, {0}))
+        self.assertTrue(all(run.wall > 0 and run.import_us > 0 for run in comparison.original + comparison.bundle))
+        if sys.platform != 'win32':
+            self.assertTrue(all(run.max_rss for run in comparison.bundle))
+        self.assertIn('pkg.stats', comparison.original[0].self_us)
+        self.assertNotIn('pkg.stats', comparison.bundle[0].self_us)
+        attribution = comparison.attribution()
+        self.assertGreater(attribution['local_modules_us'], 0)
+        self.assertIn('pkg.stats', [module for module, _ in attribution['local_modules']])
+        self.assertIn("local modules no longer imported", format_comparison(comparison))
+
+        # Interpreter start-up modules are not hoisted imports; inlined bodies are timed per module
+        self.assertEqual(comparison.hoisted_modules, {'sys'})
+        self.assertEqual(set(comparison.body_us), {'pkg', 'pkg.stats'})
+        self.assertNotIn('encodings', [module for module, _ in attribution['hoisted_imports']])
+        self.assertIn('pkg', [module for module, _, _ in attribution['module_bodies']])
+
+    def test_compressed_bundle(self):
+        """Test that a compressed bundle is unpacked for its header imports, bodies and load time"""
+        compressed = self.test_dir / "compressed.py"
+        PyCombiner(self.src / "main.py", self.src, compressed, quiet=True, compress="zlib").combine()
+        source, stub = unpack_bundle(compressed.read_text())
+        self.assertEqual(source, self.bundle.read_text())
+        self.assertIn('zlib', header_imports(stub))
+        comparison = bench_startup(self.src / "main.py", compressed, self.src, runs=1, warmup=0)
+        self.assertEqual(comparison.returncodes, ({0}, {0}))
+        self.assertTrue({'sys', 'zlib', 'base64'} <= comparison.hoisted_modules)
+        self.assertEqual(set(comparison.body_us), {'pkg', 'pkg.stats'})
+        self.assertGreater(comparison.load_us, 0)
+
+if __name__ == '__main__':
+    unittest.main()
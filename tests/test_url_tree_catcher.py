@@ -0,0 +1,294 @@
+import unittest
+import asyncio
+import functools
+import threading
+import tempfile
+import shutil
+import time
+import io
+import json
+import sqlite3
+from pathlib import Path
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+import urlTreeCatcher
+from urlTreeCatcher import (
+    Crawler, CrawlState, HostScheduler, LinkExtractor, Scope, SiteTree, UrlNormalizer, normalize_url, parse_retry_after
+)
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    failures = {}  # path -> number of 503 responses still to send
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.failures.get(self.path, 0) > 0:
+            self.failures[self.path] -= 1
+            self.send_response(503)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        super().do_GET()
+
+class TestCrawler(unittest.TestCase):
+    def setUp(self):
+        # Serve a small generated site from a temporary directory
+        self.test_dir = Path(tempfile.mkdtemp())
+        pages = {
+            "index.html": [
+                'docs/intro.html', 'docs/guide.html', 'docs/guide.html#install', 'https://example.invalid/x',
+                'docs/guide.html?utm_source=mail', './docs/../docs/intro.html', 'mailto:someone@example.invalid',
+            ],
+            "docs/intro.html": ['guide.html', '../blog/post1.html'],
+            "docs/guide.html": ['intro.html', 'api/ref.html'],
+            "docs/api/ref.html": ['../intro.html'],
+            "blog/post1.html": ['post2.html'],
+            "blog/post2.html": ['/files/report.pdf'],
+        }
+        for name, links in pages.items():
+            path = self.test_dir / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text("<html><body>" + "".join(f'<a href="{link}">x</a>' for link in links) + "</body></html>")
+
+        (self.test_dir / "files").mkdir()
+        (self.test_dir / "files" / "report.pdf").write_bytes(b'<a href="/never.html">')
+
+        handler = functools.partial(QuietHandler, directory=str(self.test_dir))
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+
+    def test_normalize_url(self):
+        """Test that fragments and host case do not create new URLs"""
+        self.assertEqual(normalize_url("HTTP://Example.COM/a#b"), "http://example.com/a")
+
+    def test_url_normalizer(self):
+        """Test the normalization pipeline and its options"""
+        self.assertEqual(
+            normalize_url("HTTPS://Docs.Example.com:443/a/./b/../c%7e%2f?utm_source=x&b=2&a=1#top"),
+            "https://docs.example.com/a/c~%2F?a=1&b=2"
+        )
+        self.assertEqual(normalize_url("http://example.com"), "http://example.com/")
+        self.assertIsNone(UrlNormalizer()("javascript:void(0)"))
+
+        normalizer = UrlNormalizer(allow_params=["page"], trailing_slash="add")
+        self.assertEqual(normalizer("http://x.com/docs?page=2&sort=asc"), "http://x.com/docs/?page=2")
+        self.assertEqual(normalizer("http://x.com/file.pdf"), "http://x.com/file.pdf")
+        self.assertEqual(UrlNormalizer(trailing_slash="strip")("http://x.com/docs/"), "http://x.com/docs")
+
+    def test_scope(self):
+        """Test host, path prefix and include/exclude patterns"""
+        scope = Scope("http://Example.com/docs/index.html", exclude=[r"/docs/private/", r"\.pdf$"])
+        self.assertTrue(scope("http://example.com/docs/guide.html"))
+        self.assertFalse(scope("http://example.com/blog/"))
+        self.assertFalse(scope("http://example.com.evil.invalid/docs/"))
+        self.assertFalse(scope("http://example.com/docs/private/a.html"))
+        self.assertFalse(scope("http://example.com/docs/a.pdf"))
+
+        scope = Scope("http://example.com/", include=[r"/docs/"], hosts=["example.com", "WWW.example.com"])
+        self.assertTrue(scope("http://www.example.com/docs/a"))
+        self.assertFalse(scope("http://www.example.com/blog/a"))
+
+    def test_link_extractor(self):
+        """Test extracting links from a page fed in small chunks"""
+        page = '<html><head><base href="/docs/"></head><body><a class="x" href="a.html?x=1&amp;y=2">A</a><A HREF=b.html>B</A><a>no href</a></body></html>'
+        extractor = LinkExtractor()
+        for i in range(0, len(page), 7):
+            extractor.feed(page[i:i + 7])
+        extractor.close()
+        self.assertEqual(extractor.links, ["a.html?x=1&y=2", "b.html"])
+        self.assertEqual(extractor.base, "/docs/")
+
+    def test_site_tree(self):
+        """Test the trie and its text, JSON and DOT writers"""
+        tree = SiteTree()
+        for path in ["/docs/intro.html", "/docs/api/ref.html", "/blog/", "/docs/api/"]:
+            tree.add(path)
+        self.assertEqual(len(tree), 5)
+        self.assertIn("docs/api", tree)
+        self.assertNotIn("docs/missing", tree)
+
+        out = io.StringIO()
+        tree.write(out)
+        self.assertEqual(out.getvalue(), (
+            "└── /\n"
+            "    ├── blog\n"
+            "    └── docs/\n"
+            "        ├── api/\n"
+            "        │   └── ref.html\n"
+            "        └── intro.html\n"
+        ))
+
+        out = io.StringIO()
+        tree.write(out, "json")
+        self.assertEqual(json.loads(out.getvalue()), {"blog": None, "docs": {"api": {"ref.html": None}, "intro.html": None}})
+
+        out = io.StringIO()
+        tree.write(out, "dot")
+        self.assertEqual(out.getvalue().count(" -> "), 5)
+
+    def test_deep_tree(self):
+        """Test that very deep paths do not hit the recursion limit"""
+        tree = SiteTree()
+        tree.add("/" + "/".join(f"d{i}" for i in range(5000)))
+        path = self.test_dir / "deep.json"
+        tree.save(str(path))
+        self.assertIn('"d4999": null', path.read_text())
+
+    def test_crawl_site(self):
+        """Test crawling the whole site concurrently with deduplication"""
+        crawler = Crawler(self.base_url, max_depth=5, concurrency=4)
+        site_map = crawler.crawl()
+        # The PDF is requested but its links are not followed
+        self.assertEqual(crawler.pages_fetched, 7)
+        self.assertNotIn("never.html", site_map)
+        self.assertEqual(site_map.children("docs"), {"intro.html", "guide.html", "api"})
+        self.assertEqual(site_map.children("docs/api"), {"ref.html"})
+        self.assertEqual(site_map.children("blog"), {"post1.html", "post2.html"})
+
+    def test_crawl_scope(self):
+        """Test that excluded URLs are never fetched"""
+        crawler = Crawler(self.base_url, max_depth=5, exclude=[r"/blog/"])
+        site_map = crawler.crawl()
+        self.assertEqual(crawler.pages_fetched, 4)
+        self.assertEqual(site_map.children(), {"docs"})
+
+    def test_budgets(self):
+        """Test the depth and page budgets"""
+        crawler = Crawler(self.base_url, max_depth=2)
+        crawler.crawl()
+        self.assertEqual(crawler.pages_fetched, 3)
+
+        crawler = Crawler(self.base_url, max_depth=10, max_pages=2)
+        crawler.crawl()
+        self.assertEqual(crawler.pages_fetched, 2)
+
+    def test_recrawl_is_conditional(self):
+        """Test that a second crawl with the same state only gets 304 responses"""
+        state = str(self.test_dir / "state.db")
+        first = Crawler(self.base_url, max_depth=5, state=state)
+        expected = first.crawl()
+
+        second = Crawler(self.base_url, max_depth=5, state=state)
+        self.assertEqual(second.crawl(), expected)
+        self.assertEqual(second.pages_fetched, 7)
+        self.assertEqual(second.pages_unchanged, 7)
+
+    def test_resume(self):
+        """Test that an interrupted crawl continues from its saved frontier"""
+        state_path = str(self.test_dir / "state.db")
+        expected = Crawler(self.base_url, max_depth=5, state=state_path).crawl()
+
+        # Pretend the crawl died before fetching the blog pages
+        with sqlite3.connect(state_path) as db:
+            db.execute("UPDATE meta SET value = 0 WHERE key = 'complete'")
+            db.execute("UPDATE urls SET done = 0 WHERE url LIKE '%/blog/%'")
+            db.execute("UPDATE urls SET etag = NULL, last_modified = NULL")
+        state = CrawlState(state_path)
+        self.assertTrue(state.resuming)
+        self.assertEqual(len(state.frontier()), 2)
+        state.close()
+
+        crawler = Crawler(self.base_url, max_depth=5, state=state_path)
+        self.assertEqual(crawler.crawl(), expected)
+        self.assertEqual(crawler.pages_fetched, 2)
+
+    def test_state_keys_follow_normalizer(self):
+        """Test that crawl state keeps URLs apart that a custom normalizer keeps apart"""
+        normalizer = UrlNormalizer(deny_params=())
+        urls = [normalizer("http://example.com/a?utm_source=x"), normalizer("http://example.com/a")]
+        state = CrawlState(str(self.test_dir / "state.db"))
+        for url in urls:
+            state.add(url, 1)
+        self.assertEqual(sorted(url for url, _ in state.frontier()), sorted(urls))
+        state.close()
+
+    def test_robots_txt(self):
+        """Test that paths disallowed by robots.txt are skipped"""
+        (self.test_dir / "robots.txt").write_text("User-agent: *\nDisallow: /blog/\n")
+        crawler = Crawler(self.base_url, max_depth=5)
+        crawler.crawl()
+        self.assertEqual(crawler.pages_fetched, 4)
+        self.assertEqual(crawler.pages_disallowed, 1)
+
+        crawler = Crawler(self.base_url, max_depth=5, respect_robots=False)
+        crawler.crawl()
+        self.assertEqual(crawler.pages_fetched, 7)
+
+    def test_retry(self):
+        """Test that 503 responses are retried"""
+        QuietHandler.failures = {"/docs/intro.html": 2}
+        crawler = Crawler(self.base_url, max_depth=5, backoff=0.01)
+        crawler.crawl()
+        self.assertEqual(crawler.retries, 2)
+        self.assertEqual(crawler.site_map.children("blog"), {"post1.html", "post2.html"})
+
+        QuietHandler.failures = {"/docs/intro.html": 5}
+        crawler = Crawler(self.base_url, max_depth=5, backoff=0.01, max_retries=1)
+        crawler.crawl()
+        self.assertEqual(crawler.retries, 1)
+        self.assertEqual(crawler.site_map.children("blog"), set())
+
+    def test_rate_limit(self):
+        """Test that the token bucket spaces out requests"""
+        start = time.monotonic()
+        Crawler(self.base_url, max_depth=5, rate=20).crawl()
+        # 7 pages at 20 requests per second after the first token
+        self.assertGreaterEqual(time.monotonic() - start, 0.29)
+
+    def test_adaptive_concurrency(self):
+        """Test the AIMD concurrency window"""
+        host = HostScheduler(max_concurrency=4)
+        for _ in range(10):
+            host.observe(0.01)
+        self.assertEqual(host.window, 4)
+        host.observe(0.01, 503)
+        self.assertEqual(host.window, 2)
+        host.observe(1.0)
+        self.assertEqual(host.window, 1)
+
+    def test_cancelled_acquire(self):
+        """Test that a request cancelled while waiting for a token gives its slot back"""
+        async def scenario():
+            host = HostScheduler(rate=1, burst=1)
+            await host.acquire()
+            await host.release(0.01)
+            task = asyncio.ensure_future(host.acquire())
+            await asyncio.sleep(0.05)
+            self.assertEqual(host.in_flight, 1)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            return host.in_flight
+        self.assertEqual(asyncio.run(scenario()), 0)
+
+    def test_parse_retry_after(self):
+        """Test both forms of Retry-After"""
+        self.assertEqual(parse_retry_after("120"), 120)
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT", now=1445412470), 10)
+        self.assertIsNone(parse_retry_after("soon"))
+
+    def test_module_crawl(self):
+        """Test the module-level crawl function"""
+        urlTreeCatcher.visited.clear()
+        urlTreeCatcher.site_map = SiteTree()
+        urlTreeCatcher.crawl(self.base_url, self.base_url)
+        self.assertEqual(urlTreeCatcher.site_map.children(), {"docs"})
+
+    def test_main(self):
+        """Test the command-line interface"""
+        output = self.test_dir / "tree.json"
+        status = urlTreeCatcher.main([self.base_url, "--depth", "5", "--exclude", "/blog/", "-o", str(output)])
+        self.assertEqual(status, 0)
+        self.assertEqual(set(json.loads(output.read_text())), {"docs"})
+
+    def tearDown(self):
+        QuietHandler.failures = {}
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.test_dir)
+
+if __name__ == '__main__':
+    unittest.main()
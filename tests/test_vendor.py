@@ -0,0 +1,75 @@
+import importlib
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from pycombiner.combiner.combiner import PyCombiner
+from pycombiner.combiner.prescan import scan_imports
+from pycombiner.combiner.vendor import ImportRecordCache, Vendor, VendoredPackage
+
+class TestVendor(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        site = self.test_dir / "site"
+        package = site / "vendpkg"
+        (package / "sub").mkdir(parents=True)
+        (package / "__init__.py").write_text("from .core import greet\n")
+        (package / "core.py").write_text("from . import helpers\n\ndef greet(name):\n    return helpers.PREFIX + name\n")
+        (package / "helpers.py").write_text("PREFIX = 'hello '\n")
+        (package / "unused.py").write_text("import does_not_exist\n")
+        (package / "sub" / "__init__.py").write_text("")
+        (package / "sub" / "extra.py").write_text("from ..helpers import PREFIX\nVALUE = PREFIX.strip()\n")
+        (site / "nativepkg").mkdir()
+        (site / "nativepkg" / "__init__.py").write_text("")
+        (site / "nativepkg" / "fast.so").write_bytes(b"")
+        self.site = site
+        sys.path.insert(0, str(site))
+        importlib.invalidate_caches()
+
+        self.project = self.test_dir / "project"
+        self.project.mkdir()
+        (self.project / "main.py").write_text(
+            "import vendpkg\nfrom vendpkg.sub import extra\n\nprint(vendpkg.greet('world'), extra.VALUE)\n")
+
+    def tearDown(self):
+        sys.path.remove(str(self.site))
+        shutil.rmtree(self.test_dir)
+
+    def test_reachable_selection(self):
+        """Test that only reachable submodules are selected, following relative imports"""
+        combiner = PyCombiner(self.project / "main.py", self.project, self.test_dir / "out.py", quiet=True,
+                              vendor=["vendpkg"])
+        combiner.combine()
+        names = [module.name for module in combiner.vendored_modules]
+        self.assertEqual(names, ["vendpkg", "vendpkg.core", "vendpkg.helpers", "vendpkg.sub", "vendpkg.sub.extra"])
+
+    def test_bundle_runs_without_package(self):
+        """Test that the bundle imports vendored modules from itself"""
+        output = self.test_dir / "out.py"
+        PyCombiner(self.project / "main.py", self.project, output, quiet=True, vendor=["vendpkg"]).combine()
+        result = subprocess.run([sys.executable, "-I", str(output)], capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout, "hello world hello\n")
+
+    def test_record_cache(self):
+        """Test import records reused from the shared cache directory"""
+        cache_dir = self.test_dir / "records"
+        project_imports = scan_imports((self.project / "main.py").read_text())
+        first = ImportRecordCache(cache_dir)
+        Vendor(["vendpkg"], first).select(project_imports)
+        self.assertEqual(first.misses, 5)
+        second = ImportRecordCache(cache_dir)
+        Vendor(["vendpkg"], second).select(project_imports)
+        self.assertEqual(second.misses, 0)
+        self.assertEqual(second.hits, 5)
+
+    def test_rejected_packages(self):
+        """Test errors for extension, stdlib and missing packages"""
+        for name in ("nativepkg", "json", "missing_package_xyz"):
+            with self.assertRaises(ValueError):
+                VendoredPackage(name)
+
+if __name__ == '__main__':
+    unittest.main()
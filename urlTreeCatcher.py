@@ -1,121 +1,886 @@
+import argparse
+import asyncio
+import codecs
+import hashlib
+import fnmatch
+import json
+import random
+import re
+import sqlite3
+import sys
+import threading
+import time
 import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
-from collections import defaultdict
+from requests.adapters import HTTPAdapter
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from html.parser import HTMLParser
+from urllib.parse import unquote_plus, urljoin, urlparse, urlsplit, urlunsplit
+from urllib.robotparser import RobotFileParser
+
+class SiteTree:
+    """Site map as a trie of URL path segments.
+
+    Each directory is a dict from interned segment to child; pages without
+    children are stored as None instead of an empty dict. Traversal uses an
+    explicit stack, so deep sites cannot hit the recursion limit, and the
+    writers stream the tree in chunks instead of building it in memory.
+    """
+
+    write_chunk = 4096  # Pieces joined per write
+
+    def __init__(self):
+        self.root = {}
+        self.size = 0
+
+    def add(self, path):
+        """Add a URL path such as ``/docs/api/ref.html``"""
+        parts = [part for part in path.split('/') if part]
+        node = self.root
+        for i, part in enumerate(parts):
+            part = sys.intern(part)
+            if part not in node:
+                node[part] = None
+                self.size += 1
+            if i < len(parts) - 1:
+                if node[part] is None:
+                    node[part] = {}
+                node = node[part]
+
+    def _node(self, directory):
+        node = self.root
+        for part in directory.split('/'):
+            if part:
+                node = node.get(part) if node else None
+                if node is None:
+                    return None
+        return node
+
+    def children(self, directory=''):
+        """Names directly below a directory"""
+        node = self._node(directory)
+        return set(node) if node else set()
+
+    def __contains__(self, path):
+        parts = [part for part in path.split('/') if part]
+        node = self.root
+        for part in parts:
+            if not node or part not in node:
+                return False
+            node = node[part]
+        return True
+
+    def __len__(self):
+        return self.size
+
+    def __eq__(self, other):
+        return isinstance(other, SiteTree) and self.root == other.root
+
+    def iter_text(self, directory=''):
+        """Lines of the tree drawn with box characters, directories ending in '/'"""
+        node = self._node(directory) or {}
+        yield f"└── {directory.rstrip('/').split('/')[-1]}/\n"
+        stack = [(sorted(node.items()), 0, '    ')]
+        while stack:
+            items, i, prefix = stack[-1]
+            if i == len(items):
+                stack.pop()
+                continue
+            stack[-1] = (items, i + 1, prefix)
+            name, child = items[i]
+            is_last = i == len(items) - 1
+            connector = '└── ' if is_last else '├── '
+            if child is None:
+                yield f"{prefix}{connector}{name}\n"
+            else:
+                yield f"{prefix}{connector}{name}/\n"
+                stack.append((sorted(child.items()), 0, prefix + ('    ' if is_last else '│   ')))
+
+    def iter_json(self):
+        """The tree as nested JSON objects; pages without children are null"""
+        yield '{'
+        stack = [(sorted(self.root.items()), 0)]
+        while stack:
+            items, i = stack[-1]
+            if i == len(items):
+                stack.pop()
+                yield '}'
+                continue
+            stack[-1] = (items, i + 1)
+            name, child = items[i]
+            separator = ', ' if i else ''
+            if child is None:
+                yield f"{separator}{json.dumps(name, ensure_ascii=False)}: null"
+            else:
+                yield f"{separator}{json.dumps(name, ensure_ascii=False)}: {{"
+                stack.append((sorted(child.items()), 0))
+        yield '\n'
+
+    def iter_dot(self, name='site'):
+        """The tree in Graphviz DOT format"""
+        yield f'digraph "{name}" {{\n    node [shape=box];\n    n0 [label="/"];\n'
+        next_id = 1
+        stack = [(0, iter(sorted(self.root.items())))]
+        while stack:
+            parent, items = stack[-1]
+            item = next(items, None)
+            if item is None:
+                stack.pop()
+                continue
+            segment, child = item
+            node_id = next_id
+            next_id += 1
+            label = segment.replace('\\', '\\\\').replace('"', '\\"')
+            yield f'    n{node_id} [label="{label}"];\n    n{parent} -> n{node_id};\n'
+            if child is not None:
+                stack.append((node_id, iter(sorted(child.items()))))
+        yield '}\n'
+
+    def write(self, f, format='text'):
+        """Stream the tree to a text file object in 'text', 'json' or 'dot' format"""
+        pieces = {'text': self.iter_text, 'json': self.iter_json, 'dot': self.iter_dot}[format]()
+        buffer = []
+        for piece in pieces:
+            buffer.append(piece)
+            if len(buffer) >= self.write_chunk:
+                f.write(''.join(buffer))
+                buffer.clear()
+        f.write(''.join(buffer))
+
+    def save(self, path, format=None):
+        """Write the tree to a file; the format defaults to the file extension"""
+        if format is None:
+            format = {'.json': 'json', '.dot': 'dot', '.gv': 'dot'}.get(path[path.rfind('.'):].lower(), 'text')
+        with open(path, 'w', encoding='utf-8', buffering=1 << 16) as f:
+            self.write(f, format)
 
 visited = set()
-site_map = defaultdict(set)
+site_map = SiteTree()
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+UNRESERVED = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~')
+
+def _remove_dot_segments(path):
+    output = []
+    for segment in path.split('/'):
+        if segment == '..':
+            if len(output) > 1:
+                output.pop()
+        elif segment != '.':
+            output.append(segment)
+    if path.endswith(('/.', '/..')):
+        output.append('')
+    return '/'.join(output)
+
+def _fix_escape(match):
+    char = chr(int(match.group(1), 16))
+    return char if char in UNRESERVED else '%' + match.group(1).upper()
+
+def _compile_globs(patterns):
+    if not patterns:
+        return None
+    return re.compile('|'.join(fnmatch.translate(pattern) for pattern in patterns))
+
+class UrlNormalizer:
+    """Canonical form of a URL, used both to fetch it and to deduplicate it.
+
+    Steps, in order: drop the fragment, lower-case scheme and host, drop
+    default ports, resolve '.'/'..' segments, normalize percent-escapes,
+    apply the trailing-slash rule, and filter and sort query parameters.
+
+    ``allow_params``/``deny_params`` are glob patterns on parameter names;
+    with an allow list only matching parameters are kept. ``trailing_slash``
+    is 'keep', 'strip' or 'add' ('add' skips paths whose last segment has a
+    file extension). URLs with other schemes than ``schemes`` (mailto:,
+    javascript:, ...) and unparsable URLs normalize to None.
+    """
+
+    DEFAULT_DENY = ('utm_*', 'fbclid', 'gclid', 'mc_cid', 'mc_eid')
+
+    def __init__(self, allow_params=None, deny_params=DEFAULT_DENY, sort_query=True, trailing_slash='keep',
+                 schemes=('http', 'https')):
+        if trailing_slash not in ('keep', 'strip', 'add'):
+            raise ValueError(f"Unknown trailing slash rule: {trailing_slash}")
+        self.allow = _compile_globs(allow_params) if allow_params is not None else None
+        self.keep_none = allow_params is not None and not allow_params
+        self.deny = _compile_globs(deny_params)
+        self.sort_query = sort_query
+        self.trailing_slash = trailing_slash
+        self.schemes = schemes
+
+    def _query(self, query):
+        params = []
+        for param in query.split('&'):
+            if not param:
+                continue
+            name = unquote_plus(param.split('=', 1)[0])
+            if self.keep_none or (self.allow is not None and not self.allow.match(name)):
+                continue
+            if self.deny is not None and self.deny.match(name):
+                continue
+            params.append(param)
+        if self.sort_query:
+            params.sort()
+        return '&'.join(params)
+
+    def __call__(self, url):
+        try:
+            parts = urlsplit(url.strip())
+            port = parts.port
+        except ValueError:
+            return None
+        scheme = parts.scheme.lower()
+        if self.schemes and scheme not in self.schemes:
+            return None
+
+        host = (parts.hostname or '').rstrip('.')
+        if ':' in host:
+            host = f'[{host}]'
+        netloc = host
+        if port is not None and port != DEFAULT_PORTS.get(scheme):
+            netloc += f':{port}'
+        if parts.username is not None:
+            userinfo = parts.netloc.rpartition('@')[0]
+            netloc = f'{userinfo}@{netloc}'
+
+        path = re.sub('%([0-9a-fA-F]{2})', _fix_escape, _remove_dot_segments(parts.path)) or '/'
+        if self.trailing_slash == 'strip' and path != '/':
+            path = path.rstrip('/') or '/'
+        elif self.trailing_slash == 'add' and not path.endswith('/') and '.' not in path.rsplit('/', 1)[-1]:
+            path += '/'
+        return urlunsplit((scheme, netloc, path, self._query(parts.query), ''))
+
+_default_normalizer = UrlNormalizer()
+
+def normalize_url(url):
+    """Key used to deduplicate URLs, with the default UrlNormalizer rules"""
+    return _default_normalizer(url) or url
+
+class Scope:
+    """Which URLs a crawl may enqueue.
+
+    A URL is in scope when its host is one of ``hosts`` (the base URL's host
+    by default), its path starts with the base URL's directory, it matches
+    one of the ``include`` regular expressions if any are given, and it
+    matches none of the ``exclude`` ones. The patterns are compiled into a
+    single alternation each and searched in the normalized URL.
+    """
+
+    def __init__(self, base_url, include=(), exclude=(), hosts=None):
+        base = urlsplit(normalize_url(base_url))
+        self.hosts = {urlsplit(normalize_url(f'{base.scheme}://{host}/')).netloc for host in hosts} if hosts else {base.netloc}
+        self.prefix = base.path[:base.path.rfind('/') + 1] or '/'
+        self.include = re.compile('|'.join(f'(?:{pattern})' for pattern in include)) if include else None
+        self.exclude = re.compile('|'.join(f'(?:{pattern})' for pattern in exclude)) if exclude else None
+
+    def __call__(self, url):
+        parts = urlsplit(url)
+        if parts.netloc not in self.hosts or not parts.path.startswith(self.prefix):
+            return False
+        if self.include is not None and not self.include.search(url):
+            return False
+        return self.exclude is None or not self.exclude.search(url)
+
+class LinkExtractor(HTMLParser):
+    """Incremental parser collecting ``<a href>`` values without building a tree.
+
+    Feed it chunks of a page as they arrive; ``links`` grows as anchors are
+    seen. A ``<base href>`` is remembered in ``base``.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.links = []
+        self.base = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a':
+            for name, value in attrs:
+                if name == 'href' and value is not None:
+                    self.links.append(value)
+                    break
+        elif tag == 'base' and self.base is None:
+            self.base = dict(attrs).get('href')
+
+    handle_startendtag = handle_starttag
+
+class CrawlState:
+    """Crawl progress kept in a SQLite database so an interrupted crawl can resume.
+
+    Every URL ever enqueued has a row keyed by a hash of the URL as given,
+    which the crawler has already normalized with its own UrlNormalizer,
+    holding its depth, whether it was fetched, and the ETag/Last-Modified of
+    its last response. The in-scope links found on each page are kept as
+    edges; they rebuild the site map on resume and stand in for pages that
+    answer a conditional request with 304 Not Modified.
+
+    Each crawl is a generation. Opening a state whose last crawl did not
+    finish resumes it; otherwise a new generation starts and URLs from
+    earlier ones are fetched again, conditionally.
+    """
+
+    commit_every = 100
+
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.executescript('''
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS urls (
+                hash BLOB PRIMARY KEY,
+                url TEXT NOT NULL,
+                depth INTEGER NOT NULL,
+                generation INTEGER NOT NULL,
+                done INTEGER NOT NULL DEFAULT 0,
+                etag TEXT,
+                last_modified TEXT
+            );
+            CREATE TABLE IF NOT EXISTS edges (src BLOB NOT NULL, dst TEXT NOT NULL, PRIMARY KEY (src, dst));
+        ''')
+        self._pending = 0
+        self.generation = self._meta('generation', 0)
+        self.resuming = self.generation > 0 and not self._meta('complete', 1)
+        if not self.resuming:
+            self.generation += 1
+            self._set_meta('generation', self.generation)
+            self._set_meta('complete', 0)
+            self.db.commit()
+
+    @staticmethod
+    def url_hash(url):
+        return hashlib.blake2b(url.encode('utf-8'), digest_size=16).digest()
+
+    def _meta(self, key, default):
+        row = self.db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key, value):
+        self.db.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+
+    def _changed(self):
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self.db.commit()
+            self._pending = 0
+
+    def frontier(self):
+        """URLs enqueued by the current crawl but not fetched yet, as (url, depth)"""
+        return self.db.execute(
+            'SELECT url, depth FROM urls WHERE generation = ? AND done = 0 ORDER BY depth', (self.generation,)
+        ).fetchall()
+
+    def visited(self):
+        """All URLs enqueued by the current crawl"""
+        return [row[0] for row in self.db.execute('SELECT url FROM urls WHERE generation = ?', (self.generation,))]
+
+    def edges(self):
+        """Links found on the pages fetched by the current crawl"""
+        return [row[0] for row in self.db.execute(
+            'SELECT edges.dst FROM edges JOIN urls ON urls.hash = edges.src WHERE urls.generation = ? AND urls.done = 1',
+            (self.generation,)
+        )]
 
-def crawl(url, base_url, depth=1):
-    if depth == 0 or url in visited:
-        return
-    visited.add(url)
-    print(f"Crawling: {url}")
+    def add(self, url, depth):
+        """Record an enqueued URL"""
+        self.db.execute('''
+            INSERT INTO urls (hash, url, depth, generation) VALUES (?, ?, ?, ?)
+            ON CONFLICT (hash) DO UPDATE SET url = excluded.url, depth = excluded.depth,
+                generation = excluded.generation, done = 0
+        ''', (self.url_hash(url), url, depth, self.generation))
+        self._changed()
 
+    def validators(self, url):
+        """ETag and Last-Modified of the last response for a URL"""
+        row = self.db.execute('SELECT etag, last_modified FROM urls WHERE hash = ?', (self.url_hash(url),)).fetchone()
+        return row if row else (None, None)
+
+    def links(self, url):
+        """Links found the last time a URL was fetched"""
+        return [row[0] for row in self.db.execute('SELECT dst FROM edges WHERE src = ?', (self.url_hash(url),))]
+
+    def finish(self, url, links, validators=(None, None)):
+        """Record a fetched page with the links found on it"""
+        key = self.url_hash(url)
+        etag, last_modified = validators
+        self.db.execute(
+            'UPDATE urls SET done = 1, etag = ?, last_modified = ? WHERE hash = ?', (etag, last_modified, key)
+        )
+        self.db.execute('DELETE FROM edges WHERE src = ?', (key,))
+        self.db.executemany('INSERT OR IGNORE INTO edges (src, dst) VALUES (?, ?)', [(key, link) for link in links])
+        self._changed()
+
+    def complete(self):
+        """Mark the current crawl as finished"""
+        self._set_meta('complete', 1)
+        self.db.commit()
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+# Result of one request; ``links`` is None when the page was not modified
+Page = namedtuple('Page', 'url status links validators retry_after')
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait according to a Retry-After header (delta seconds or HTTP date), or None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
     try:
-        response = requests.get(url, timeout=5)
-        print(f"Response status: {response.status_code}")
-        if not response.ok:
-            print(f"Failed to get {url}: {response.status_code}")
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    now = now if now is not None else time.time()
+    return max(0.0, when.timestamp() - now)
+
+class HostScheduler:
+    """Politeness for one host: robots.txt rules, a token bucket and an adaptive concurrency window.
+
+    The token bucket allows ``rate`` requests per second with bursts of
+    ``burst``; None means no rate limit. The concurrency window follows
+    AIMD. Each success that is not markedly slower than the average latency
+    widens it by 1/window, up to ``max_concurrency``. A response that is
+    ``slow_factor`` times slower than average, a 429/5xx or an error halves
+    it. ``pause`` holds back every request to the host, e.g. for Retry-After.
+    """
+
+    slow_factor = 2.0
+
+    def __init__(self, rate=None, burst=1, max_concurrency=4):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.max_concurrency = max_concurrency
+        self.window = 1.0
+        self.in_flight = 0
+        self.latency = None
+        self.paused_until = 0.0
+        self.robots = None
+        self.robots_lock = asyncio.Lock()
+        self._condition = asyncio.Condition()
+
+    def observe(self, latency, status=200):
+        """Adjust the concurrency window after a response (latency None for failed requests)"""
+        if latency is None or status in RETRY_STATUSES:
+            self.window = max(1.0, self.window / 2)
             return
-        
-        print(f"Response content length: {len(response.text)}")
-        soup = BeautifulSoup(response.text, 'html.parser')
-        links_found = 0
-        
-        print("Found links:")
-        for a_tag in soup.find_all('a', href=True):
-            print(f"  Raw href: {a_tag['href']}")
-            # if links_found >= 10:  # 增加每个页面处理的链接数
-            #     break
-            link = urljoin(base_url, a_tag['href'])
-            parsed = urlparse(link)
-            print(f"  Parsed link: {link}")
-            print(f"  Parsed path: {parsed.path}")
-            
-            if base_url in link:
-                path = parsed.path.strip('/')
-                if path:
-                    print(f"  Processing path: {path}")
-                    parts = path.split('/')
-                    if len(parts) > 0:
-                        # 处理语言目录
-                        # if parts[0] in ['zh', 'en', 'jp']:
-                        #     # 将语言目录作为根目录
-                        #     if len(parts) > 1:
-                        #         site_map[parts[0]].add('/'.join(parts[1:]))
-                        #     else:
-                        #         site_map[parts[0]].add('index')
-                        # else:
-                        # 处理其他路径
-                        parent = '/'.join(parts[:-1])
-                        site_map[parent].add(parts[-1])
-                        print(f"  Added to site_map: parent='{parent}', item='{parts[-1]}'")
-                # links_found += 1
-                crawl(link, base_url, depth - 1)
-    except Exception as e:
-        print(f"Failed to crawl {url}: {str(e)}")
-        import traceback
-        print(traceback.format_exc())
-
-def print_tree(directory, prefix='', is_last=True):
-    if not directory:
-        return
-    
-    contents = sorted(site_map[directory])
-    print(f"Directory '{directory}' has contents: {contents}")
-    
-    connector = '└── ' if is_last else '├── '
-    print(f"{prefix}{connector}{directory.split('/')[-1]}/")
-    
-    for i, item in enumerate(contents):
-        is_last_item = i == len(contents) - 1
-        new_prefix = prefix + ('    ' if is_last else '│   ')
-        new_dir = f"{directory}/{item}" if directory else item
-        
-        if item in site_map:
-            print_tree(new_dir, new_prefix, is_last_item)
+        slow = self.latency is not None and latency > self.slow_factor * self.latency
+        self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        if slow:
+            self.window = max(1.0, self.window / 2)
         else:
-            connector = '└── ' if is_last_item else '├── '
-            print(f"{new_prefix}{connector}{item}")
-
-def write_tree_to_file():
-    print("\nWriting to file...")
-    with open('site_structure.txt', 'w', encoding='utf-8') as f:
-        def print_to_file(directory, prefix='', is_last=True):
-            if not directory and directory != '':
-                return
-            
-            contents = sorted(site_map[directory])
-            connector = '└── ' if is_last else '├── '
-            f.write(f"{prefix}{connector}{directory.split('/')[-1]}/\n")
-            
-            for i, item in enumerate(contents):
-                is_last_item = i == len(contents) - 1
-                new_prefix = prefix + ('    ' if is_last else '│   ')
-                new_dir = f"{directory}/{item}" if directory else item
-                
-                if item in site_map:
-                    print_to_file(new_dir, new_prefix, is_last_item)
-                else:
-                    connector = '└── ' if is_last_item else '├── '
-                    f.write(f"{new_prefix}{connector}{item}\n")
-        
-        print_to_file('')
-    print("File writing completed")
+            self.window = min(float(self.max_concurrency), self.window + 1 / self.window)
+
+    def pause(self, seconds):
+        """Send no requests to the host for a while"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def _take_token(self):
+        """Seconds until a request may go out; takes a token when that is zero"""
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.rate is None:
+            return 0.0
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.window))
+            self.in_flight += 1
+        try:
+            while True:
+                wait = self._take_token()
+                if wait <= 0:
+                    return
+                await asyncio.sleep(wait)
+        except BaseException:
+            # Cancelled while waiting for a token: give the slot back, release() will never run
+            async with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
+            raise
+
+    async def release(self, latency, status=200):
+        async with self._condition:
+            self.in_flight -= 1
+            self.observe(latency, status)
+            self._condition.notify_all()
+
+class Crawler:
+    """Concurrent crawler built on asyncio.
+
+    Pages wait in a frontier queue and are fetched by ``concurrency``
+    workers. Links are normalized by ``normalizer`` (a default UrlNormalizer
+    unless given), checked against a Scope built from the base URL and the
+    ``include``/``exclude``/``hosts`` options, and deduplicated before they
+    are enqueued. Every host gets its own pooled requests session and at most
+    ``per_host`` requests in flight. Blocking I/O and parsing run in a
+    thread pool.
+
+    ``max_depth`` works like the ``depth`` argument of ``crawl``: 1 fetches
+    only the start page. ``max_pages`` caps the number of pages fetched.
+
+    ``verbose`` sets how much is printed: 0 only failures, 1 one line per
+    page, 2 every link as well.
+
+    With a ``state`` database path (see CrawlState) progress is saved as the
+    crawl goes, an interrupted crawl resumes from its frontier, and pages
+    seen by an earlier crawl are fetched with conditional requests.
+
+    Requests to each host go through a HostScheduler: at most ``rate``
+    requests per second (or the robots.txt Crawl-delay/Request-rate when
+    stricter), an adaptive number in flight up to ``per_host``, and paths
+    disallowed by robots.txt are skipped unless ``respect_robots`` is off.
+    429 and 5xx responses and failed requests are retried up to
+    ``max_retries`` times with exponential backoff starting at ``backoff``
+    seconds, honouring Retry-After.
+    """
+
+    chunk_size = 16 * 1024
+    user_agent = 'urlTreeCatcher/1.0'
+    max_backoff = 60.0
+
+    def __init__(self, start_url, max_depth=1, max_pages=None, concurrency=8, per_host=4, timeout=5, verbose=0,
+                 state=None, rate=None, burst=1, respect_robots=True, max_retries=3, backoff=0.5,
+                 normalizer=None, include=(), exclude=(), hosts=None):
+        self.start_url = start_url
+        self.base_url = start_url
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.verbose = verbose
+        self.visited = set()
+        self.site_map = SiteTree()
+        self.pages_fetched = 0
+        self.pages_unchanged = 0
+        self.pages_disallowed = 0
+        self.retries = 0
+        self.state_path = state
+        self.state = None
+        self.rate = rate
+        self.burst = burst
+        self.respect_robots = respect_robots
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.normalizer = normalizer if normalizer is not None else UrlNormalizer()
+        self.include = include
+        self.exclude = exclude
+        self.hosts = hosts
+        self.scope = None
+        self._sessions = {}
+        self._sessions_lock = threading.Lock()
+        self._hosts = {}
+
+    def _session(self, host):
+        with self._sessions_lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                session.headers['User-Agent'] = self.user_agent
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.per_host)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._sessions[host] = session
+            return session
 
-# 使用一个测试网站
-start_url = 'https://www.proface-sys.com/'
-print("Starting crawl from:", start_url)
-crawl(start_url, start_url)
-print("\nCrawling completed. Found paths:")
-print_tree('')
+    def log(self, level, message):
+        """Print a message if the verbosity level asks for it"""
+        if self.verbose >= level:
+            print(message)
 
-write_tree_to_file()
-print("\nDone")
+    def _fetch_robots(self, origin):
+        """Fetch and parse robots.txt of a scheme://host origin (runs in a worker thread)"""
+        parser = RobotFileParser(origin + '/robots.txt')
+        try:
+            response = self._session(urlparse(origin).netloc).get(parser.url, timeout=self.timeout)
+        except requests.RequestException:
+            parser.allow_all = True
+            return parser
+        if response.status_code in (401, 403):
+            parser.disallow_all = True
+        elif response.status_code >= 400:
+            parser.allow_all = True
+        else:
+            parser.parse(response.text.splitlines())
+        return parser
+
+    async def _host(self, url, executor):
+        """Scheduler for the host of a URL, with its robots.txt loaded"""
+        parsed = urlparse(url)
+        host = self._hosts.get(parsed.netloc)
+        if host is None:
+            host = self._hosts[parsed.netloc] = HostScheduler(self.rate, self.burst, self.per_host)
+        if self.respect_robots and host.robots is None:
+            async with host.robots_lock:
+                if host.robots is None:
+                    robots = await asyncio.get_running_loop().run_in_executor(
+                        executor, self._fetch_robots, f"{parsed.scheme}://{parsed.netloc}"
+                    )
+                    delay = robots.crawl_delay(self.user_agent)
+                    request_rate = robots.request_rate(self.user_agent)
+                    limits = [host.rate] if host.rate else []
+                    if delay:
+                        limits.append(1 / float(delay))
+                    if request_rate:
+                        limits.append(request_rate.requests / request_rate.seconds)
+                    host.rate = min(limits) if limits else None
+                    host.robots = robots
+        return host
+
+    def _retry_delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return min(retry_after, self.max_backoff)
+        return min(self.backoff * 2 ** attempt * (1 + random.random() / 2), self.max_backoff)
+
+    def _fetch_links(self, url, validators=(None, None)):
+        """Fetch a page and return it as a Page with the raw hrefs as links.
+
+        Runs in a worker thread. The body is streamed through a LinkExtractor
+        chunk by chunk, and bodies that are not HTML are not downloaded.
+        With ``validators`` from an earlier response the request is
+        conditional; links are None when the page has not changed.
+        """
+        etag, last_modified = validators
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        with self._session(urlparse(url).netloc).get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+            self.log(2, f"Response status: {response.status_code}")
+            status = response.status_code
+            if status == 304:
+                return Page(response.url, status, None, validators, None)
+            validators = (response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            if not response.ok:
+                return Page(response.url, status, [], (None, None), parse_retry_after(response.headers.get('Retry-After')))
+            content_type = response.headers.get('Content-Type', 'text/html')
+            if 'html' not in content_type:
+                self.log(2, f"Skipping {url}: {content_type}")
+                return Page(response.url, status, [], validators, None)
+
+            extractor = LinkExtractor()
+            # requests assumes ISO-8859-1 for text without a charset; pages are UTF-8 nowadays
+            encoding = response.encoding if 'charset' in content_type.lower() else 'utf-8'
+            decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+            size = 0
+            for chunk in response.iter_content(self.chunk_size):
+                size += len(chunk)
+                extractor.feed(decoder.decode(chunk))
+            extractor.feed(decoder.decode(b'', final=True))
+            extractor.close()
+            self.log(2, f"Response content length: {size}")
+
+        page_url = response.url
+        if extractor.base:
+            page_url = urljoin(page_url, extractor.base)
+        return Page(page_url, status, extractor.links, validators, None)
+
+    def _record(self, link):
+        self.site_map.add(urlparse(link).path)
+
+    def _enqueue(self, queue, url, depth):
+        if depth >= self.max_depth:
+            return
+        if url in self.visited:
+            return
+        if self.max_pages is not None and len(self.visited) >= self.max_pages:
+            return
+        self.visited.add(url)
+        if self.state is not None:
+            self.state.add(url, depth)
+        queue.put_nowait((url, depth))
+
+    async def _request(self, host, executor, url, validators):
+        """Fetch a page through the host scheduler, retrying 429/5xx and failed requests"""
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries + 1):
+            await host.acquire()
+            start = time.monotonic()
+            try:
+                page = await loop.run_in_executor(executor, self._fetch_links, url, validators)
+            except requests.RequestException as e:
+                await host.release(None)
+                if attempt == self.max_retries:
+                    raise
+                delay = self._retry_delay(attempt)
+                self.log(1, f"  Retrying {url} in {delay:.1f}s: {e}")
+            else:
+                await host.release(time.monotonic() - start, page.status)
+                if page.status not in RETRY_STATUSES or attempt == self.max_retries:
+                    return page
+                delay = self._retry_delay(attempt, page.retry_after)
+                self.log(1, f"  Retrying {url} in {delay:.1f}s: status {page.status}")
+            self.retries += 1
+            host.pause(delay)
 
+    async def _process(self, queue, executor, url, depth):
+        host = await self._host(url, executor)
+        if self.respect_robots and not host.robots.can_fetch(self.user_agent, url):
+            self.pages_disallowed += 1
+            self.log(1, f"Disallowed by robots.txt: {url}")
+            if self.state is not None:
+                self.state.finish(url, [])
+            return
+        validators = self.state.validators(url) if self.state is not None else (None, None)
+        self.log(1, f"Crawling: {url}")
+        page = await self._request(host, executor, url, validators)
+        self.pages_fetched += 1
+        if page.status >= 400:
+            self.log(0, f"Failed to get {url}: {page.status}")
+        page_url, hrefs, validators = page.url, page.links, page.validators
+
+        if hrefs is None:
+            # Not modified: follow the links found last time
+            self.pages_unchanged += 1
+            self.log(2, f"  Unchanged: {url}")
+            links = self.state.links(url)
+        else:
+            links = []
+            for href in hrefs:
+                link = self.normalizer(urljoin(page_url, href))
+                self.log(2, f"  Found link: {href} -> {link}")
+                if link is not None and self.scope(link):
+                    links.append(link)
+
+        for link in links:
+            self._record(link)
+            self._enqueue(queue, link, depth + 1)
+        if self.state is not None:
+            self.state.finish(url, links, validators)
+
+    async def _worker(self, queue, executor):
+        while True:
+            url, depth = await queue.get()
+            try:
+                await self._process(queue, executor, url, depth)
+            except Exception as e:
+                self.log(0, f"Failed to crawl {url}: {str(e)}")
+            finally:
+                queue.task_done()
+
+    async def run(self):
+        """Crawl from the start URL until the frontier is empty or a budget is used up"""
+        queue = asyncio.Queue()
+        self._hosts = {}
+        self.scope = Scope(self.base_url, self.include, self.exclude, self.hosts)
+        if self.state_path is not None and self.state is None:
+            self.state = CrawlState(self.state_path)
+        if self.state is not None and self.state.resuming:
+            self.log(1, f"Resuming crawl from {self.state_path}")
+            self.visited.update(self.state.visited())
+            for link in self.state.edges():
+                self._record(link)
+            for url, depth in self.state.frontier():
+                queue.put_nowait((url, depth))
+        else:
+            self._enqueue(queue, self.normalizer(self.start_url) or self.start_url, 0)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            workers = [asyncio.create_task(self._worker(queue, executor)) for _ in range(self.concurrency)]
+            try:
+                await queue.join()
+            finally:
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+        if self.state is not None:
+            self.state.complete()
+        return self.site_map
 
+    def crawl(self):
+        """Run the crawl to completion from synchronous code"""
+        try:
+            return asyncio.run(self.run())
+        finally:
+            self.close()
 
+    def close(self):
+        with self._sessions_lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+        if self.state is not None:
+            self.state.close()
+            self.state = None
 
+def crawl(url, base_url, depth=1, concurrency=8, verbose=1):
+    """Crawl ``url`` and merge the results into the module-level ``visited`` and ``site_map``"""
+    crawler = Crawler(url, max_depth=depth, concurrency=concurrency, verbose=verbose)
+    crawler.base_url = base_url
+    crawler.visited = visited
+    crawler.site_map = site_map
+    crawler.crawl()
+
+def print_tree(directory='', tree=None):
+    """Print the site map below a directory"""
+    tree = tree if tree is not None else site_map
+    sys.stdout.writelines(tree.iter_text(directory))
+
+def write_tree_to_file(path='site_structure.txt', format=None, tree=None):
+    """Write the site map as text, JSON or DOT (see SiteTree.save)"""
+    tree = tree if tree is not None else site_map
+    tree.save(path, format)
+
+def main(argv=None):
+    """Command-line entry point; returns the exit status"""
+    parser = argparse.ArgumentParser(prog='urlTreeCatcher', description='Crawl a site and print its URL tree')
+    parser.add_argument('url', help='Start URL; only URLs below its directory are crawled')
+    parser.add_argument('-d', '--depth', type=int, default=1, help='Crawl depth, 1 fetches only the start page (default: 1)')
+    parser.add_argument('-c', '--concurrency', type=int, default=8, help='Number of pages fetched at once (default: 8)')
+    parser.add_argument('--per-host', type=int, default=4, help='Maximum requests in flight per host (default: 4)')
+    parser.add_argument('--max-pages', type=int, help='Stop after fetching this many pages')
+    parser.add_argument('--timeout', type=float, default=5, help='Request timeout in seconds (default: 5)')
+    parser.add_argument('--rate', type=float, help='Maximum requests per second per host')
+    parser.add_argument('--state', help='SQLite database used to resume and re-crawl conditionally')
+    parser.add_argument('--include', action='append', default=[], metavar='REGEX', help='Only crawl URLs matching REGEX (repeatable)')
+    parser.add_argument('--exclude', action='append', default=[], metavar='REGEX', help='Skip URLs matching REGEX (repeatable)')
+    parser.add_argument('--host', action='append', dest='hosts', metavar='HOST', help='Also crawl this host (repeatable)')
+    parser.add_argument('--ignore-robots', action='store_true', help='Do not fetch or obey robots.txt')
+    parser.add_argument('-f', '--format', choices=['text', 'json', 'dot'], help='Output format (default: text, or from the output file extension)')
+    parser.add_argument('-o', '--output', help='Write the tree to a file instead of stdout')
+    parser.add_argument('-v', '--verbose', action='count', default=0, help='Print fetched pages (-vv: links as well)')
+
+    args = parser.parse_args(argv)
+    hosts = None
+    if args.hosts:
+        hosts = [urlparse(args.url).netloc] + args.hosts
+    crawler = Crawler(args.url, max_depth=args.depth, max_pages=args.max_pages, concurrency=args.concurrency,
+                      per_host=args.per_host, timeout=args.timeout, verbose=args.verbose, state=args.state,
+                      rate=args.rate, respect_robots=not args.ignore_robots,
+                      include=args.include, exclude=args.exclude, hosts=hosts)
+
+    start = time.perf_counter()
+    try:
+        tree = crawler.crawl()
+    except (re.error, sqlite3.Error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        print("Interrupted", file=sys.stderr)
+        return 130
+    elapsed = time.perf_counter() - start
 
+    if args.output:
+        tree.save(args.output, args.format)
+    else:
+        tree.write(sys.stdout, args.format or 'text')
+    print(f"{crawler.pages_fetched} pages in {elapsed:.2f} s", file=sys.stderr)
+    return 0
 
+if __name__ == '__main__':
+    sys.exit(main())